@@ -0,0 +1,544 @@
+from typing import List, Dict, Tuple, Any, Callable, Union
+from os import environ
+from os.path import dirname, abspath, join
+from sys import path, argv, executable, version as python_version, stdout, stderr
+from argparse import ArgumentParser, Namespace, SUPPRESS
+from tempfile import TemporaryDirectory
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from time import perf_counter
+from resource import getrusage, RUSAGE_SELF
+from subprocess import run
+from json import dumps, loads
+from urllib.request import Request, urlopen
+from numpy import ndarray, asarray, percentile, cumsum, clip
+from numpy.random import default_rng
+
+
+
+
+# Benchmark Environment
+# The benchmark runs offline, so the environment is populated with placeholders
+# before the modules are imported. The database is never reached because the pool
+# is created lazily and the active epoch is stubbed. The prediction cache is
+# disabled so every request runs the ensemble.
+for key, value in {
+    "NODE_ENV": "development",
+    "testMode": "false",
+    "debugMode": "false",
+    "restoreMode": "false",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_USER": "benchmark",
+    "POSTGRES_PASSWORD": "benchmark",
+    "POSTGRES_DB": "benchmark",
+    "FLASK_RUN_HOST": "127.0.0.1",
+    "FLASK_SECRET_KEY": "benchmark",
+    "PORT": "5000",
+    "PREDICTION_CACHE_CAPACITY": "0",
+    "EPOCH_POLL_INTERVAL": "0"
+}.items():
+    environ.setdefault(key, value)
+path.insert(0, join(dirname(dirname(abspath(__file__))), "dist"))
+path.insert(0, join(dirname(dirname(abspath(__file__))), "tests"))
+from modules._types import IEpochRecord, IPrediction
+from modules.environment.Environment import ENV
+from modules.regression.Regression import Regression
+from modules.prediction_model.PredictionModel import PredictionModel
+from modules.epoch.Epoch import Epoch
+from index import app
+from fixtures import build_epoch_record
+
+
+
+
+# Benchmark Epoch
+EPOCH_ID: str = "_BENCHMARK"
+
+
+
+
+
+
+
+
+
+
+#################
+## Model Files ##
+#################
+
+
+
+
+def generate_regressions(model_path: str, count: int, lookback: int, predictions: int, architecture: str) -> List[str]:
+    """Generates synthetic regression files with the metadata expected by the
+    Regression Class. The weights are random, only the cost of the forward pass
+    matters.
+
+    Args:
+        model_path: str
+            The directory in which the files will be stored.
+        count: int
+            The number of regressions to generate.
+        lookback: int
+            The number of sma prices used as input.
+        predictions: int
+            The number of predictions generated by each regression.
+        architecture: str
+            dense | lstm | conv
+
+    Returns:
+        List[str]
+        The IDs of the generated regressions.
+    """
+    from h5py import File as h5pyFile
+    from tensorflow.keras import Sequential, Input
+    from tensorflow.keras.layers import Dense, Reshape, LSTM, Conv1D, MaxPooling1D, Flatten
+    from tensorflow.keras.utils import set_random_seed
+    ids: List[str] = []
+    for i in range(count):
+        # Build the model
+        set_random_seed(i)
+        if architecture == "lstm":
+            layers: List[Any] = [Reshape((lookback, 1)), LSTM(64, return_sequences=True), LSTM(32), Dense(predictions)]
+        elif architecture == "conv":
+            layers = [
+                Reshape((lookback, 1)), Conv1D(32, 5, activation="relu"), MaxPooling1D(2),
+                Conv1D(16, 3, activation="relu"), Flatten(), Dense(predictions)
+            ]
+        else:
+            layers = [Dense(256, activation="relu"), Dense(128, activation="relu"), Dense(predictions)]
+        model: Sequential = Sequential([Input(shape=(lookback,))] + layers)
+
+        # Save it and add the metadata
+        id: str = get_regression_id(architecture, i)
+        model.save(f"{model_path}/{id}.h5")
+        with h5pyFile(f"{model_path}/{id}.h5", mode="a") as model_file:
+            model_file.attrs["id"] = id
+            model_file.attrs["description"] = f"Synthetic {architecture} regression."
+            model_file.attrs["lookback"] = lookback
+            model_file.attrs["predictions"] = predictions
+        ids.append(id)
+    return ids
+
+
+
+
+
+
+def get_regression_id(architecture: str, index: int) -> str:
+    """Builds the ID of a synthetic regression.
+
+    Args:
+        architecture: str
+            dense | lstm | conv
+        index: int
+            The index of the regression.
+
+    Returns:
+        str
+    """
+    return f"R_BENCHMARK_{architecture.upper()}_{index}"
+
+
+
+
+
+
+def build_windows(count: int, window_size: int) -> List[List[float]]:
+    """Builds distinct windows of close prices from a random walk so the requests
+    are never identical.
+
+    Args:
+        count: int
+            The number of windows.
+        window_size: int
+            The number of close prices in each window.
+
+    Returns:
+        List[List[float]]
+    """
+    prices: ndarray = clip(40000 + cumsum(default_rng(0).normal(0, 50, count + window_size)), 20000, 80000)
+    return [prices[i:i + window_size].tolist() for i in range(count)]
+
+
+
+
+
+
+
+
+
+
+#############
+## Drivers ##
+#############
+
+
+
+
+def measure(fn: Callable[[int], None], requests: int, concurrency: int) -> Dict[str, float]:
+    """Invokes a function the provided number of times from a pool of threads and
+    measures the latency of each invocation as well as the throughput.
+
+    Args:
+        fn: Callable[[int], None]
+            The function to benchmark. It receives the index of the invocation.
+        requests: int
+            The number of invocations.
+        concurrency: int
+            The number of threads.
+
+    Returns:
+        Dict[str, float]
+    """
+    def timed(i: int) -> float:
+        start: float = perf_counter()
+        fn(i)
+        return perf_counter() - start
+
+    # Run the invocations
+    start: float = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies: ndarray = asarray(list(executor.map(timed, range(requests)))) * 1000
+    duration: float = perf_counter() - start
+
+    # Summarize them
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "p50_ms": round(float(percentile(latencies, 50)), 4),
+        "p95_ms": round(float(percentile(latencies, 95)), 4),
+        "p99_ms": round(float(percentile(latencies, 99)), 4),
+        "mean_ms": round(float(latencies.mean()), 4),
+        "throughput_rps": round(requests / duration, 2)
+    }
+
+
+
+
+
+
+def predict_model(model: PredictionModel, windows: List[List[float]]) -> Callable[[int], None]:
+    """Builds the function that predicts a window through the Prediction Model.
+
+    Args:
+        model: PredictionModel
+        windows: List[List[float]]
+
+    Returns:
+        Callable[[int], None]
+    """
+    def fn(i: int) -> None:
+        model.predict(windows[i % len(windows)])
+    return fn
+
+
+
+
+
+
+def predict_client(windows: List[List[float]]) -> Callable[[int], None]:
+    """Builds the function that predicts a window through the Flask test client.
+
+    Args:
+        windows: List[List[float]]
+
+    Returns:
+        Callable[[int], None]
+    """
+    def fn(i: int) -> None:
+        res: Any = app.test_client().post(
+            "/predict",
+            json={ "epoch_id": EPOCH_ID, "close_prices": windows[i % len(windows)] },
+            headers={ "secret-key": ENV["FLASK_SECRET_KEY"] }
+        )
+        if not res.get_json()["success"]:
+            raise RuntimeError(res.get_json()["error"])
+    return fn
+
+
+
+
+
+
+def predict_waitress(windows: List[List[float]], threads: int) -> Tuple[Callable[[int], None], Any]:
+    """Serves the app with waitress on an ephemeral port and builds the function
+    that predicts a window through HTTP. The server must be closed once the
+    benchmark completes.
+
+    Args:
+        windows: List[List[float]]
+        threads: int
+            The number of threads used by waitress.
+
+    Returns:
+        Tuple[Callable[[int], None], Any]
+        (fn, server)
+    """
+    from waitress import create_server
+    server: Any = create_server(app, host="127.0.0.1", port=0, threads=threads)
+    Thread(target=server.run, daemon=True).start()
+    url: str = f"http://127.0.0.1:{server.effective_port}/predict"
+    bodies: List[bytes] = [
+        dumps({ "epoch_id": EPOCH_ID, "close_prices": window }).encode("utf-8") for window in windows
+    ]
+
+    def fn(i: int) -> None:
+        req: Request = Request(url, data=bodies[i % len(bodies)], method="POST", headers={
+            "content-type": "application/json",
+            "secret-key": ENV["FLASK_SECRET_KEY"]
+        })
+        with urlopen(req) as res:
+            if b'"success":true' not in res.read().replace(b" ", b""):
+                raise RuntimeError("The prediction failed.")
+    return fn, server
+
+
+
+
+
+
+
+
+
+
+#########
+## Run ##
+#########
+
+
+
+
+def benchmark_regressions(args: Namespace, regression_ids: List[str]) -> Dict[str, Any]:
+    """Benchmarks a Prediction Model that contains the provided regressions. It
+    runs in a process of its own, so the peak RSS only accounts for this model.
+
+    Args:
+        args: Namespace
+            The arguments of the benchmark.
+        regression_ids: List[str]
+            The IDs of the regressions.
+
+    Returns:
+        Dict[str, Any]
+    """
+    # Stub the active epoch
+    record: IEpochRecord = build_epoch_record(
+        EPOCH_ID, 
+        regression_ids, 
+        f"{EPOCH_ID}_{len(regression_ids)}", 
+        args.sma_window_size, 
+        args.lookback, 
+        args.predictions
+    )
+    Epoch.get_active_epoch = staticmethod(lambda: record)
+
+    # Measure the cold load (files, graph and warm up)
+    start: float = perf_counter()
+    Epoch.initialize()
+    cold_load: float = perf_counter() - start
+    model: PredictionModel = Epoch.MODEL
+
+    # Build the windows and run a few requests so the lazy paths are initialized
+    windows: List[List[float]] = build_windows(args.requests, args.sma_window_size + args.lookback - 1)
+    first: IPrediction = model.predict(windows[0])
+    for i in range(args.warmup):
+        model.predict(windows[i % len(windows)])
+
+    # Run the benchmarks
+    result: Dict[str, Any] = {
+        "backend": ENV["INFERENCE_BACKEND"],
+        "regressions": len(regression_ids),
+        "cold_load_s": round(cold_load, 4),
+        "features": len(first["f"])
+    }
+    for target in args.targets:
+        result[target] = []
+        for concurrency in args.concurrency:
+            server: Any = None
+            if target == "model":
+                fn: Callable[[int], None] = predict_model(model, windows)
+            elif target == "client":
+                fn = predict_client(windows)
+            else:
+                fn, server = predict_waitress(windows, concurrency)
+            for i in range(args.warmup):
+                fn(i)
+            result[target].append(measure(fn, args.requests, concurrency))
+            if server is not None:
+                server.close()
+
+    # Release the background work of the model
+    model.stop()
+    result["peak_rss_mb"] = get_peak_rss()
+    return result
+
+
+
+
+
+
+def run_stage(stage: str, model_path: str, backend: Union[str, None] = None, count: Union[int, None] = None) -> Any:
+    """Runs a stage of the benchmark in a new process and retrieves its output. The
+    arguments of the benchmark are forwarded and overridden by the ones of the stage.
+    The output of the process is redirected to stderr so it doesn't mix with the report.
+
+    Args:
+        stage: str
+            generate | run
+        model_path: str
+            The directory in which the regression files are stored.
+        backend: Union[str, None]
+            The inference backend of the process. If None, the current one is used.
+        count: Union[int, None]
+            The number of regressions of the benchmarked model.
+
+    Returns:
+        Any
+    """
+    with TemporaryDirectory() as output_path:
+        # Build the arguments and the environment of the stage
+        output: str = join(output_path, "output.json")
+        stage_args: List[str] = ["--stage", stage, "--model-path", model_path, "--output", output]
+        if count is not None:
+            stage_args += ["--regressions", str(count)]
+        env: Dict[str, str] = dict(environ)
+        if backend is not None:
+            env["INFERENCE_BACKEND"] = backend
+
+        # Run it and read the output
+        res: Any = run([executable, abspath(__file__)] + argv[1:] + stage_args, env=env, stdout=stderr)
+        if res.returncode != 0:
+            raise RuntimeError(f"The {stage} stage failed with the exit code {res.returncode}.")
+        with open(output) as output_file:
+            return loads(output_file.read())
+
+
+
+
+
+
+def write_output(output: Union[str, None], data: Any) -> None:
+    """Writes the data in JSON format into the provided file or stdout.
+
+    Args:
+        output: Union[str, None]
+            The file the data is written to. If None, it is written to stdout.
+        data: Any
+    """
+    content: str = dumps(data, indent=4)
+    if output is None:
+        stdout.write(content + "\n")
+    else:
+        with open(output, "w") as output_file:
+            output_file.write(content)
+
+
+
+
+
+
+def get_peak_rss() -> float:
+    """Retrieves the peak resident set size of the process in megabytes.
+
+    Returns:
+        float
+    """
+    return round(getrusage(RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+
+
+
+
+
+def get_commit() -> Union[str, None]:
+    """Retrieves the current commit so the runs can be compared.
+
+    Returns:
+        Union[str, None]
+    """
+    try:
+        res: Any = run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=dirname(abspath(__file__)))
+        return res.stdout.strip() if res.returncode == 0 else None
+    except Exception:
+        return None
+
+
+
+
+
+
+def parse_args() -> Namespace:
+    """Parses the arguments of the benchmark.
+
+    Returns:
+        Namespace
+    """
+    parser: ArgumentParser = ArgumentParser(description="Offline benchmark of the prediction path.")
+    parser.add_argument("--regressions", type=int, nargs="+", default=[4, 8, 16],
+        help="The number of regressions of each benchmarked model.")
+    parser.add_argument("--backends", choices=["numpy", "tensorflow"], nargs="+", default=[ENV["INFERENCE_BACKEND"]],
+        help="The inference backends to benchmark. Defaults to the INFERENCE_BACKEND.")
+    parser.add_argument("--architecture", choices=["dense", "lstm", "conv"], default="lstm",
+        help="The architecture of the synthetic regressions.")
+    parser.add_argument("--lookback", type=int, default=100)
+    parser.add_argument("--predictions", type=int, default=30)
+    parser.add_argument("--sma-window-size", type=int, default=100)
+    parser.add_argument("--targets", choices=["model", "client", "waitress"], nargs="+", default=["model", "client"],
+        help="The paths to benchmark: PredictionModel.predict, the Flask test client or a local waitress server.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--requests", type=int, default=500, help="The number of measured requests per run.")
+    parser.add_argument("--warmup", type=int, default=20, help="The number of requests executed before measuring.")
+    parser.add_argument("--output", type=str, default=None, help="The file the JSON report is written to.")
+
+    # Options of the stages that run in their own process
+    parser.add_argument("--stage", choices=["generate", "run"], default=None, help=SUPPRESS)
+    parser.add_argument("--model-path", type=str, default=None, help=SUPPRESS)
+    return parser.parse_args()
+
+
+
+
+
+
+if __name__ == "__main__":
+    args: Namespace = parse_args()
+
+    # Generate the regressions. TensorFlow is imported in this process only
+    if args.stage == "generate":
+        write_output(args.output, generate_regressions(
+            args.model_path, max(args.regressions), args.lookback, args.predictions, args.architecture
+        ))
+
+    # Benchmark a model with the first regressions
+    elif args.stage == "run":
+        Regression.MODEL_PATH = args.model_path
+        write_output(args.output, benchmark_regressions(
+            args, [get_regression_id(args.architecture, i) for i in range(args.regressions[0])]
+        ))
+
+    # Generate the regressions in a temporary model path and benchmark each backend
+    # and number of regressions in its own process
+    else:
+        results: List[Dict[str, Any]] = []
+        with TemporaryDirectory() as model_path:
+            run_stage("generate", model_path)
+            for backend in args.backends:
+                for count in args.regressions:
+                    results.append(run_stage("run", model_path, backend, count))
+
+        # Output the report
+        write_output(args.output, {
+            "commit": get_commit(),
+            "python": python_version.split(" ")[0],
+            "config": {
+                "architecture": args.architecture,
+                "lookback": args.lookback,
+                "predictions": args.predictions,
+                "sma_window_size": args.sma_window_size,
+                "requests": args.requests,
+                "warmup": args.warmup
+            },
+            "results": results
+        })
\ No newline at end of file
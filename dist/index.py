@@ -1,12 +1,17 @@
-from typing import Union
+from typing import Union, List, Iterator, Dict, Any
 from os.path import isfile
-from flask import Flask, jsonify, request
-from modules._types import IPrediction, IRequestGuardResult
+from time import perf_counter
+from numpy import ndarray
+from flask import Flask, Response, jsonify, request
+from modules._types import IPrediction, IRequestGuardResult, IBatchRequestGuardResult, IBatchPrediction, \
+    IStreamRequestGuardResult, IAPIResponse, IPredictionCacheStats, IApiErrorWriterStats
 from modules.utils.Utils import Utils
 from modules.environment.Environment import ENV
-from modules.guard.Guard import check_request
-from modules.api_error.ApiError import log
+from modules.guard.Guard import check_request, check_batch_request, check_stream_request
+from modules.api_error.ApiError import log, get_stats as get_api_error_stats
 from modules.epoch.Epoch import Epoch
+from modules.metrics.Metrics import Metrics, ILabels
+from modules.codec.Codec import loads_json, dumps_json, decode_close_prices, encode_prediction
 
 
 
@@ -32,9 +37,18 @@ def predict():
     """Verifies the active epoch's integrity and makes any neccessary adjustments.
     Afterwards, it generates and prediction and returns it.
 
+    The close prices can also be sent as raw little-endian floats (content-type:
+    application/octet-stream), in which case the epoch id is sent in the headers.
+    If the client accepts application/octet-stream, the prediction is returned in
+    its binary form. Errors are always returned as JSON.
+
     Header:
         secret-key: str
             The secret required for the Core API to communicate with the Prediction API.
+        epoch-id: str
+            The identifier of the Epoch (binary requests only).
+        close-prices-dtype: str
+            float64 | float32 (binary requests only). Defaults to float64.
 
     Args:
         epoch_id: str
@@ -43,17 +57,35 @@ def predict():
             The list of close prices that will be used to build the input dataset.
 
     Returns:
-        IAPIResponse<IPrediction>
+        IAPIResponse<IPrediction> | bytes
     """
-    # Extract the request
-    req_data: dict = request.get_json()
+    # Start measuring the request
+    start: float = perf_counter()
+
+    # Extract the request. Binary close prices are read without being copied
+    with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict", "stage": "parse" }):
+        if request.mimetype == "application/octet-stream":
+            epoch_id: Union[str, None] = request.headers.get("epoch-id")
+            close_prices: Union[List[float], ndarray, None] = decode_close_prices(
+                request.get_data(), 
+                request.headers.get("close-prices-dtype")
+            )
+        else:
+            req_data: dict = _get_json_body()
+            epoch_id = req_data.get("epoch_id")
+            close_prices = req_data.get("close_prices")
+        binary: bool = request.accept_mimetypes.best_match(
+            ["application/json", "application/octet-stream"]
+        ) == "application/octet-stream"
 
     # Firstly, check the request
-    req: IRequestGuardResult = check_request(
-        secret=request.headers.get("secret-key"),
-        epoch_id=req_data.get("epoch_id"),
-        close_prices=req_data.get("close_prices")
-    )
+    with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict", "stage": "guard" }):
+        req: IRequestGuardResult = check_request(
+            secret=request.headers.get("secret-key"),
+            epoch_id=epoch_id,
+            close_prices=close_prices,
+            window_size=Epoch.get_window_size(epoch_id)
+        )
 
     # Ensure the request can proceed
     if not isinstance(req["error"], str):
@@ -66,7 +98,7 @@ def predict():
             )
 
             # Return it wrapped in an API Response
-            return jsonify(Utils.api_response(pred))
+            return _respond("predict", start, Utils.api_response(pred), binary)
 
         # If an error is raised, save the error and return it in an API response
         except Exception as e:
@@ -74,11 +106,376 @@ def predict():
             log("PredictionAPI.predict", e)
 
             # Return the api error response
-            return jsonify(Utils.api_response(error=e))
+            return _respond("predict", start, Utils.api_response(error=e))
+
+    # Otherwise, return the error
+    else:
+        return _respond("predict", start, Utils.api_response(error=req["error"]))
+
+
+
+
+
+
+
+
+
+# Stream Predict Route
+# This route generates predictions based on a stream of close prices. Rather than
+# sending the full window on every request, the Core API pushes the newest close
+# prices and the Prediction Model keeps the rest.
+@app.route("/predict/stream", methods=["POST"])
+def predict_stream():
+    """Verifies the active epoch's integrity, pushes the newest close prices into
+    the stream and generates a prediction. If the stream is out of sync (the API 
+    was restarted, the Epoch changed or a candlestick was missed), the error 503003
+    is returned and the full window must be sent in order to resync.
+
+    Header:
+        secret-key: str
+            The secret required for the Core API to communicate with the Prediction API.
+
+    Args:
+        epoch_id: str
+            The identifier of the Epoch.
+        stream_id: str
+            The identifier of the stream. F.e: the symbol.
+        seq: int
+            The sequence number of the last close price. It must increase by 1 on 
+            every candlestick.
+        close_prices: List[float]
+            The newest close prices or the full window when resyncing.
+
+    Returns:
+        IAPIResponse<IPrediction>
+    """
+    # Start measuring the request
+    start: float = perf_counter()
+
+    # Extract the request
+    with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict_stream", "stage": "parse" }):
+        req_data: dict = _get_json_body()
+
+    # Firstly, check the request
+    with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict_stream", "stage": "guard" }):
+        req: IStreamRequestGuardResult = check_stream_request(
+            secret=request.headers.get("secret-key"),
+            epoch_id=req_data.get("epoch_id"),
+            stream_id=req_data.get("stream_id"),
+            seq=req_data.get("seq"),
+            close_prices=req_data.get("close_prices")
+        )
+
+    # Ensure the request can proceed
+    if not isinstance(req["error"], str):
+        # Generate the prediction safely
+        try:
+            # Generate the prediction
+            pred: IPrediction = Epoch.generate_stream_prediction(
+                epoch_id=req["epoch_id"],
+                stream_id=req["stream_id"],
+                seq=req["seq"],
+                close_prices=req["close_prices"]
+            )
+
+            # Return it wrapped in an API Response
+            return _respond("predict_stream", start, Utils.api_response(pred))
+
+        # If an error is raised, save the error and return it in an API response
+        except Exception as e:
+            # Log the api error
+            log("PredictionAPI.predict_stream", e)
+
+            # Return the api error response
+            return _respond("predict_stream", start, Utils.api_response(error=e))
+
+    # Otherwise, return the error
+    else:
+        return _respond("predict_stream", start, Utils.api_response(error=req["error"]))
+
+
+
+
+
+
+
+
+
+# Batch Predict Route
+# This route generates a prediction for each one of the provided windows. It is
+# meant to be used when replaying or backtesting an Epoch against history.
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Verifies the active epoch's integrity and generates a prediction for each
+    window. The windows can be provided as a list or as a series of close prices
+    and a stride. Errors that only affect a window are reported within its result.
+
+    Header:
+        secret-key: str
+            The secret required for the Core API to communicate with the Prediction API.
+
+    Args:
+        epoch_id: str
+            The identifier of the Epoch.
+        close_prices_batch: Optional[List[List[float]]]
+            The list of close price windows.
+        close_prices: Optional[List[float]]
+            The series of close prices that will be split into windows.
+        stride: Optional[int]
+            The number of prices between the start of each window in the series.
+
+    Returns:
+        IAPIResponse<List[IBatchPrediction]>
+    """
+    # Start measuring the request
+    start: float = perf_counter()
+
+    # Extract the request
+    with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict_batch", "stage": "parse" }):
+        req_data: dict = _get_json_body()
+
+    # Firstly, check the request
+    with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict_batch", "stage": "guard" }):
+        req: IBatchRequestGuardResult = check_batch_request(
+            secret=request.headers.get("secret-key"),
+            epoch_id=req_data.get("epoch_id"),
+            close_prices_batch=req_data.get("close_prices_batch"),
+            close_prices=req_data.get("close_prices"),
+            stride=req_data.get("stride")
+        )
+
+    # Ensure the request can proceed
+    if not isinstance(req["error"], str):
+        # Generate the predictions safely
+        try:
+            # Predict the series
+            if req["close_prices_batch"] is None:
+                preds: List[IBatchPrediction] = Epoch.generate_batch_prediction(
+                    epoch_id=req["epoch_id"],
+                    close_prices=req["close_prices"],
+                    stride=req["stride"]
+                )
+
+            # Predict the valid windows and merge the ones that failed the guard
+            else:
+                valid_windows: List[ndarray] = [
+                    window for window, error in zip(req["close_prices_batch"], req["window_errors"]) if error is None
+                ]
+                valid_preds: Iterator[IBatchPrediction] = iter(Epoch.generate_batch_prediction(
+                    epoch_id=req["epoch_id"], 
+                    close_prices_batch=valid_windows
+                ))
+                preds = [next(valid_preds) if error is None else { "p": None, "e": error } for error in req["window_errors"]]
+
+            # Return them wrapped in an API Response
+            return _respond("predict_batch", start, Utils.api_response(preds))
+
+        # If an error is raised, save the error and return it in an API response
+        except Exception as e:
+            # Log the api error
+            log("PredictionAPI.predict_batch", e)
+
+            # Return the api error response
+            return _respond("predict_batch", start, Utils.api_response(error=e))
 
     # Otherwise, return the error
     else:
-        return jsonify(Utils.api_response(error=req["error"]))
+        return _respond("predict_batch", start, Utils.api_response(error=req["error"]))
+
+
+
+
+
+
+
+
+
+# Metrics Route
+# This route exposes the latency histograms and the counters of the API in the
+# Prometheus text format.
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Exports the metrics of the API. The secret can be provided in the secret-key
+    header or as a bearer token so it can be scraped by Prometheus.
+
+    Header:
+        secret-key: str
+        authorization: str
+            The secret required to retrieve the metrics (Bearer <secret>).
+
+    Returns:
+        str (text/plain)
+    """
+    # Validate the provided secret
+    secret: Union[str, None] = request.headers.get("secret-key")
+    authorization: str = request.headers.get("authorization", "")
+    if secret is None and authorization.startswith("Bearer "):
+        secret = authorization[len("Bearer "):]
+    if not isinstance(secret, str) or secret != ENV["FLASK_SECRET_KEY"]:
+        return jsonify(Utils.api_response(error="The secret provided in the request is invalid.")), 401
+
+    # Export the metrics
+    return Response(Metrics.export(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+
+
+
+
+
+
+
+# Request Helper
+# Parses the JSON body of a prediction route.
+def _get_json_body() -> dict:
+    """Parses the body of the request. If it is not a valid JSON object, an empty
+    dict is returned so the guard reports the missing arguments.
+
+    Returns:
+        dict
+    """
+    try:
+        body: Any = loads_json(request.get_data())
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+
+
+
+
+
+
+
+# Response Helper
+# Serializes the API Response of a prediction route and records its metrics.
+def _respond(route: str, start: float, response: IAPIResponse, binary: bool = False) -> Response:
+    """Serializes an API Response and records the serialization and total duration
+    of the request. If the response is an error, it is counted by code.
+
+    Args:
+        route: str
+            The name of the route.
+        start: float
+            The time in which the request started (perf_counter).
+        response: IAPIResponse
+            The response to be returned.
+        binary: bool
+            If True, a successful prediction is returned in its binary form.
+
+    Returns:
+        Response
+    """
+    # Count the error (if any)
+    if response["error"] is not None:
+        Metrics.increment_error(response["error"])
+
+    # Serialize the response
+    with Metrics.timer("prediction_api_stage_duration_seconds", { "route": route, "stage": "serialize" }):
+        if binary and response["success"]:
+            res: Response = Response(encode_prediction(response["data"]), mimetype="application/octet-stream")
+        else:
+            res = Response(dumps_json(response), mimetype="application/json")
+
+    # Finally, record the total duration and return the response
+    Metrics.observe("prediction_api_stage_duration_seconds", perf_counter() - start, { "route": route, "stage": "total" })
+    return res
+
+
+
+
+
+
+
+
+
+# Cache Requests Collector
+# The counters of the prediction cache are kept by the cache itself and are only
+# read when the metrics are exported.
+def _collect_cache_requests() -> Dict[ILabels, float]:
+    """Retrieves the number of prediction cache lookups by result.
+
+    Returns:
+        Dict[ILabels, float]
+        The number of hits and misses, labeled by result.
+    """
+    stats: IPredictionCacheStats = Epoch.CACHE.get_stats()
+    return { (("result", "hit"),): stats["hits"], (("result", "miss"),): stats["misses"] }
+
+
+
+
+
+
+
+
+
+# Cache Size Collector
+# Reports the number of predictions stored in the cache when the metrics are exported.
+def _collect_cache_size() -> Dict[ILabels, float]:
+    """Retrieves the number of predictions stored in the prediction cache.
+
+    Returns:
+        Dict[ILabels, float]
+        The size of the cache, without labels.
+    """
+    return { (): Epoch.CACHE.get_stats()["size"] }
+
+
+
+
+
+
+
+
+
+# Error Log Rows Collector
+# The counters of the api error writer are kept by the writer itself and are only
+# read when the metrics are exported.
+def _collect_error_log_rows() -> Dict[ILabels, float]:
+    """Retrieves the number of api error rows by outcome.
+
+    Returns:
+        Dict[ILabels, float]
+        The number of rows that were written, dropped and failed, labeled by outcome.
+    """
+    stats: IApiErrorWriterStats = get_api_error_stats()
+    return { (("outcome", outcome),): stats[outcome] for outcome in ("written", "dropped", "failed") }
+
+
+
+
+
+
+
+
+
+# Error Log Queue Size Collector
+# Reports the number of api error rows that are waiting to be written.
+def _collect_error_log_queue_size() -> Dict[ILabels, float]:
+    """Retrieves the number of api error rows waiting to be written.
+
+    Returns:
+        Dict[ILabels, float]
+        The size of the queue, without labels.
+    """
+    return { (): get_api_error_stats()["queued"] }
+
+
+
+
+
+
+
+
+
+# Metric Collectors
+# The collectors are invoked every time the metrics are exported.
+Metrics.register_collector("prediction_api_cache_requests_total", _collect_cache_requests)
+Metrics.register_collector("prediction_api_cache_size", _collect_cache_size)
+Metrics.register_collector("prediction_api_error_log_rows_total", _collect_error_log_rows)
+Metrics.register_collector("prediction_api_error_log_queue_size", _collect_error_log_queue_size)
 
 
 
@@ -92,12 +489,8 @@ def predict():
 # Exposes the Prediction API to the Core API and displays general information about what is
 # being served.
 if __name__ == "__main__":
-    from waitress import serve
+    from socket import create_server
     from paste.translogger import TransLogger
-    from tensorflow import config, __version__ as tf_version
-
-    # Initialize the # of GPUs available
-    gpus_available: int = len(config.list_physical_devices("GPU"))
 
     # Retrieve the version of the API
     api_version: str = ""
@@ -109,8 +502,9 @@ if __name__ == "__main__":
     # Welcome Message
     Utils.print("Prediction API Initialized")
     Utils.print(f"Running: v{api_version}")
-    Utils.print(f"TensorFlow: v{tf_version}")
+    Utils.print(f"Inference Backend: {ENV['INFERENCE_BACKEND']}")
     Utils.print(f"Port: {ENV['PORT']}")
+    Utils.print(f"Workers: {ENV['WORKERS']}")
     Utils.print(f"Production: {ENV['production']}")
     if ENV["test_mode"]:
         Utils.print("Test Mode: True")
@@ -118,7 +512,38 @@ if __name__ == "__main__":
         Utils.print("Debug Mode: True")
     if ENV["restore_mode"]:
         Utils.print("Restore Mode: True")
-    Utils.print(f"GPUs Available: {gpus_available}")
 
-    # Serve the API
-    serve(TransLogger(app, setup_console_handler=False), host=ENV["FLASK_RUN_HOST"], port=ENV["PORT"])
\ No newline at end of file
+    # Serve the API from several worker processes. The master must not import
+    # TensorFlow as it cannot be used across a fork
+    if ENV["WORKERS"] > 1:
+        from modules.prefork.PreforkServer import PreforkServer
+        PreforkServer(
+            TransLogger(app, setup_console_handler=False), 
+            ENV["FLASK_RUN_HOST"], 
+            ENV["PORT"], 
+            ENV["WORKERS"]
+        ).run()
+
+    # Otherwise, serve it from a single process
+    else:
+        # TensorFlow is only imported when it is the inference backend
+        if ENV["INFERENCE_BACKEND"] == "tensorflow":
+            from tensorflow import config, __version__ as tf_version
+            Utils.print(f"TensorFlow: v{tf_version}")
+            Utils.print(f"GPUs Available: {len(config.list_physical_devices('GPU'))}")
+
+        # Load and warm up the active epoch, then watch for new ones
+        try:
+            Utils.print(f"Epoch: {Epoch.initialize()}")
+        except Exception as e:
+            log("PredictionAPI.initialize", e)
+            Utils.print(f"Epoch: The active epoch could not be initialized: {str(e)}")
+        Epoch.start_watcher()
+
+        # Serve the API. On SIGTERM, the requests in progress are responded before
+        # returning, so the pending api errors are flushed when the process exits
+        from modules.prefork.PreforkServer import PreforkServer
+        PreforkServer.serve(
+            TransLogger(app, setup_console_handler=False), 
+            create_server((ENV["FLASK_RUN_HOST"], ENV["PORT"]), backlog=2048)
+        )
\ No newline at end of file
@@ -7,4 +7,5 @@ from modules._types.keras_utils_types import *
 from modules._types.regression_types import *
 from modules._types.prediction_model_types import *
 from modules._types.epoch_types import *
-from modules._types.guard_types import *
\ No newline at end of file
+from modules._types.guard_types import *
+from modules._types.prediction_cache_types import *
\ No newline at end of file
@@ -12,4 +12,17 @@ class IApiErrorRecord(TypedDict):
     c: int              # Creation Time in Milliseconds
     uid: Optional[str]  # Request Sender UID
     ip: Optional[str]   # Request Sender IP
-    p: Optional[dict]   # Params in json format used to trigger the error - Should be converted into a dictionary when retrieving
\ No newline at end of file
+    p: Optional[dict]   # Params in json format used to trigger the error - Should be converted into a dictionary when retrieving
+
+
+
+
+
+
+# API Error Writer Stats
+# The state of the queue used to write the API Errors asynchronously.
+class IApiErrorWriterStats(TypedDict):
+    queued: int     # Rows waiting to be written
+    written: int    # Rows written into the database
+    dropped: int    # Rows dropped because the queue was full
+    failed: int     # Rows lost because the write failed
\ No newline at end of file
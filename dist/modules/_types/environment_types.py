@@ -1,4 +1,12 @@
-from typing import TypedDict
+from typing import TypedDict, Literal
+
+
+
+
+# Inference Backend
+# The engine used to run the regressions' forward pass. The numpy backend does not
+# depend on TensorFlow.
+IInferenceBackend = Literal["tensorflow", "numpy"]
 
 
 
@@ -13,5 +21,15 @@ class IEnvironment(TypedDict):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
+    POSTGRES_POOL_MIN_SIZE: int
+    POSTGRES_POOL_MAX_SIZE: int
+    FLASK_RUN_HOST: str
     FLASK_SECRET_KEY: str
-    PORT: int
\ No newline at end of file
+    PORT: int
+    INFERENCE_BACKEND: IInferenceBackend
+    PREDICTION_CACHE_CAPACITY: int  # Number of predictions kept in memory. 0 disables the cache
+    PREDICTION_CACHE_TTL: int       # Seconds a prediction remains valid
+    EPOCH_POLL_INTERVAL: int        # Seconds between active epoch checks. 0 disables the watcher
+    MICRO_BATCH_MAX_SIZE: int       # Max rows coalesced into a single inference. 0 or 1 disables micro-batching
+    MICRO_BATCH_MAX_WAIT_MS: int    # Max milliseconds a micro-batch waits to fill up
+    WORKERS: int                    # Number of worker processes. 1 serves from a single process
\ No newline at end of file
@@ -1,4 +1,5 @@
 from typing import TypedDict, List, Union
+from numpy import ndarray
 
 
 
@@ -13,5 +14,55 @@ class IRequestGuardResult(TypedDict):
     # Epoch ID
     epoch_id: Union[str, None]
 
-    # The list of synced close prices
-    close_prices: List[float]
\ No newline at end of file
+    # The synced close prices
+    close_prices: Union[ndarray, None]
+
+
+
+
+
+
+# Batch Request Guard Result
+# The batch prediction accepts a list of windows or a series of close prices that
+# is split into windows with a stride. Errors that affect the whole request are
+# placed in the error property while the invalid windows are reported individually.
+class IBatchRequestGuardResult(TypedDict):
+    # If this value is a string means there is an error and the request cannot be processed.
+    error: Union[str, None]
+
+    # Epoch ID
+    epoch_id: Union[str, None]
+
+    # The list of close price windows. Invalid windows are set to None
+    close_prices_batch: Union[List[Union[ndarray, None]], None]
+
+    # The errors of each window. None means the window is valid
+    window_errors: Union[List[Union[str, None]], None]
+
+    # The series of close prices and the stride between windows
+    close_prices: Union[ndarray, None]
+    stride: Union[int, None]
+
+
+
+
+
+
+# Stream Request Guard Result
+# The streaming prediction receives the newest close prices of a stream and the
+# sequence number of the last one.
+class IStreamRequestGuardResult(TypedDict):
+    # If this value is a string means there is an error and the request cannot be processed.
+    error: Union[str, None]
+
+    # Epoch ID
+    epoch_id: Union[str, None]
+
+    # The identifier of the stream
+    stream_id: Union[str, None]
+
+    # The sequence number of the last close price
+    seq: Union[int, None]
+
+    # The newest close prices
+    close_prices: Union[ndarray, None]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from typing import TypedDict
+
+
+
+
+# Prediction Cache Stats
+# The state of the prediction cache and the counters since the API started.
+class IPredictionCacheStats(TypedDict):
+    # Configuration
+    capacity: int
+    ttl: int
+
+    # Number of predictions currently stored
+    size: int
+
+    # Lookup counters
+    hits: int
+    misses: int
+
+    # Number of predictions discarded because of the capacity or the ttl
+    evictions: int
\ No newline at end of file
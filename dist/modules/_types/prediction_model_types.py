@@ -133,6 +133,21 @@ class IPrediction(TypedDict):
 
 
 
+# Batch Prediction
+# The result of a window within a batch prediction. If the window could not be 
+# predicted, the prediction is None and the error is populated instead.
+class IBatchPrediction(TypedDict):
+    # The prediction generated for the window
+    p: Union[IPrediction, None]
+
+    # The error that prevented the window from being predicted
+    e: Union[str, None]
+
+
+
+
+
+
 
 
 
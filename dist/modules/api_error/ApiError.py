@@ -1,6 +1,37 @@
-from typing import Union, Any
+from typing import Union, Any, List, Tuple
+from atexit import register
+from modules._types import IApiErrorWriterStats
 from modules.utils.Utils import Utils
-from modules.database.Database import TN, write_query
+from modules.database.Database import TN, write_many
+from modules.api_error.ApiErrorWriter import ApiErrorWriter
+
+
+
+
+
+
+
+
+
+
+def _write_errors(rows: List[Tuple[Any]]) -> None:
+    """Inserts a batch of API Errors into the Database in a single statement.
+
+    Args:
+        rows: List[Tuple[Any]]
+            The list of API Error rows (o, e, c, uid, ip, p).
+    """
+    write_many(f"INSERT INTO {TN['api_errors']}(o, e, c, uid, ip, p) VALUES %s", rows)
+
+
+
+
+
+# Writer
+# The API Errors are queued in memory and written in batches by a background thread.
+# The pending errors are flushed when the process exits.
+WRITER: ApiErrorWriter = ApiErrorWriter(_write_errors)
+register(WRITER.flush)
 
 
 
@@ -12,11 +43,12 @@ from modules.database.Database import TN, write_query
 
 
 def log(origin: str, error: Any, params: Union[dict, None] = None) -> None:
-    """Saves an API Error Into the Database. Notice that the uid and ip parameters are not meant to
-    be provided as these values are only relevant in the Core API.
+    """Queues an API Error to be saved into the Database. Notice that the uid and ip parameters 
+    are not meant to be provided as these values are only relevant in the Core API.
 
     IMPORTANT: This function is executed safely even if an error is raised, the function will
-    complete and the error will be printed on the console.
+    complete and the error will be printed on the console. Since the error is written 
+    asynchronously, flush must be invoked in order to ensure it has been saved.
 
     Args:
         origin: str
@@ -27,9 +59,30 @@ def log(origin: str, error: Any, params: Union[dict, None] = None) -> None:
             The parameters that triggered the error.
     """
     try:
-        write_query(
-            f"INSERT INTO {TN['api_errors']}(o, e, c, uid, ip, p) VALUES (%s, %s, %s, %s, %s, %s)",
-            (origin, str(error), Utils.get_time(), None, None, params)
-        )
+        if not WRITER.put((origin, str(error), Utils.get_time(), None, None, params)):
+            Utils.print(f"API Error was not logged because the queue is full: {str(error)}")
     except Exception as e:
-        Utils.print(f"API Error was not logged: {str(e)}")
\ No newline at end of file
+        Utils.print(f"API Error was not logged: {str(e)}")
+
+
+
+
+
+
+def flush() -> None:
+    """Writes all the queued API Errors into the Database.
+    """
+    WRITER.flush()
+
+
+
+
+
+
+def get_stats() -> IApiErrorWriterStats:
+    """Retrieves the state of the API Errors queue.
+
+    Returns:
+        IApiErrorWriterStats
+    """
+    return WRITER.get_stats()
\ No newline at end of file
@@ -0,0 +1,282 @@
+from typing import Any, Callable, List, Tuple, Union
+from os import register_at_fork
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+from weakref import WeakSet
+from modules._types import IApiErrorWriterStats
+from modules.utils.Utils import Utils
+
+
+
+
+
+
+class ApiErrorWriter:
+    """ApiErrorWriter Class
+
+    This class queues the API Errors in memory and writes them in batches from a
+    background thread, so the requests that fail are not blocked by the database.
+    If the queue is full, the new errors are dropped and counted.
+
+    Instance Properties:
+        write_fn: Callable[[List[Tuple[Any]]], None]
+            The function that writes a batch of rows into the database.
+        capacity: int
+            The maximum number of rows that can be queued.
+        batch_size: int
+            The maximum number of rows written in a single batch.
+        flush_interval: float
+            The number of seconds the worker waits for new errors before checking
+            if it should stop.
+        queue: Queue
+            The queue of pending rows.
+        worker: Union[Thread, None]
+            The thread that writes the batches. It is started with the first error.
+        lock: Lock
+            The lock used to start the worker and update the counters.
+        written: int
+        dropped: int
+        failed: int
+            The number of rows that were written, dropped because the queue was full
+            and lost because the write failed.
+    """
+    # The instances that are reset in forked processes. The references are weak so
+    # the writers can still be garbage collected
+    INSTANCES: WeakSet = WeakSet()
+
+
+
+
+
+
+    ####################
+    ## Initialization ##
+    ####################
+
+
+
+    def __init__(
+        self,
+        write_fn: Callable[[List[Tuple[Any]]], None],
+        capacity: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 1
+    ):
+        """Initializes the API Error Writer Instance.
+
+        Args:
+            write_fn: Callable[[List[Tuple[Any]]], None]
+                The function that writes a batch of rows into the database.
+            capacity: int
+                The maximum number of rows that can be queued.
+            batch_size: int
+                The maximum number of rows written in a single batch.
+            flush_interval: float
+                The number of seconds the worker waits for new errors.
+        """
+        self.write_fn: Callable[[List[Tuple[Any]]], None] = write_fn
+        self.capacity: int = capacity
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.queue: Queue = Queue(maxsize=capacity)
+        self.worker: Union[Thread, None] = None
+        self.lock: Lock = Lock()
+        self.written: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+
+        # Forked processes start with an empty writer
+        ApiErrorWriter.INSTANCES.add(self)
+
+
+
+
+
+
+    def _reset(self) -> None:
+        """Discards the state inherited from the parent process. The queued rows
+        are written by the parent and the worker thread does not exist in the child.
+        """
+        self.queue = Queue(maxsize=self.capacity)
+        self.worker = None
+        self.lock = Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+
+
+
+
+
+    @staticmethod
+    def _reset_after_fork() -> None:
+        """Resets all the instances that exist in a forked process.
+        """
+        for writer in list(ApiErrorWriter.INSTANCES):
+            writer._reset()
+
+
+
+
+
+
+
+
+
+
+
+    #############
+    ## Writing ##
+    #############
+
+
+
+
+
+    def put(self, row: Tuple[Any]) -> bool:
+        """Queues a row to be written. If the queue is full, the row is dropped.
+
+        Args:
+            row: Tuple[Any]
+                The row to be written.
+
+        Returns:
+            bool
+            True if the row was queued.
+        """
+        # Make sure the worker is running
+        self._start_worker()
+
+        # Queue the row
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+
+
+
+
+
+    def flush(self) -> None:
+        """Writes all the pending rows from the current thread and waits for the
+        rows that are being written by the worker.
+        """
+        # Write the pending rows
+        while self._write_batch(block=False):
+            pass
+
+        # Wait for the rows that were taken by the worker
+        self.queue.join()
+
+
+
+
+
+
+    def get_stats(self) -> IApiErrorWriterStats:
+        """Retrieves the state and the counters of the writer.
+
+        Returns:
+            IApiErrorWriterStats
+        """
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed
+            }
+
+
+
+
+
+
+
+
+
+
+
+    ############
+    ## Worker ##
+    ############
+
+
+
+
+
+    def _start_worker(self) -> None:
+        """Starts the background thread if it is not running.
+        """
+        if self.worker is None or not self.worker.is_alive():
+            with self.lock:
+                if self.worker is None or not self.worker.is_alive():
+                    self.worker = Thread(target=self._work, name="ApiErrorWriter", daemon=True)
+                    self.worker.start()
+
+
+
+
+
+
+    def _work(self) -> None:
+        """Writes the queued rows in batches for as long as the process runs.
+        """
+        while True:
+            self._write_batch(block=True)
+
+
+
+
+
+
+    def _write_batch(self, block: bool) -> bool:
+        """Takes up to batch_size rows from the queue and writes them. Errors are
+        printed and counted, they are never raised.
+
+        Args:
+            block: bool
+                If True, it waits up to flush_interval seconds for the first row.
+
+        Returns:
+            bool
+            True if any rows were taken from the queue.
+        """
+        # Gather the batch
+        batch: List[Tuple[Any]] = []
+        try:
+            batch.append(self.queue.get(block=block, timeout=self.flush_interval if block else None))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except Empty:
+            pass
+        if len(batch) == 0:
+            return False
+
+        # Write it
+        try:
+            self.write_fn(batch)
+            with self.lock:
+                self.written += len(batch)
+        except Exception as e:
+            with self.lock:
+                self.failed += len(batch)
+            Utils.print(f"{len(batch)} API Errors were not logged: {str(e)}")
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+        return True
+
+
+
+
+
+
+# Fork Safety
+# Forked processes start with empty writers.
+register_at_fork(after_in_child=ApiErrorWriter._reset_after_fork)
\ No newline at end of file
@@ -0,0 +1,254 @@
+from typing import Callable, List, Tuple, Union
+from os import getpid
+from queue import Queue, Empty
+from threading import Thread, Lock
+from concurrent.futures import Future
+from time import monotonic
+from numpy import ndarray, concatenate
+from modules.metrics.Metrics import Metrics
+
+
+
+
+
+
+class BatchDispatcher:
+    """BatchDispatcher Class
+
+    This class coalesces the input rows of concurrent requests so the ensemble is
+    invoked once per batch rather than once per request. The requests enqueue their
+    rows and wait while a single worker gathers them until the batch is full or the
+    max wait has elapsed, predicts the stacked batch and hands each row back.
+    Once stopped (f.e. the model was swapped), the requests are predicted inline.
+
+    Instance Properties:
+        predict_fn: Callable[[ndarray], ndarray]
+            The function that predicts a batch of input rows (rows, lookback) and
+            returns one result per row.
+        max_size: int
+            The maximum number of rows in a batch.
+        max_wait: float
+            The maximum number of seconds the worker waits for a batch to fill up
+            once it has received its first row.
+        queue: Queue
+            The queue of pending (input_ds, future) tuples. None signals the worker
+            to stop.
+        worker: Union[Thread, None]
+        worker_pid: Union[int, None]
+            The thread that predicts the batches and the process that started it.
+            The worker is restarted if the process was forked.
+        lock: Lock
+            The lock used to start the worker and to enqueue rows.
+        stopped: bool
+            If True, the requests are predicted inline.
+    """
+
+
+
+
+
+
+    ####################
+    ## Initialization ##
+    ####################
+
+
+
+    def __init__(self, predict_fn: Callable[[ndarray], ndarray], max_size: int, max_wait: float):
+        """Initializes the Batch Dispatcher Instance.
+
+        Args:
+            predict_fn: Callable[[ndarray], ndarray]
+                The function that predicts a batch of input rows.
+            max_size: int
+                The maximum number of rows in a batch.
+            max_wait: float
+                The maximum number of seconds a batch waits to fill up.
+        """
+        self.predict_fn: Callable[[ndarray], ndarray] = predict_fn
+        self.max_size: int = max_size
+        self.max_wait: float = max_wait
+        self.queue: Queue = Queue()
+        self.worker: Union[Thread, None] = None
+        self.worker_pid: Union[int, None] = None
+        self.lock: Lock = Lock()
+        self.stopped: bool = False
+
+
+
+
+
+
+
+
+
+
+    ##############
+    ## Dispatch ##
+    ##############
+
+
+
+
+
+    def predict(self, input_ds: ndarray) -> ndarray:
+        """Enqueues the input rows and waits for their predictions. If the dispatcher
+        has been stopped, they are predicted in the current thread.
+
+        Args:
+            input_ds: ndarray
+                The input rows (rows, lookback). The array must not be modified until
+                the predictions are returned.
+
+        Returns:
+            ndarray
+            The predictions of the rows.
+
+        Raises:
+            Exception:
+                If the prediction of the batch fails.
+        """
+        # Enqueue the rows unless the dispatcher has been stopped
+        future: Union[Future, None] = None
+        with self.lock:
+            if not self.stopped:
+                self._start_worker()
+                future = Future()
+                self.queue.put((input_ds, future))
+
+        # Wait for the predictions or generate them inline
+        return future.result() if future is not None else self.predict_fn(input_ds)
+
+
+
+
+
+
+    def stop(self) -> None:
+        """Stops the worker once the enqueued rows have been predicted. The requests
+        received afterwards are predicted inline.
+        """
+        with self.lock:
+            if not self.stopped:
+                self.stopped = True
+                if self._is_worker_running():
+                    self.queue.put(None)
+
+
+
+
+
+
+
+
+
+
+    ############
+    ## Worker ##
+    ############
+
+
+
+
+
+    def _is_worker_running(self) -> bool:
+        """Checks if the worker is running in the current process.
+
+        Returns:
+            bool
+        """
+        return self.worker is not None and self.worker_pid == getpid() and self.worker.is_alive()
+
+
+
+
+
+
+    def _start_worker(self) -> None:
+        """Starts the worker if it is not running in the current process. This
+        function must be invoked while holding the lock.
+        """
+        if not self._is_worker_running():
+            # The queue of the parent process cannot be trusted after a fork
+            if self.worker_pid is not None and self.worker_pid != getpid():
+                self.queue = Queue()
+            self.worker = Thread(target=self._work, name="BatchDispatcher", daemon=True)
+            self.worker_pid = getpid()
+            self.worker.start()
+
+
+
+
+
+
+    def _work(self) -> None:
+        """Gathers and predicts batches until the dispatcher is stopped.
+        """
+        stop: bool = False
+        while not stop:
+            batch, stop = self._gather()
+            if len(batch) > 0:
+                self._predict_batch(batch)
+
+
+
+
+
+
+    def _gather(self) -> Tuple[List[Tuple[ndarray, Future]], bool]:
+        """Waits for the first rows and gathers the ones that arrive until the batch
+        is full or the max wait elapses.
+
+        Returns:
+            Tuple[List[Tuple[ndarray, Future]], bool]
+            (batch, stop)
+        """
+        # Wait for the first rows
+        item: Union[Tuple[ndarray, Future], None] = self.queue.get()
+        if item is None:
+            return [], True
+        batch: List[Tuple[ndarray, Future]] = [item]
+        rows: int = item[0].shape[0]
+
+        # Gather the rows that arrive within the max wait
+        deadline: float = monotonic() + self.max_wait
+        while rows < self.max_size:
+            try:
+                remaining: float = deadline - monotonic()
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            rows += item[0].shape[0]
+        return batch, False
+
+
+
+
+
+
+    def _predict_batch(self, batch: List[Tuple[ndarray, Future]]) -> None:
+        """Predicts the stacked rows of a batch and resolves the futures. If the
+        prediction fails, the error is set on every future.
+
+        Args:
+            batch: List[Tuple[ndarray, Future]]
+                The rows and the futures of the requests.
+        """
+        try:
+            # Predict the stacked rows
+            preds: ndarray = self.predict_fn(concatenate([input_ds for input_ds, _ in batch]))
+            Metrics.increment("prediction_api_micro_batches_total")
+            Metrics.increment("prediction_api_micro_batch_rows_total", value=preds.shape[0])
+
+            # Hand each request its rows
+            start: int = 0
+            for input_ds, future in batch:
+                future.set_result(preds[start:start + input_ds.shape[0]])
+                start += input_ds.shape[0]
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
\ No newline at end of file
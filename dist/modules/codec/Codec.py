@@ -0,0 +1,145 @@
+from typing import Any, Dict, Union
+from struct import Struct
+from json import loads as json_loads, dumps as json_dumps
+from numpy import ndarray, frombuffer, asarray, dtype as numpy_dtype
+from modules._types import IPrediction
+
+
+
+
+# JSON
+# orjson parses and serializes considerably faster than the standard library. If
+# it is not installed (f.e. local development), the standard library is used.
+try:
+    from orjson import loads as _loads, dumps as _dumps
+except ImportError:
+    _loads = json_loads
+    _dumps = lambda obj: json_dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+
+
+# Binary Close Prices
+# The close prices can be sent as raw little-endian floats. The precision is set
+# in the close-prices-dtype header.
+CLOSE_PRICES_DTYPES: Dict[str, str] = { "float64": "<f8", "float32": "<f4" }
+
+
+
+
+# Binary Prediction
+# The prediction is packed as r (int8), t (int64), s (float64) and the number of
+# features (uint32), followed by the features as little-endian float64.
+PREDICTION_HEADER: Struct = Struct("<bqdI")
+
+
+
+
+
+
+
+
+
+def loads_json(data: bytes) -> Any:
+    """Parses a JSON document.
+
+    Args:
+        data: bytes
+            The JSON document.
+
+    Returns:
+        Any
+
+    Raises:
+        ValueError:
+            If the document is not valid JSON.
+    """
+    return _loads(data)
+
+
+
+
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Serializes an object into a compact JSON document.
+
+    Args:
+        obj: Any
+            The object to serialize.
+
+    Returns:
+        bytes
+    """
+    return _dumps(obj)
+
+
+
+
+
+
+def decode_close_prices(data: bytes, dtype: Union[str, None]) -> Union[ndarray, None]:
+    """Decodes raw little-endian close prices without copying them. If the dtype is
+    not supported or the size of the data does not match it, it returns None.
+
+    Args:
+        data: bytes
+            The raw close prices.
+        dtype: Union[str, None]
+            float64 | float32. Defaults to float64.
+
+    Returns:
+        Union[ndarray, None]
+    """
+    # Make sure the dtype is supported
+    np_dtype: Union[str, None] = CLOSE_PRICES_DTYPES.get(dtype if dtype is not None else "float64")
+    if np_dtype is None:
+        return None
+
+    # Make sure the data contains whole values
+    if len(data) == 0 or len(data) % numpy_dtype(np_dtype).itemsize != 0:
+        return None
+
+    # Finally, return the read-only view of the data
+    return frombuffer(data, dtype=np_dtype)
+
+
+
+
+
+
+def encode_prediction(pred: IPrediction) -> bytes:
+    """Packs a prediction into its binary form.
+
+    Args:
+        pred: IPrediction
+            The prediction to pack.
+
+    Returns:
+        bytes
+    """
+    return PREDICTION_HEADER.pack(pred["r"], pred["t"], pred["s"], len(pred["f"])) + \
+        asarray(pred["f"], dtype="<f8").tobytes()
+
+
+
+
+
+
+def decode_prediction(data: bytes) -> IPrediction:
+    """Unpacks a prediction from its binary form.
+
+    Args:
+        data: bytes
+            The packed prediction.
+
+    Returns:
+        IPrediction
+    """
+    r, t, s, features = PREDICTION_HEADER.unpack_from(data)
+    return {
+        "r": r,
+        "t": t,
+        "f": frombuffer(data, dtype="<f8", count=features, offset=PREDICTION_HEADER.size).tolist(),
+        "s": s
+    }
\ No newline at end of file
@@ -1,6 +1,11 @@
-from typing import Any, Optional, Tuple, List
-from psycopg2 import connect
-from psycopg2.extras import RealDictCursor, Json
+from typing import Any, Optional, Tuple, List, Dict, Callable, Iterator, Union
+from os import register_at_fork
+from contextlib import contextmanager
+from threading import Lock, BoundedSemaphore
+from time import monotonic
+from psycopg2 import OperationalError, InterfaceError
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor, Json, execute_values
 from psycopg2.extensions import new_type, DECIMAL, register_type, register_adapter
 from modules._types import ITableNames
 from modules.environment.Environment import ENV
@@ -102,25 +107,181 @@ register_adapter(dict, Json)
 
 
 
-# Connection
-# Establishes a connection to the Database based on the environment variables.
-CONNECTION: Any = connect(
-    host=ENV["POSTGRES_HOST"],
-    user=ENV["POSTGRES_USER"],
-    password=ENV["POSTGRES_PASSWORD"],
-    database=ENV["POSTGRES_DB"],
-    port="5432"
-)
+# Connection Pool
+# The pool is created lazily the first time a connection is needed, so importing
+# this module does not require the database to be reachable. Each thread checks
+# out its own connection. The semaphore makes the threads wait for a connection
+# when the pool is exhausted rather than failing.
+POOL: Union[ThreadedConnectionPool, None] = None
+POOL_LOCK: Lock = Lock()
+POOL_SEMAPHORE: BoundedSemaphore = BoundedSemaphore(ENV["POSTGRES_POOL_MAX_SIZE"])
 
 
 
+# Inherited Pools
+# A forked process shares the sockets of the pool it inherited with its parent. 
+# Finalizing those connections would make psycopg2 send a termination message 
+# through the parent's sockets, so the inherited pools are kept referenced for as
+# long as the process runs and are never used.
+INHERITED_POOLS: List[ThreadedConnectionPool] = []
 
 
 
+# Health Check
+# Connections that have been idle for longer than the interval (seconds) are 
+# pinged before being used. Broken connections are discarded and read queries 
+# are retried once with a new connection.
+HEALTH_CHECK_INTERVAL: int = 30
+LAST_USED: Dict[int, float] = {}
 
-# Database Cursor
-# Initializes a Cursor that is ready to interact with the Database.
-#CURSOR: Any = CONNECTION.cursor(cursor_factory=DICT_CURSOR)
+
+
+
+
+
+
+
+def _get_pool() -> ThreadedConnectionPool:
+    """Retrieves the connection pool. If it doesn't exist, it is created based
+    on the environment variables.
+
+    Returns:
+        ThreadedConnectionPool
+    """
+    global POOL
+    with POOL_LOCK:
+        if POOL is None:
+            POOL = ThreadedConnectionPool(
+                ENV["POSTGRES_POOL_MIN_SIZE"],
+                ENV["POSTGRES_POOL_MAX_SIZE"],
+                host=ENV["POSTGRES_HOST"],
+                user=ENV["POSTGRES_USER"],
+                password=ENV["POSTGRES_PASSWORD"],
+                database=ENV["POSTGRES_DB"],
+                port="5432"
+            )
+        return POOL
+
+
+
+
+
+
+def close_pool() -> None:
+    """Closes all the connections in the pool. A new pool will be created if
+    a query is executed afterwards.
+    """
+    global POOL
+    with POOL_LOCK:
+        if POOL is not None:
+            POOL.closeall()
+            POOL = None
+            LAST_USED.clear()
+
+
+
+
+
+
+def _reset_pool() -> None:
+    """Replaces the pool inherited from the parent process. Dropping the last 
+    reference to it would finalize its connections (which still belong to the 
+    parent), so it is moved to INHERITED_POOLS instead. A new pool is created lazily.
+    """
+    global POOL, POOL_LOCK, POOL_SEMAPHORE
+    if POOL is not None:
+        INHERITED_POOLS.append(POOL)
+    POOL = None
+    POOL_LOCK = Lock()
+    POOL_SEMAPHORE = BoundedSemaphore(ENV["POSTGRES_POOL_MAX_SIZE"])
+    LAST_USED.clear()
+register_at_fork(after_in_child=_reset_pool)
+
+
+
+
+
+
+@contextmanager
+def _get_connection() -> Iterator[Any]:
+    """Checks out a healthy connection from the pool and returns it once the
+    block completes, even if it raises. If the connection breaks within the 
+    block, it is discarded.
+
+    Yields:
+        connection
+    """
+    POOL_SEMAPHORE.acquire()
+    conn: Any = None
+    broken: bool = False
+    try:
+        pool: ThreadedConnectionPool = _get_pool()
+        conn = pool.getconn()
+
+        # Ping the connection if it has been idle for too long
+        if conn.closed == 0 and monotonic() - LAST_USED.get(id(conn), monotonic()) > HEALTH_CHECK_INTERVAL:
+            try:
+                with conn.cursor() as curs:
+                    curs.execute("SELECT 1")
+                conn.rollback()
+            except (OperationalError, InterfaceError):
+                # The reference is cleared so the connection is not returned twice
+                # if a new one cannot be checked out
+                pool.putconn(conn, close=True)
+                conn = None
+                conn = pool.getconn()
+
+        # Discard connections that were closed by the server
+        if conn.closed != 0:
+            pool.putconn(conn, close=True)
+            conn = None
+            conn = pool.getconn()
+
+        # Execute the block
+        try:
+            yield conn
+        except (OperationalError, InterfaceError):
+            broken = True
+            raise
+    finally:
+        # Return the connection to the pool. Broken connections are closed
+        if conn is not None:
+            if broken or conn.closed != 0:
+                LAST_USED.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+            else:
+                LAST_USED[id(conn)] = monotonic()
+                pool.putconn(conn)
+        POOL_SEMAPHORE.release()
+
+
+
+
+
+
+def _execute(fn: Callable[[Any], Any], retry: bool = False) -> Any:
+    """Executes a function with a pooled connection. If the connection is broken
+    and the function can be retried, it is executed once more with a new connection.
+    Writes must not be retried as the connection could have broken after the 
+    commit went through.
+
+    Args:
+        fn: Callable[[Any], Any]
+            The function that interacts with the connection.
+        retry: bool
+            If True, the function is retried once when the connection is broken.
+
+    Returns:
+        Any
+    """
+    try:
+        with _get_connection() as conn:
+            return fn(conn)
+    except (OperationalError, InterfaceError):
+        if not retry:
+            raise
+        with _get_connection() as conn:
+            return fn(conn)
 
 
 
@@ -143,21 +304,21 @@ def read_query(text: str, values: Optional[Tuple[Any]] = None) -> List[Any]:
     Returns:
         List[Any]
     """
-    # Init the records
-    records: List[Any] = []
-
-    # Handle the case accordingly
-    if values:
-        with CONNECTION.cursor(name="db_cursor", cursor_factory=DICT_CURSOR) as curs:
-            curs.execute(text, values)
-            records = curs.fetchall()
-    else:
-        with CONNECTION.cursor(name="db_cursor", cursor_factory=DICT_CURSOR) as curs:
-            curs.execute(text)
-            records = curs.fetchall()
-    
-    # Return the Execution Response
-    return records
+    def _read(conn: Any) -> List[Any]:
+        try:
+            with conn.cursor(name="db_cursor", cursor_factory=DICT_CURSOR) as curs:
+                if values:
+                    curs.execute(text, values)
+                else:
+                    curs.execute(text)
+                return curs.fetchall()
+        finally:
+            # End the read transaction before the connection is returned to the pool
+            if conn.closed == 0:
+                conn.rollback()
+
+    # Return the Execution Response. Reads are safe to retry
+    return _execute(_read, retry=True)
 
 
 
@@ -176,19 +337,55 @@ def write_query(text: str, values: Optional[Tuple[Any]] = None) -> None:
         values: Optional[Tuple[Any]]
             The tuple of values to be used for the query substitutions.
     """
-    try:
-        # Handle the case accordingly
-        if values:
-            with CONNECTION.cursor(cursor_factory=DICT_CURSOR) as curs:
-                curs.execute(text, values)
-        else:
-            with CONNECTION.cursor(cursor_factory=DICT_CURSOR) as curs:
-                curs.execute(text)
-        
-        # Commit the write action
-        CONNECTION.commit()
-
-    # In the case of an error, roll back the execution and re-raise it
-    except Exception as e:
-        CONNECTION.rollback()
-        raise e
\ No newline at end of file
+    def _write(conn: Any) -> None:
+        try:
+            with conn.cursor(cursor_factory=DICT_CURSOR) as curs:
+                if values:
+                    curs.execute(text, values)
+                else:
+                    curs.execute(text)
+            
+            # Commit the write action
+            conn.commit()
+
+        # In the case of an error, roll back the execution and re-raise it
+        except Exception as e:
+            if conn.closed == 0:
+                conn.rollback()
+            raise e
+
+    # Execute the query
+    _execute(_write)
+
+
+
+
+
+
+# Write Many
+# Inserts multiple rows in a single statement.
+def write_many(text: str, values_list: List[Tuple[Any]], page_size: int = 100) -> None:
+    """Executes a multi-row write query as well as commiting the changes. The query 
+    must contain a single %s placeholder for the VALUES clause. If an error is raised,
+    it will rollback the query.
+
+    Args:
+        text: str
+            The query to be executed. F.e: INSERT INTO table(a, b) VALUES %s
+        values_list: List[Tuple[Any]]
+            The list of value tuples to be inserted.
+        page_size: int
+            The maximum number of rows per statement.
+    """
+    def _write(conn: Any) -> None:
+        try:
+            with conn.cursor() as curs:
+                execute_values(curs, text, values_list, page_size=page_size)
+            conn.commit()
+        except Exception as e:
+            if conn.closed == 0:
+                conn.rollback()
+            raise e
+
+    # Execute the query
+    _execute(_write)
\ No newline at end of file
@@ -0,0 +1,269 @@
+from typing import List, Union, Any
+from numpy import ndarray, asarray, float32, float64, where, maximum, minimum, round as np_round, abs as np_abs, \
+    sign, errstate, column_stack, floor, flatnonzero
+from modules._types import IInferenceBackend
+from modules.environment.Environment import ENV
+from modules.regression.Regression import Regression
+from modules.metrics.Metrics import Metrics
+
+
+
+
+
+
+class Ensemble:
+    """Ensemble Class
+
+    This class fuses the Keras Models of all the regressions within a Prediction Model into
+    a single compiled function. This way, the predictions of every regression are generated
+    in one call rather than dispatching each model individually.
+    When running on the NumPy backend there is no graph to compile, so the models are
+    evaluated one after the other and their outputs are stacked.
+
+    Instance Properties:
+        regressions: List[Regression]
+            The list of regressions that comprise the ensemble.
+        lookback: int
+            The number of prediction candlesticks shared by all the regressions.
+        backend: IInferenceBackend
+            The inference backend the regressions were loaded with.
+        predict_fn: Union[Any, None]
+            The compiled function that generates the predictions of all regressions.
+            This value is None when running on the NumPy backend.
+    """
+
+
+
+
+
+
+    ####################
+    ## Initialization ##
+    ####################
+
+
+
+    def __init__(self, regressions: List[Regression]):
+        """Initializes the Ensemble Instance and compiles the fused inference function.
+
+        Args:
+            regressions: List[Regression]
+                The list of regressions that will be fused.
+
+        Raises:
+            ValueError:
+                If the list of regressions is empty.
+                If the regressions don't share the same lookback.
+        """
+        # Make sure there are regressions to fuse
+        if len(regressions) == 0:
+            raise ValueError("The ensemble cannot be built without regressions.")
+
+        # Make sure all the regressions share the same lookback
+        if len({reg.lookback for reg in regressions}) != 1:
+            raise ValueError("The regressions within the ensemble must share the same lookback.")
+
+        # Init the regressions
+        self.regressions: List[Regression] = regressions
+
+        # Init the lookback
+        self.lookback: int = regressions[0].lookback
+
+        # Init the backend
+        self.backend: IInferenceBackend = ENV["INFERENCE_BACKEND"]
+
+        # Compile the fused function. The batch dimension is left open so any number of
+        # input rows can be predicted without retracing the graph.
+        self.predict_fn: Union[Any, None] = None
+        if self.backend == "tensorflow":
+            from tensorflow import function as tf_function, TensorSpec, float32 as tf_float32
+            self.predict_fn = tf_function(
+                self._call_models,
+                input_signature=[TensorSpec(shape=(None, self.lookback), dtype=tf_float32)]
+            )
+
+
+
+
+
+
+    def _call_models(self, input_ds: Any) -> Any:
+        """Invokes all the regression models on the same input tensor and stacks the
+        last prediction of each one of them.
+
+        Args:
+            input_ds: Tensor
+                The input tensor shared by all the regressions (rows, lookback).
+
+        Returns:
+            Tensor (rows, regressions)
+        """
+        from tensorflow import stack as tf_stack
+        return tf_stack([reg.model(input_ds, training=False)[:, -1] for reg in self.regressions], axis=1)
+
+
+
+
+
+
+
+
+
+
+
+    #################
+    ## Prediction  ##
+    #################
+
+
+
+
+
+    def predict(self, input_ds: ndarray) -> ndarray:
+        """Generates the last prediction of every regression for each row in the
+        input dataset in a single call.
+
+        Args:
+            input_ds: ndarray
+                The normalized input dataset (rows, lookback).
+
+        Returns:
+            ndarray (rows, regressions)
+        """
+        # Cast the input to the precision of the models
+        input_ds = asarray(input_ds, dtype=float32)
+
+        # Evaluate the NumPy Models one by one so each regression can be timed
+        if self.predict_fn is None:
+            preds: List[ndarray] = []
+            for reg in self.regressions:
+                with Metrics.timer("prediction_api_regression_duration_seconds", { "regression": reg.id }):
+                    preds.append(reg.model.predict_on_batch(input_ds)[:, -1])
+            return column_stack(preds)
+
+        # Otherwise, invoke the compiled function. Since the regressions are fused,
+        # only the ensemble as a whole can be timed.
+        return self.predict_fn(input_ds).numpy()
+
+
+
+
+
+
+    def predict_features(self, input_ds: ndarray) -> ndarray:
+        """Generates the predictions of all regressions and converts them into
+        features.
+
+        Args:
+            input_ds: ndarray
+                The normalized input dataset (rows, lookback). It should be provided in
+                float64 as only the models receive it in float32.
+
+        Returns:
+            ndarray (rows, regressions)
+        """
+        # Firstly, predict the next trend with all the regressions
+        preds: ndarray = self.predict(input_ds)
+
+        # Calculate the change from the current price to the last prediction. The 
+        # current price keeps its original precision
+        changes: ndarray = Ensemble._calculate_changes(asarray(input_ds[:, -1:], dtype=float64), preds)
+
+        # Finally, return the normalized features
+        return Ensemble._normalize_features(changes)
+
+
+
+
+
+
+
+
+
+
+
+    #############
+    ## Feature ##
+    #############
+
+
+
+
+
+    @staticmethod
+    def _calculate_changes(current: ndarray, preds: ndarray) -> ndarray:
+        """Vectorized version of Utils.get_percentage_change. Calculates the percentage
+        change between the current price and the last predicted price.
+
+        Args:
+            current: ndarray
+                The current (last) normalized price of each row (rows, 1).
+            preds: ndarray
+                The last prediction of each regression (rows, regressions).
+
+        Returns:
+            ndarray (rows, regressions)
+        """
+        with errstate(divide="ignore", invalid="ignore"):
+            changes: ndarray = where(current == 0, 0, ((preds - current) / current) * 100)
+        return Ensemble._round(maximum(changes, -100), 2)
+
+
+
+
+
+
+    @staticmethod
+    def _normalize_features(changes: ndarray) -> ndarray:
+        """Adjusts the changes to the regressions' min and max feature values and
+        scales them to a range between -1 and 1.
+
+        Args:
+            changes: ndarray
+                The predicted changes (rows, regressions).
+
+        Returns:
+            ndarray (rows, regressions)
+        """
+        # Adjust the absolute changes to the min and max values
+        abs_changes: ndarray = np_abs(changes)
+        adjusted: ndarray = where(
+            abs_changes >= Regression.MIN_FEATURE_VALUE,
+            minimum(abs_changes, Regression.MAX_FEATURE_VALUE),
+            0
+        )
+
+        # Scale the adjusted changes
+        scaled: ndarray = Ensemble._round(
+            (adjusted - Regression.MIN_FEATURE_VALUE) / (Regression.MAX_FEATURE_VALUE - Regression.MIN_FEATURE_VALUE),
+            6
+        )
+
+        # Finally, restore the direction of the changes. Neutral changes are set to 0
+        return where(adjusted > 0, sign(changes) * scaled, 0)
+
+
+
+
+
+
+    @staticmethod
+    def _round(values: ndarray, decimals: int) -> ndarray:
+        """Vectorized version of Python's round. NumPy scales the values before 
+        rounding them, so the ones that lie right next to a tie can be rounded in 
+        the opposite direction. These values are rounded with Python's round instead.
+
+        Args:
+            values: ndarray
+                The values to be rounded.
+            decimals: int
+                The number of decimals to round to.
+
+        Returns:
+            ndarray
+        """
+        rounded: ndarray = np_round(values, decimals)
+        scaled: ndarray = values * 10 ** decimals
+        for i in flatnonzero(np_abs(scaled - floor(scaled) - 0.5) < 1e-6):
+            rounded.flat[i] = round(float(values.flat[i]), decimals)
+        return rounded
\ No newline at end of file
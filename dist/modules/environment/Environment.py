@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, List
 from os import environ
 from modules._types import IEnvironment
 
@@ -59,6 +59,53 @@ def _get_integer(key: str) -> int:
 
 
 
+def _get_optional_integer(key: str, default: int) -> int:
+    """Retrieves an optional integer value from an environment property. If the
+    property is not set, the default value is returned instead.
+
+    Args:
+        key (str): The key of the value in the system's environment
+        default (int): The value to be used if the property is not set
+
+    Returns:
+        int
+    
+    Raises:
+        ValueError: If the environment key cannot be converted to int.
+    """
+    return _get_integer(key) if len(environ.get(key, "")) > 0 else default
+
+
+
+
+
+
+def _get_option(key: str, options: List[str], default: str) -> str:
+    """Retrieves an optional string value from an environment property. If the
+    property is not set, the default value is returned instead.
+
+    Args:
+        key (str): The key of the value in the system's environment
+        options (List[str]): The list of values the property can take
+        default (str): The value to be used if the property is not set
+
+    Returns:
+        str
+    
+    Raises:
+        ValueError: If the environment key is not one of the supported options.
+    """
+    val: str = _get_string(key) if len(environ.get(key, "")) > 0 else default
+    if val in options:
+        return val
+    else:
+        raise ValueError(f"The environment key {key} must be one of {options} ({val}).")
+
+
+
+
+
+
 
 
 
@@ -79,7 +126,16 @@ ENV: IEnvironment = {
     "POSTGRES_USER": _get_string("POSTGRES_USER"),
     "POSTGRES_PASSWORD": _get_string("POSTGRES_PASSWORD"),
     "POSTGRES_DB": _get_string("POSTGRES_DB"),
+    "POSTGRES_POOL_MIN_SIZE": _get_optional_integer("POSTGRES_POOL_MIN_SIZE", 1),
+    "POSTGRES_POOL_MAX_SIZE": _get_optional_integer("POSTGRES_POOL_MAX_SIZE", 10),
     "FLASK_RUN_HOST": _get_string("FLASK_RUN_HOST"),
     "FLASK_SECRET_KEY": _get_string("FLASK_SECRET_KEY"),
-    "PORT": _get_integer("PORT")
+    "PORT": _get_integer("PORT"),
+    "INFERENCE_BACKEND": _get_option("INFERENCE_BACKEND", ["tensorflow", "numpy"], "tensorflow"),
+    "PREDICTION_CACHE_CAPACITY": _get_optional_integer("PREDICTION_CACHE_CAPACITY", 1024),
+    "PREDICTION_CACHE_TTL": _get_optional_integer("PREDICTION_CACHE_TTL", 60),
+    "EPOCH_POLL_INTERVAL": _get_optional_integer("EPOCH_POLL_INTERVAL", 60),
+    "MICRO_BATCH_MAX_SIZE": _get_optional_integer("MICRO_BATCH_MAX_SIZE", 0),
+    "MICRO_BATCH_MAX_WAIT_MS": _get_optional_integer("MICRO_BATCH_MAX_WAIT_MS", 2),
+    "WORKERS": _get_optional_integer("WORKERS", 1)
 }
\ No newline at end of file
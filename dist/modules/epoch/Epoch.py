@@ -1,9 +1,16 @@
-from typing import Union, List
+from typing import Union, List, Callable
+from os import register_at_fork
 from gc import collect
-from modules._types import IEpochRecord, IPrediction
+from threading import Lock, Thread, Event
+from numpy import ndarray, asarray, float64
+from modules._types import IEpochRecord, IPrediction, IBatchPrediction
+from modules.environment.Environment import ENV
 from modules.utils.Utils import Utils
 from modules.database.Database import TN, read_query
 from modules.prediction_model.PredictionModel import PredictionModel
+from modules.prediction_cache.PredictionCache import PredictionCache
+from modules.api_error.ApiError import log
+from modules.metrics.Metrics import Metrics
 
 
 
@@ -13,12 +20,33 @@ class Epoch:
     """Epoch Class
 
     This singleton manages the active epoch as well as the active instance 
-    of the prediction model.
+    of the prediction model. The model is loaded and warmed up when the API
+    starts and a background watcher loads new epochs off the request path. 
+    Requests read the MODEL reference once, so the ones in progress finish 
+    with the model they started with when it is swapped. A request for an epoch
+    that is not loaded is rejected and wakes the watcher up, so the new epoch is
+    loaded right away rather than on the next poll.
 
     Class Properties:
         MODEL: Union[PredictionModel, None]
             The instance of the active Prediction Model. If no Epoch is active,
             this value is None.
+        LOCK: Lock
+            The lock that serializes the loading of models so an epoch is never
+            loaded more than once.
+        WATCHER: Union[Thread, None]
+        WATCHER_STOP: Event
+        WATCHER_WAKE: Event
+            The thread that polls the active epoch and the events used to stop it
+            and to make it sync the active epoch right away.
+        SYNC_REQUESTER: Union[Callable[[], None], None]
+            The function that asks another process to sync the active epoch (f.e. 
+            the master of the prefork server). If None, the watcher is woken up.
+        REQUESTED_SYNC_INTERVAL: float
+            The minimum number of seconds between the syncs requested by predictions.
+        CACHE: PredictionCache
+            The latest predictions generated by the model. It is cleared whenever
+            the model changes.
         GARBAGE_COLLECTION: Union[int, None]
         GARBAGE_COLLECTION_INTERVAL: int
             The time in which the garbage should be collected, as well as the
@@ -27,6 +55,19 @@ class Epoch:
     # Active Prediction Model
     MODEL: Union[PredictionModel, None] = None
 
+    # Model Loading
+    LOCK: Lock = Lock()
+
+    # Active Epoch Watcher
+    WATCHER: Union[Thread, None] = None
+    WATCHER_STOP: Event = Event()
+    WATCHER_WAKE: Event = Event()
+    SYNC_REQUESTER: Union[Callable[[], None], None] = None
+    REQUESTED_SYNC_INTERVAL: float = 5
+
+    # Prediction Cache
+    CACHE: PredictionCache = PredictionCache(ENV["PREDICTION_CACHE_CAPACITY"], ENV["PREDICTION_CACHE_TTL"])
+
     # The time in which the garbage collection should be executed
     GARBAGE_COLLECTION: Union[int, None] = None
     GARBAGE_COLLECTION_INTERVAL: int = 120 # 120 minutes
@@ -37,15 +78,16 @@ class Epoch:
     @staticmethod
     def generate_prediction(
         epoch_id: str, 
-        close_prices: List[float]
+        close_prices: Union[List[float], ndarray]
     ) -> IPrediction:
         """After ensuring the API is running the correct Epoch, it generates
-        a prediction through the Prediction Model Instance.
+        a prediction through the Prediction Model Instance. If the same window
+        was predicted recently, the prediction is served from the cache.
 
         Args:
             epoch_id: str
                 The ID of the active epoch.
-            close_prices: List[float]
+            close_prices: Union[List[float], ndarray]
                 The list of synced close prices that will be used to build the input ds.
 
         Returns:
@@ -59,10 +101,184 @@ class Epoch:
                 If the provided epoch id does not match the active one.
                 If any of the Epoch Assets are not available in the directory.
         """
-        # If the model has not been initialized or the Epoch ID doesnt match, 
-        # retrieve the active epoch record so the model can be initialized.
-        if Epoch.MODEL is None or Epoch.MODEL.epoch_id != epoch_id:
-            # Retrieve the active epoch
+        # Retrieve the model
+        model: PredictionModel = Epoch._get_model(epoch_id)
+
+        # Init the prices
+        prices: ndarray = asarray(close_prices, dtype=float64)
+
+        # If the cache is disabled, generate the prediction right away
+        if Epoch.CACHE.capacity <= 0:
+            pred: Union[IPrediction, None] = model.predict(prices)
+
+        # Otherwise, check if the prediction is in the cache
+        else:
+            with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict", "stage": "cache" }):
+                key: bytes = PredictionCache.build_key(
+                    [model.epoch_id, model.id, model.sma_window_size, model.regression_lookback], 
+                    prices
+                )
+                pred = Epoch.CACHE.get(key)
+
+            # If it isn't, generate the prediction and store it
+            if pred is None:
+                pred = model.predict(prices)
+                Epoch.CACHE.set(key, pred)
+
+        # Collect the garbage if needed
+        Epoch._collect_garbage(pred["t"])
+        
+        # Finally, return the prediction
+        return pred
+
+
+
+
+
+
+
+
+
+
+    @staticmethod
+    def generate_stream_prediction(
+        epoch_id: str,
+        stream_id: str,
+        seq: int,
+        close_prices: ndarray
+    ) -> IPrediction:
+        """After ensuring the API is running the correct Epoch, it pushes the newest
+        close prices into the stream and generates a prediction through the Prediction
+        Model Instance. Since the streams belong to the model, they are resynced 
+        automatically when the Epoch changes.
+
+        Args:
+            epoch_id: str
+                The ID of the active epoch.
+            stream_id: str
+                The identifier of the stream.
+            seq: int
+                The sequence number of the last close price.
+            close_prices: ndarray
+                The newest close prices in chronological order.
+
+        Returns:
+            IPrediction
+
+        Raises:
+            RuntimeError:
+                If the provided epoch id is invalid.
+                If there isn't an active epoch or it cannot be retrieved from the db
+                    for any reason.
+                If the provided epoch id does not match the active one.
+                If any of the Epoch Assets are not available in the directory.
+                If the stream is out of sync and the full window was not provided.
+        """
+        # Generate the prediction
+        pred: IPrediction = Epoch._get_model(epoch_id).predict_stream(stream_id, seq, close_prices)
+
+        # Collect the garbage if needed
+        Epoch._collect_garbage(pred["t"])
+        
+        # Finally, return the prediction
+        return pred
+
+
+
+
+
+
+
+
+
+
+    @staticmethod
+    def generate_batch_prediction(
+        epoch_id: str,
+        close_prices_batch: Union[List[ndarray], None] = None,
+        close_prices: Union[ndarray, None] = None,
+        stride: Union[int, None] = None
+    ) -> List[IBatchPrediction]:
+        """After ensuring the API is running the correct Epoch, it generates a
+        prediction for each window through the Prediction Model Instance. The
+        windows can be provided as a list or as a series and a stride.
+
+        Args:
+            epoch_id: str
+                The ID of the active epoch.
+            close_prices_batch: Union[List[ndarray], None]
+                The list of close price windows.
+            close_prices: Union[ndarray, None]
+                The series of close prices that will be split into windows.
+            stride: Union[int, None]
+                The number of prices between the start of each window in the series.
+
+        Returns:
+            List[IBatchPrediction]
+
+        Raises:
+            RuntimeError:
+                If the provided epoch id is invalid.
+                If there isn't an active epoch or it cannot be retrieved from the db
+                    for any reason.
+                If the provided epoch id does not match the active one.
+                If any of the Epoch Assets are not available in the directory.
+                If the series is shorter than a window.
+        """
+        # Retrieve the model
+        model: PredictionModel = Epoch._get_model(epoch_id)
+
+        # Generate the predictions
+        preds: List[IBatchPrediction] = model.predict_batch(close_prices_batch) \
+            if close_prices_batch is not None else model.predict_series(close_prices, stride)
+
+        # Collect the garbage if needed
+        Epoch._collect_garbage(Utils.get_time())
+
+        # Finally, return the predictions
+        return preds
+
+
+
+
+
+
+
+
+
+
+    @staticmethod
+    def _get_model(epoch_id: str) -> PredictionModel:
+        """Retrieves the instance of the Prediction Model. If the model has not been 
+        initialized or the Epoch ID doesnt match, the active epoch is synced off the
+        request path and the request is rejected. The model is only loaded inline 
+        if nothing watches the active epoch (EPOCH_POLL_INTERVAL is 0).
+
+        Args:
+            epoch_id: str
+                The ID of the active epoch.
+
+        Returns:
+            PredictionModel
+
+        Raises:
+            RuntimeError:
+                If there isn't an active epoch or it cannot be retrieved from the db
+                    for any reason.
+                If the provided epoch id does not match the active one.
+        """
+        # Read the reference once so the model cannot change during the request
+        model: Union[PredictionModel, None] = Epoch.MODEL
+        if model is None or model.epoch_id != epoch_id:
+            # Sync the active epoch off the request path if it is being watched
+            if Epoch.request_sync():
+                if model is None:
+                    raise RuntimeError(Utils.api_error("Cannot predict because there isn't an active Epoch.", 502000))
+                raise RuntimeError(
+                    Utils.api_error(f"The provided epoch id {epoch_id} is different to the current epoch {model.epoch_id}.", 502001)
+                )
+
+            # Otherwise, retrieve the active epoch
             new_epoch: Union[IEpochRecord, None] = Epoch.get_active_epoch()
 
             # Make sure there is an active epoch
@@ -75,23 +291,263 @@ class Epoch:
                     Utils.api_error(f"The provided epoch id {epoch_id} is different to the current epoch {new_epoch['id']}.", 502001)
                 )
             
-            # Initialize the instance of the model
-            Epoch.MODEL = PredictionModel(new_epoch)
+            # Load the model
+            model = Epoch._load_model(new_epoch)
 
-        # Generate the prediction
-        pred: IPrediction = Epoch.MODEL.predict(close_prices)
+        # Finally, return the model
+        return model
+
+
+
+
+
+
+    @staticmethod
+    def _load_model(epoch_record: IEpochRecord) -> PredictionModel:
+        """Initializes and warms up the model of an epoch and swaps it in. If 
+        another thread is loading a model, it waits for it to complete and reuses
+        it if it belongs to the same epoch.
+
+        Args:
+            epoch_record: IEpochRecord
+                The record of the epoch to be loaded.
+
+        Returns:
+            PredictionModel
+        """
+        with Epoch.LOCK:
+            # Check if the model was loaded while waiting for the lock
+            model: Union[PredictionModel, None] = Epoch.MODEL
+            if model is not None and model.epoch_id == epoch_record["id"] and model.id == epoch_record["model"]["id"]:
+                return model
 
+            # Initialize the instance of the model and warm it up
+            with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "epoch", "stage": "load" }):
+                model = PredictionModel(epoch_record)
+                model.warm_up()
+            Metrics.increment("prediction_api_model_loads_total")
+
+            # Swap the model and discard the cached predictions
+            previous_model: Union[PredictionModel, None] = Epoch.MODEL
+            Epoch.MODEL = model
+            Epoch.CACHE.clear()
+
+            # Stop the previous model
+            if previous_model is not None:
+                previous_model.stop()
+                Metrics.increment("prediction_api_epoch_swaps_total")
+            return model
+
+
+
+
+
+
+    #############
+    ## Watcher ##
+    #############
+
+
+
+
+
+    @staticmethod
+    def initialize() -> Union[str, None]:
+        """Loads and warms up the model of the active epoch (if any). This function
+        is invoked when the API starts so the first request does not have to.
+
+        Returns:
+            Union[str, None]
+            The ID of the loaded epoch.
+        """
+        return Epoch.sync_active_epoch()
+
+
+
+
+
+
+    @staticmethod
+    def sync_active_epoch() -> Union[str, None]:
+        """Retrieves the active epoch and loads its model if it is not the 
+        current one.
+
+        Returns:
+            Union[str, None]
+            The ID of the active epoch.
+        """
+        # Retrieve the active epoch
+        epoch_record: Union[IEpochRecord, None] = Epoch.get_active_epoch()
+        if epoch_record is None:
+            return None
+
+        # Load the model if it changed
+        model: Union[PredictionModel, None] = Epoch.MODEL
+        if model is None or model.epoch_id != epoch_record["id"] or model.id != epoch_record["model"]["id"]:
+            Epoch._load_model(epoch_record)
+        return epoch_record["id"]
+
+
+
+
+
+
+    @staticmethod
+    def request_sync() -> bool:
+        """Asks the process that watches the active epoch to sync it right away. 
+        The requests are coalesced and throttled by the watcher.
+
+        Returns:
+            bool
+            False if nothing watches the active epoch.
+        """
+        if Epoch.SYNC_REQUESTER is not None:
+            Epoch.SYNC_REQUESTER()
+            return True
+        elif Epoch.WATCHER is not None:
+            Epoch.WATCHER_WAKE.set()
+            return True
+        return False
+
+
+
+
+
+
+    @staticmethod
+    def start_watcher() -> None:
+        """Starts the background thread that polls the active epoch every
+        EPOCH_POLL_INTERVAL seconds. If the interval is 0, the watcher is not
+        started.
+        """
+        if ENV["EPOCH_POLL_INTERVAL"] > 0 and Epoch.WATCHER is None:
+            Epoch.WATCHER_STOP.clear()
+            Epoch.WATCHER_WAKE.clear()
+            Epoch.WATCHER = Thread(target=Epoch._watch, name="EpochWatcher", daemon=True)
+            Epoch.WATCHER.start()
+
+
+
+
+
+
+    @staticmethod
+    def stop_watcher() -> None:
+        """Stops the background thread that polls the active epoch.
+        """
+        if Epoch.WATCHER is not None:
+            Epoch.WATCHER_STOP.set()
+            Epoch.WATCHER_WAKE.set()
+            Epoch.WATCHER.join()
+            Epoch.WATCHER = None
+
+
+
+
+
+
+    @staticmethod
+    def _watch() -> None:
+        """Syncs the active epoch periodically, or once it is woken up, until the 
+        watcher is stopped. The syncs requested by predictions are throttled. Errors
+        are logged and the watcher keeps running.
+        """
+        while True:
+            # Wait for the next poll or a sync request
+            woken_up: bool = Epoch.WATCHER_WAKE.wait(ENV["EPOCH_POLL_INTERVAL"])
+            if Epoch.WATCHER_STOP.is_set():
+                return
+            Epoch.WATCHER_WAKE.clear()
+
+            # Sync the active epoch
+            try:
+                Epoch.sync_active_epoch()
+            except Exception as e:
+                log("Epoch.watch", e)
+
+            # Throttle the sync requests
+            if woken_up and Epoch.WATCHER_STOP.wait(Epoch.REQUESTED_SYNC_INTERVAL):
+                return
+
+
+
+
+
+
+    @staticmethod
+    def _reset_after_fork() -> None:
+        """Resets the state that cannot be inherited by a forked process. The model
+        is kept so it can be shared copy-on-write, but the watcher thread does not
+        exist in the child and the locks may have been held by other threads.
+        """
+        Epoch.LOCK = Lock()
+        Epoch.WATCHER = None
+        Epoch.WATCHER_STOP = Event()
+        Epoch.WATCHER_WAKE = Event()
+        Epoch.SYNC_REQUESTER = None
+        Epoch.CACHE = PredictionCache(ENV["PREDICTION_CACHE_CAPACITY"], ENV["PREDICTION_CACHE_TTL"])
+
+
+
+
+
+
+
+
+
+
+    ##########
+    ## Misc ##
+    ##########
+
+
+
+
+
+    @staticmethod
+    def _collect_garbage(current_time: int) -> None:
+        """Invokes the garbage collector periodically based on the 
+        GARBAGE_COLLECTION_INTERVAL.
+
+        Args:
+            current_time: int
+                The current time in milliseconds.
+        """
         # If the garbage collector has not been set, do so
         if Epoch.GARBAGE_COLLECTION is None:
-            Epoch.GARBAGE_COLLECTION = Utils.add_minutes(pred["t"], Epoch.GARBAGE_COLLECTION_INTERVAL)
+            Epoch.GARBAGE_COLLECTION = Utils.add_minutes(current_time, Epoch.GARBAGE_COLLECTION_INTERVAL)
         
         # Check if the garbage collector should be invoked
-        elif Epoch.GARBAGE_COLLECTION <= pred["t"]:
-            collect()
-            Epoch.GARBAGE_COLLECTION = Utils.add_minutes(pred["t"], Epoch.GARBAGE_COLLECTION_INTERVAL)
-        
-        # Finally, return the prediction
-        return pred
+        elif Epoch.GARBAGE_COLLECTION <= current_time:
+            with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "epoch", "stage": "gc" }):
+                collect()
+            Epoch.GARBAGE_COLLECTION = Utils.add_minutes(current_time, Epoch.GARBAGE_COLLECTION_INTERVAL)
+
+
+
+
+
+
+
+
+
+
+    @staticmethod
+    def get_window_size(epoch_id: Union[str, None]) -> Union[int, None]:
+        """Retrieves the number of close prices required by the loaded model. If 
+        the model is not loaded or belongs to a different epoch, it returns None.
+
+        Args:
+            epoch_id: Union[str, None]
+                The ID of the epoch the request was sent for.
+
+        Returns:
+            Union[int, None]
+        """
+        model: Union[PredictionModel, None] = Epoch.MODEL
+        if model is None or model.epoch_id != epoch_id:
+            return None
+        return model.regression_lookback + model.sma_window_size - 1
 
 
 
@@ -117,4 +573,12 @@ class Epoch:
         if len(epoch_list) == 1:
             return epoch_list[0]
         else:
-            return None
\ No newline at end of file
+            return None
+
+
+
+
+
+# Fork Safety
+# Forked workers reset the state that belongs to the parent process.
+register_at_fork(after_in_child=Epoch._reset_after_fork)
\ No newline at end of file
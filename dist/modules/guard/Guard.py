@@ -1,7 +1,17 @@
-from typing import Union, List
-from modules._types import IRequestGuardResult
+from typing import Union, List, Any
+from numpy import ndarray, asarray, float64, isfinite
+from modules._types import IRequestGuardResult, IBatchRequestGuardResult, IStreamRequestGuardResult
 from modules.environment.Environment import ENV
 from modules.utils.Utils import Utils
+from modules.api_error.ApiError import log
+
+
+
+# Batch Limits
+# The maximum number of windows and the maximum length of the series that can
+# be predicted in a single batch request.
+MAX_BATCH_WINDOWS: int = 10000
+MAX_SERIES_LENGTH: int = 100000
 
 
 
@@ -9,7 +19,8 @@ from modules.utils.Utils import Utils
 def check_request(
     secret: Union[str, None],
     epoch_id: Union[str, None],
-    close_prices: Union[List[float], None]
+    close_prices: Union[List[float], ndarray, None],
+    window_size: Union[int, None] = None
 ) -> IRequestGuardResult:
     """Given the API secret and a series of request arguments, it will validate,
     format and return the result in a dict format.
@@ -20,8 +31,12 @@ def check_request(
             with the prediction API.
         epoch_id: Union[str, None]
             The ID of the active Epoch.
-        close_prices: Union[List[float], None]
+        close_prices: Union[List[float], ndarray, None]
             The list of close prices that will be used to build the input dataset.
+        window_size: Union[int, None]
+            The number of close prices required by the loaded model 
+            (regression_lookback + sma_window_size - 1). If None, the length
+            is validated by the model.
 
     Returns:
         IRequestGuardResult
@@ -30,7 +45,7 @@ def check_request(
     res: IRequestGuardResult = {
         "error": None,
         "epoch_id": epoch_id,
-        "close_prices": close_prices
+        "close_prices": _to_close_prices_array(close_prices)
     }
 
     # Validate the provided secret
@@ -38,13 +53,183 @@ def check_request(
         res["error"] = f"The secret provided in the request is invalid."
 
     # Validate the Epoch ID
-    if not isinstance(epoch_id, str) or epoch_id[0] != "_" or len(epoch_id) < 4 or len(epoch_id) > 100:
+    elif not isinstance(epoch_id, str) or len(epoch_id) < 4 or len(epoch_id) > 100 or epoch_id[0] != "_":
         res["error"] = f"The provided Epoch ID {epoch_id} is invalid."
 
     # Validate the list of close prices
-    if not isinstance(close_prices, list) or len(close_prices) == 0:
-        Utils.print(close_prices)
+    elif res["close_prices"] is None or not isfinite(res["close_prices"]).all():
+        res["error"] = f"The provided list of close prices is invalid."
+
+    # Validate the size of the window. The error is logged as it was when the model raised it
+    elif window_size is not None and res["close_prices"].shape[0] != window_size:
+        res["error"] = Utils.api_error(f"The provided list of close prices must contain {window_size} prices. Received: {res['close_prices'].shape[0]}.", 503000)
+        log("PredictionAPI.predict", res["error"])
+
+    # Finally, return the result
+    return res
+
+
+
+
+
+
+# Batch Request Guard Checker
+def check_batch_request(
+    secret: Union[str, None],
+    epoch_id: Union[str, None],
+    close_prices_batch: Union[List[List[float]], None],
+    close_prices: Union[List[float], None],
+    stride: Union[int, None]
+) -> IBatchRequestGuardResult:
+    """Validates a batch prediction request. The request must provide either a list 
+    of close price windows or a series of close prices and the stride between windows.
+    The windows are validated individually so an invalid window does not prevent the
+    rest from being predicted.
+
+    Args:
+        secret: Union[str, None]
+            The API secret used by the Core API in order to interact 
+            with the prediction API.
+        epoch_id: Union[str, None]
+            The ID of the active Epoch.
+        close_prices_batch: Union[List[List[float]], None]
+            The list of close price windows.
+        close_prices: Union[List[float], None]
+            The series of close prices that will be split into windows.
+        stride: Union[int, None]
+            The number of prices between the start of each window in the series.
+
+    Returns:
+        IBatchRequestGuardResult
+    """
+    # Init the result dict
+    res: IBatchRequestGuardResult = {
+        "error": None,
+        "epoch_id": epoch_id,
+        "close_prices_batch": None,
+        "window_errors": None,
+        "close_prices": None,
+        "stride": stride
+    }
+
+    # Validate the provided secret
+    if not isinstance(secret, str) or secret != ENV["FLASK_SECRET_KEY"]:
+        res["error"] = f"The secret provided in the request is invalid."
+
+    # Validate the Epoch ID
+    elif not isinstance(epoch_id, str) or len(epoch_id) < 4 or len(epoch_id) > 100 or epoch_id[0] != "_":
+        res["error"] = f"The provided Epoch ID {epoch_id} is invalid."
+
+    # Validate the list of windows
+    elif close_prices_batch is not None:
+        if not isinstance(close_prices_batch, list) or len(close_prices_batch) == 0 or \
+            len(close_prices_batch) > MAX_BATCH_WINDOWS:
+            res["error"] = f"The provided batch of close prices is invalid. It must contain 1 to {MAX_BATCH_WINDOWS} windows."
+        else:
+            res["close_prices_batch"] = [_to_close_prices_array(window) for window in close_prices_batch]
+            res["window_errors"] = [
+                None if window is not None else f"The provided list of close prices is invalid." 
+                    for window in res["close_prices_batch"]
+            ]
+
+    # Validate the series
+    elif not isinstance(stride, int) or isinstance(stride, bool) or stride < 1:
+        res["error"] = f"The provided stride {stride} is invalid."
+    elif not isinstance(close_prices, list) or len(close_prices) > MAX_SERIES_LENGTH:
+        res["error"] = f"The provided series of close prices is invalid. It can contain up to {MAX_SERIES_LENGTH} prices."
+    else:
+        res["close_prices"] = _to_close_prices_array(close_prices)
+        if res["close_prices"] is None:
+            res["error"] = f"The provided series of close prices is invalid."
+
+    # Finally, return the result
+    return res
+
+
+
+
+
+
+# Stream Request Guard Checker
+def check_stream_request(
+    secret: Union[str, None],
+    epoch_id: Union[str, None],
+    stream_id: Union[str, None],
+    seq: Union[int, None],
+    close_prices: Union[List[float], None]
+) -> IStreamRequestGuardResult:
+    """Validates a streaming prediction request. Since the prices are accumulated
+    by the stream, they must be finite.
+
+    Args:
+        secret: Union[str, None]
+            The API secret used by the Core API in order to interact 
+            with the prediction API.
+        epoch_id: Union[str, None]
+            The ID of the active Epoch.
+        stream_id: Union[str, None]
+            The identifier of the stream.
+        seq: Union[int, None]
+            The sequence number of the last close price.
+        close_prices: Union[List[float], None]
+            The newest close prices in chronological order.
+
+    Returns:
+        IStreamRequestGuardResult
+    """
+    # Init the result dict
+    res: IStreamRequestGuardResult = {
+        "error": None,
+        "epoch_id": epoch_id,
+        "stream_id": stream_id,
+        "seq": seq,
+        "close_prices": _to_close_prices_array(close_prices)
+    }
+
+    # Validate the provided secret
+    if not isinstance(secret, str) or secret != ENV["FLASK_SECRET_KEY"]:
+        res["error"] = f"The secret provided in the request is invalid."
+
+    # Validate the Epoch ID
+    elif not isinstance(epoch_id, str) or len(epoch_id) < 4 or len(epoch_id) > 100 or epoch_id[0] != "_":
+        res["error"] = f"The provided Epoch ID {epoch_id} is invalid."
+
+    # Validate the Stream ID
+    elif not isinstance(stream_id, str) or len(stream_id) == 0 or len(stream_id) > 100:
+        res["error"] = f"The provided Stream ID {stream_id} is invalid."
+
+    # Validate the sequence number
+    elif not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+        res["error"] = f"The provided sequence number {seq} is invalid."
+
+    # Validate the close prices
+    elif res["close_prices"] is None or not isfinite(res["close_prices"]).all():
         res["error"] = f"The provided list of close prices is invalid."
 
     # Finally, return the result
-    return res
\ No newline at end of file
+    return res
+
+
+
+
+
+
+def _to_close_prices_array(close_prices: Any) -> Union[ndarray, None]:
+    """Converts a list (or an array) of close prices into a float64 array. Arrays 
+    that are already float64 are not copied. If the list is invalid, it returns None 
+    instead.
+
+    Args:
+        close_prices: Any
+            The list of close prices.
+
+    Returns:
+        Union[ndarray, None]
+    """
+    if not isinstance(close_prices, (list, ndarray)) or len(close_prices) == 0:
+        return None
+    try:
+        prices: ndarray = asarray(close_prices, dtype=float64)
+    except (TypeError, ValueError):
+        return None
+    return prices if prices.ndim == 1 else None
\ No newline at end of file
@@ -0,0 +1,409 @@
+from typing import Dict, Tuple, List, Callable, Union, Any
+from os import register_at_fork, getpid
+from threading import Lock
+from bisect import bisect_left
+from time import perf_counter
+from re import search
+
+
+
+
+
+
+## Metric Types ##
+
+
+
+# Labels
+# The labels of a metric are stored as a sorted tuple of (name, value) pairs so
+# they can be used as dict keys.
+ILabels = Tuple[Tuple[str, str], ...]
+
+
+
+
+
+
+class Histogram:
+    """Histogram Class
+
+    Counts observations in fixed buckets. The bucket is found with a binary search
+    and the counts are updated under a lock, so observing a value is cheap.
+
+    Instance Properties:
+        buckets: Tuple[float, ...]
+            The upper bounds of the buckets (ascending).
+        counts: List[int]
+            The number of observations per bucket. The last one is +Inf.
+        sum: float
+        count: int
+            The sum and the number of observations.
+        lock: Lock
+    """
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets: Tuple[float, ...] = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0
+        self.count: int = 0
+        self.lock: Lock = Lock()
+
+
+
+    def observe(self, value: float) -> None:
+        """Records an observation.
+
+        Args:
+            value: float
+                The observed value.
+        """
+        index: int = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+
+
+
+
+class Timer:
+    """Timer Class
+
+    Context manager that measures the duration of a block with a monotonic clock
+    and records it in a histogram.
+    """
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: Union[Dict[str, str], None]):
+        self.name: str = name
+        self.labels: Union[Dict[str, str], None] = labels
+        self.start: float = 0
+
+    def __enter__(self) -> "Timer":
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        Metrics.observe(self.name, perf_counter() - self.start, self.labels)
+
+
+
+
+
+
+
+
+
+
+class Metrics:
+    """Metrics Class
+
+    This singleton keeps the latency histograms and the counters of the API in memory
+    and exports them in the Prometheus text format. Nothing is computed until the
+    metrics are exported.
+
+    Class Properties:
+        BUCKETS: Tuple[float, ...]
+            The upper bounds (seconds) of the latency histograms.
+        DEFINITIONS: Dict[str, Tuple[str, str]]
+            The type and the description of each metric by name.
+        HISTOGRAMS: Dict[str, Dict[ILabels, Histogram]]
+        COUNTERS: Dict[str, Dict[ILabels, float]]
+            The metrics by name and labels.
+        COLLECTORS: List[Tuple[str, Callable[[], Dict[ILabels, float]]]]
+            The functions that provide the values of external metrics (f.e. the
+            prediction cache) when exported.
+        LOCK: Lock
+            The lock used to create metrics and update counters.
+        WORKER: Union[str, None]
+            The pid of the forked worker the metrics belong to. It is exported as
+            the worker label, so the series of each worker can be told apart. None
+            if the API is served from a single process.
+    """
+    # Latency Buckets (seconds)
+    BUCKETS: Tuple[float, ...] = (
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+    )
+
+    # Metric Definitions
+    DEFINITIONS: Dict[str, Tuple[str, str]] = {
+        "prediction_api_stage_duration_seconds": ("histogram", "Duration of each stage of a request."),
+        "prediction_api_regression_duration_seconds": ("histogram", "Duration of an individual regression prediction (NumPy backend)."),
+        "prediction_api_model_loads_total": ("counter", "Number of prediction models loaded."),
+        "prediction_api_epoch_swaps_total": ("counter", "Number of times the active epoch was swapped."),
+        "prediction_api_errors_total": ("counter", "Number of error responses by api error code."),
+        "prediction_api_micro_batches_total": ("counter", "Number of micro-batches predicted by the dispatcher."),
+        "prediction_api_micro_batch_rows_total": ("counter", "Number of rows predicted through micro-batches."),
+        "prediction_api_cache_requests_total": ("counter", "Number of prediction cache lookups by result."),
+        "prediction_api_cache_size": ("gauge", "Number of predictions stored in the cache."),
+        "prediction_api_error_log_rows_total": ("counter", "Number of api error rows by outcome."),
+        "prediction_api_error_log_queue_size": ("gauge", "Number of api error rows waiting to be written.")
+    }
+
+    # Metrics
+    HISTOGRAMS: Dict[str, Dict[ILabels, Histogram]] = {}
+    COUNTERS: Dict[str, Dict[ILabels, float]] = {}
+    COLLECTORS: List[Tuple[str, Callable[[], Dict[ILabels, float]]]] = []
+    LOCK: Lock = Lock()
+    WORKER: Union[str, None] = None
+
+
+
+
+
+
+    ###############
+    ## Recording ##
+    ###############
+
+
+
+
+    @staticmethod
+    def timer(name: str, labels: Union[Dict[str, str], None] = None) -> Timer:
+        """Builds a context manager that records the duration of a block.
+
+        Args:
+            name: str
+                The name of the histogram.
+            labels: Union[Dict[str, str], None]
+                The labels of the observation.
+
+        Returns:
+            Timer
+        """
+        return Timer(name, labels)
+
+
+
+
+
+
+    @staticmethod
+    def observe(name: str, value: float, labels: Union[Dict[str, str], None] = None) -> None:
+        """Records an observation in a histogram.
+
+        Args:
+            name: str
+                The name of the histogram.
+            value: float
+                The observed value.
+            labels: Union[Dict[str, str], None]
+                The labels of the observation.
+        """
+        key: ILabels = Metrics._get_labels(labels)
+        histograms: Union[Dict[ILabels, Histogram], None] = Metrics.HISTOGRAMS.get(name)
+        histogram: Union[Histogram, None] = histograms.get(key) if histograms is not None else None
+        if histogram is None:
+            with Metrics.LOCK:
+                histogram = Metrics.HISTOGRAMS.setdefault(name, {}).setdefault(key, Histogram(Metrics.BUCKETS))
+        histogram.observe(value)
+
+
+
+
+
+
+    @staticmethod
+    def increment(name: str, labels: Union[Dict[str, str], None] = None, value: float = 1) -> None:
+        """Increments a counter.
+
+        Args:
+            name: str
+                The name of the counter.
+            labels: Union[Dict[str, str], None]
+                The labels of the counter.
+            value: float
+                The amount to be added.
+        """
+        key: ILabels = Metrics._get_labels(labels)
+        with Metrics.LOCK:
+            counters: Dict[ILabels, float] = Metrics.COUNTERS.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + value
+
+
+
+
+
+
+    @staticmethod
+    def increment_error(error: Any) -> None:
+        """Increments the error counter based on the api error code of an error.
+        Errors without a code are counted as "none".
+
+        Args:
+            error: Any
+                The error returned by the API.
+        """
+        code: Any = search(r"\{\((\d+)\)\}", str(error))
+        Metrics.increment("prediction_api_errors_total", { "code": code.group(1) if code is not None else "none" })
+
+
+
+
+
+
+    @staticmethod
+    def register_collector(name: str, fn: Callable[[], Dict[ILabels, float]]) -> None:
+        """Registers a function that provides the values of a metric when exported.
+
+        Args:
+            name: str
+                The name of the metric. It must be part of the definitions.
+            fn: Callable[[], Dict[ILabels, float]]
+                The function that returns the values by labels.
+        """
+        with Metrics.LOCK:
+            Metrics.COLLECTORS.append((name, fn))
+
+
+
+
+
+
+    @staticmethod
+    def _reset_after_fork() -> None:
+        """Discards the metrics inherited from the parent process so each worker
+        reports its own series, labeled with its pid. The collectors are kept.
+        """
+        Metrics.WORKER = str(getpid())
+        Metrics.LOCK = Lock()
+        Metrics.HISTOGRAMS = {}
+        Metrics.COUNTERS = {}
+
+
+
+
+
+
+    @staticmethod
+    def _get_labels(labels: Union[Dict[str, str], None]) -> ILabels:
+        """Converts a labels dict into its key.
+
+        Args:
+            labels: Union[Dict[str, str], None]
+
+        Returns:
+            ILabels
+        """
+        return tuple(sorted(labels.items())) if labels else ()
+
+
+
+
+
+
+
+
+
+
+
+    ###############
+    ## Exporting ##
+    ###############
+
+
+
+
+    @staticmethod
+    def export() -> str:
+        """Exports all the metrics in the Prometheus text format.
+
+        Returns:
+            str
+        """
+        # Gather the values of all the metrics
+        values: Dict[str, Dict[ILabels, Any]] = {}
+        with Metrics.LOCK:
+            for name, histograms in Metrics.HISTOGRAMS.items():
+                values[name] = dict(histograms)
+            for name, counters in Metrics.COUNTERS.items():
+                values[name] = dict(counters)
+            collectors: List[Tuple[str, Callable[[], Dict[ILabels, float]]]] = list(Metrics.COLLECTORS)
+        for name, fn in collectors:
+            try:
+                values.setdefault(name, {}).update(fn())
+            except Exception:
+                pass
+
+        # Build the lines. The metrics of a worker are labeled with its pid
+        worker_labels: ILabels = (("worker", Metrics.WORKER),) if Metrics.WORKER is not None else ()
+        lines: List[str] = []
+        for name, (metric_type, description) in Metrics.DEFINITIONS.items():
+            if name not in values:
+                continue
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in values[name].items():
+                labels = labels + worker_labels
+                if isinstance(value, Histogram):
+                    lines.extend(Metrics._export_histogram(name, labels, value))
+                else:
+                    lines.append(f"{name}{Metrics._format_labels(labels)} {value}")
+
+        # Finally, return the text
+        return "\n".join(lines) + "\n"
+
+
+
+
+
+
+    @staticmethod
+    def _export_histogram(name: str, labels: ILabels, histogram: Histogram) -> List[str]:
+        """Exports the cumulative buckets, the sum and the count of a histogram.
+
+        Args:
+            name: str
+            labels: ILabels
+            histogram: Histogram
+
+        Returns:
+            List[str]
+        """
+        # Copy the state of the histogram
+        with histogram.lock:
+            counts: List[int] = list(histogram.counts)
+            total_sum: float = histogram.sum
+            total_count: int = histogram.count
+
+        # Build the lines
+        lines: List[str] = []
+        cumulative: int = 0
+        for bound, count in zip(list(histogram.buckets) + ["+Inf"], counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{Metrics._format_labels(labels + (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{Metrics._format_labels(labels)} {total_sum}")
+        lines.append(f"{name}_count{Metrics._format_labels(labels)} {total_count}")
+        return lines
+
+
+
+
+
+
+    @staticmethod
+    def _format_labels(labels: ILabels) -> str:
+        """Formats the labels of a metric.
+
+        Args:
+            labels: ILabels
+
+        Returns:
+            str
+        """
+        if len(labels) == 0:
+            return ""
+        return "{" + ",".join(
+            f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for key, value in labels
+        ) + "}"
+
+
+
+
+
+# Fork Safety
+# Forked workers start with empty metrics labeled with their pid.
+register_at_fork(after_in_child=Metrics._reset_after_fork)
\ No newline at end of file
@@ -0,0 +1,469 @@
+from typing import List, Dict, Tuple, Callable, Any
+from json import loads
+from math import ceil
+from numpy import ndarray, asarray, float32, zeros, maximum, tanh, exp, clip, pad, inf, split, ascontiguousarray
+from numpy.lib.stride_tricks import sliding_window_view
+from h5py import File as h5pyFile
+
+
+
+
+
+
+class NumpyModel:
+    """NumpyModel Class
+
+    This class reads the architecture and the weights of a Keras Sequential Model straight
+    from its HDF5 file and runs the forward pass in NumPy. It supports the layers used by
+    the model templates (Dense, Conv1D, MaxPooling1D, LSTM, GRU, Reshape, Flatten and
+    Dropout) and can be used as a drop-in replacement of the Keras Model when generating
+    predictions.
+
+    Class Properties:
+        ACTIVATIONS: Dict[str, Callable[[ndarray], ndarray]]
+            The activation functions that can be applied by the layers.
+
+    Instance Properties:
+        layers: List[Tuple[str, Dict[str, Any], List[ndarray]]]
+            The list of layers in the model (class_name, config, weights).
+    """
+    # Supported activation functions
+    ACTIVATIONS: Dict[str, Callable[[ndarray], ndarray]] = {
+        "linear": lambda x: x,
+        "relu": lambda x: maximum(x, 0),
+        "tanh": tanh,
+        "sigmoid": lambda x: 1 / (1 + exp(-x)),
+        "hard_sigmoid": lambda x: clip(0.2 * x + 0.5, 0, 1)
+    }
+
+
+
+
+
+
+    ####################
+    ## Initialization ##
+    ####################
+
+
+
+    def __init__(self, model_file: h5pyFile):
+        """Initializes the NumPy Model Instance.
+
+        Args:
+            model_file: h5pyFile
+                The opened HDF5 file of the Keras Model.
+
+        Raises:
+            ValueError:
+                If the model is not a Sequential Model.
+                If the model contains a layer or an activation that is not supported.
+        """
+        # Extract the model's architecture
+        model_config: Any = model_file.attrs["model_config"]
+        model_config = loads(model_config.decode("utf-8") if isinstance(model_config, bytes) else model_config)
+        if model_config["class_name"] != "Sequential":
+            raise ValueError(f"The NumPy Model only supports Sequential Models. Received: {model_config['class_name']}")
+
+        # Build the layers
+        self.layers: List[Tuple[str, Dict[str, Any], List[ndarray]]] = []
+        for layer in model_config["config"]["layers"]:
+            # The input layer is not part of the forward pass
+            if layer["class_name"] == "InputLayer":
+                continue
+
+            # Make sure the layer is supported
+            if layer["class_name"] not in NumpyModel._get_layer_functions():
+                raise ValueError(f"The layer {layer['class_name']} is not supported by the NumPy Model.")
+
+            # Make sure the activations are supported
+            for key in ("activation", "recurrent_activation"):
+                if key in layer["config"] and layer["config"][key] not in NumpyModel.ACTIVATIONS:
+                    raise ValueError(f"The activation {layer['config'][key]} is not supported by the NumPy Model.")
+
+            # Add the layer
+            self.layers.append((
+                layer["class_name"],
+                layer["config"],
+                NumpyModel._load_weights(model_file, layer["config"]["name"])
+            ))
+
+
+
+
+
+
+    @staticmethod
+    def _load_weights(model_file: h5pyFile, layer_name: str) -> List[ndarray]:
+        """Loads the weights of a layer in the order they were saved by Keras.
+
+        Args:
+            model_file: h5pyFile
+                The opened HDF5 file of the Keras Model.
+            layer_name: str
+                The name of the layer.
+
+        Returns:
+            List[ndarray]
+        """
+        # Layers without weights may not have a group
+        if layer_name not in model_file["model_weights"]:
+            return []
+
+        # Load the weights
+        layer_group: Any = model_file["model_weights"][layer_name]
+        return [
+            asarray(layer_group[name.decode("utf-8") if isinstance(name, bytes) else name], dtype=float32)
+            for name in layer_group.attrs["weight_names"]
+        ]
+
+
+
+
+
+
+
+
+
+
+
+    #################
+    ## Prediction  ##
+    #################
+
+
+
+
+
+    def predict_on_batch(self, input_ds: ndarray) -> ndarray:
+        """Runs the forward pass of the model on the provided input.
+
+        Args:
+            input_ds: ndarray
+                The input dataset (rows, ...).
+
+        Returns:
+            ndarray
+        """
+        # Init the output
+        output: ndarray = asarray(input_ds, dtype=float32)
+
+        # Run the layers sequentially
+        layer_functions: Dict[str, Callable] = NumpyModel._get_layer_functions()
+        for class_name, config, weights in self.layers:
+            output = layer_functions[class_name](output, config, weights)
+
+        # Finally, return the output
+        return output
+
+
+
+
+
+
+    @staticmethod
+    def _get_layer_functions() -> Dict[str, Callable[[ndarray, Dict[str, Any], List[ndarray]], ndarray]]:
+        """Retrieves the functions that implement each supported layer.
+
+        Returns:
+            Dict[str, Callable[[ndarray, Dict[str, Any], List[ndarray]], ndarray]]
+        """
+        return {
+            "Dense": NumpyModel._dense,
+            "Conv1D": NumpyModel._conv1d,
+            "MaxPooling1D": NumpyModel._max_pooling1d,
+            "LSTM": NumpyModel._lstm,
+            "GRU": NumpyModel._gru,
+            "Reshape": lambda x, config, weights: x.reshape((x.shape[0], *config["target_shape"])),
+            "Flatten": lambda x, config, weights: x.reshape((x.shape[0], -1)),
+            "Dropout": lambda x, config, weights: x
+        }
+
+
+
+
+
+
+
+
+
+
+
+    ############
+    ## Layers ##
+    ############
+
+
+
+
+
+    @staticmethod
+    def _dense(x: ndarray, config: Dict[str, Any], weights: List[ndarray]) -> ndarray:
+        """Dense Layer: activation(x @ kernel + bias)
+
+        Args:
+            x: ndarray
+                The output of the previous layer.
+            config: Dict[str, Any]
+                The configuration of the layer.
+            weights: List[ndarray]
+                [kernel, bias?]
+
+        Returns:
+            ndarray
+        """
+        output: ndarray = x @ weights[0]
+        if config.get("use_bias", True):
+            output = output + weights[1]
+        return NumpyModel.ACTIVATIONS[config["activation"]](output)
+
+
+
+
+
+
+    @staticmethod
+    def _conv1d(x: ndarray, config: Dict[str, Any], weights: List[ndarray]) -> ndarray:
+        """1D Convolution Layer (channels_last).
+
+        Args:
+            x: ndarray
+                The output of the previous layer (rows, steps, channels).
+            config: Dict[str, Any]
+                The configuration of the layer.
+            weights: List[ndarray]
+                [kernel (kernel_size, channels, filters), bias?]
+
+        Returns:
+            ndarray (rows, new_steps, filters)
+        """
+        # Init the params
+        kernel: ndarray = weights[0]
+        kernel_size, channels, filters = kernel.shape
+        stride: int = config["strides"][0]
+        dilation: int = config["dilation_rate"][0]
+        span: int = (kernel_size - 1) * dilation + 1
+
+        # Pad the input if needed
+        x = NumpyModel._pad_steps(x, config["padding"], span, stride, 0)
+
+        # Build the windows (rows, new_steps, kernel_size, channels)
+        windows: ndarray = sliding_window_view(x, span, axis=1)[:, ::stride, :, ::dilation].transpose(0, 1, 3, 2)
+        rows, steps = windows.shape[0], windows.shape[1]
+
+        # Convolve the windows with the kernel
+        output: ndarray = (
+            ascontiguousarray(windows).reshape((rows * steps, kernel_size * channels)) @
+            kernel.reshape((kernel_size * channels, filters))
+        ).reshape((rows, steps, filters))
+        if config.get("use_bias", True):
+            output = output + weights[1]
+        return NumpyModel.ACTIVATIONS[config["activation"]](output)
+
+
+
+
+
+
+    @staticmethod
+    def _max_pooling1d(x: ndarray, config: Dict[str, Any], weights: List[ndarray]) -> ndarray:
+        """1D Max Pooling Layer (channels_last).
+
+        Args:
+            x: ndarray
+                The output of the previous layer (rows, steps, channels).
+            config: Dict[str, Any]
+                The configuration of the layer.
+            weights: List[ndarray]
+                []
+
+        Returns:
+            ndarray (rows, new_steps, channels)
+        """
+        pool_size: int = config["pool_size"][0]
+        stride: int = config["strides"][0] if config.get("strides") is not None else pool_size
+        x = NumpyModel._pad_steps(x, config["padding"], pool_size, stride, -inf)
+        return sliding_window_view(x, pool_size, axis=1)[:, ::stride].max(axis=-1)
+
+
+
+
+
+
+    @staticmethod
+    def _pad_steps(x: ndarray, padding: str, span: int, stride: int, value: float) -> ndarray:
+        """Pads the steps axis of the input following the Keras padding rules.
+
+        Args:
+            x: ndarray
+                The input (rows, steps, channels).
+            padding: str
+                The padding mode: valid | same | causal
+            span: int
+                The number of steps covered by a window.
+            stride: int
+                The stride of the window.
+            value: float
+                The value used to pad the input.
+
+        Returns:
+            ndarray
+        """
+        if padding == "same":
+            total: int = max((ceil(x.shape[1] / stride) - 1) * stride + span - x.shape[1], 0)
+            return pad(x, ((0, 0), (total // 2, total - total // 2), (0, 0)), constant_values=value)
+        elif padding == "causal":
+            return pad(x, ((0, 0), (span - 1, 0), (0, 0)), constant_values=value)
+        else:
+            return x
+
+
+
+
+
+
+    @staticmethod
+    def _lstm(x: ndarray, config: Dict[str, Any], weights: List[ndarray]) -> ndarray:
+        """LSTM Layer. The gates are stored by Keras in the order: input, forget, cell
+        and output.
+
+        Args:
+            x: ndarray
+                The output of the previous layer (rows, steps, features).
+            config: Dict[str, Any]
+                The configuration of the layer.
+            weights: List[ndarray]
+                [kernel, recurrent_kernel, bias?]
+
+        Returns:
+            ndarray (rows, steps, units) | (rows, units)
+        """
+        # Init the params
+        units: int = config["units"]
+        activation: Callable = NumpyModel.ACTIVATIONS[config["activation"]]
+        recurrent_activation: Callable = NumpyModel.ACTIVATIONS[config["recurrent_activation"]]
+
+        # Project the inputs of all the steps in one go
+        x_proj: ndarray = x @ weights[0]
+        if config.get("use_bias", True):
+            x_proj = x_proj + weights[2]
+
+        # Iterate over the steps
+        h: ndarray = zeros((x.shape[0], units), dtype=float32)
+        c: ndarray = zeros((x.shape[0], units), dtype=float32)
+        sequences: List[ndarray] = []
+        for step in NumpyModel._get_steps(x.shape[1], config):
+            z_i, z_f, z_c, z_o = split(x_proj[:, step] + h @ weights[1], 4, axis=1)
+            c = recurrent_activation(z_f) * c + recurrent_activation(z_i) * activation(z_c)
+            h = recurrent_activation(z_o) * activation(c)
+            sequences.append(h)
+
+        # Finally, return the output
+        return NumpyModel._get_recurrent_output(h, sequences, config)
+
+
+
+
+
+
+    @staticmethod
+    def _gru(x: ndarray, config: Dict[str, Any], weights: List[ndarray]) -> ndarray:
+        """GRU Layer. The gates are stored by Keras in the order: update, reset and
+        candidate.
+
+        Args:
+            x: ndarray
+                The output of the previous layer (rows, steps, features).
+            config: Dict[str, Any]
+                The configuration of the layer.
+            weights: List[ndarray]
+                [kernel, recurrent_kernel, bias?]
+
+        Returns:
+            ndarray (rows, steps, units) | (rows, units)
+        """
+        # Init the params
+        units: int = config["units"]
+        activation: Callable = NumpyModel.ACTIVATIONS[config["activation"]]
+        recurrent_activation: Callable = NumpyModel.ACTIVATIONS[config["recurrent_activation"]]
+        reset_after: bool = config.get("reset_after", True)
+        use_bias: bool = config.get("use_bias", True)
+        kernel, recurrent_kernel = weights[0], weights[1]
+
+        # Init the biases. When the reset gate is applied after the matrix multiplication,
+        # Keras keeps a separate bias for the input and the recurrent kernels.
+        input_bias: ndarray = zeros(3 * units, dtype=float32)
+        recurrent_bias: ndarray = zeros(3 * units, dtype=float32)
+        if use_bias and reset_after:
+            input_bias, recurrent_bias = weights[2][0], weights[2][1]
+        elif use_bias:
+            input_bias = weights[2]
+
+        # Project the inputs of all the steps in one go
+        x_proj: ndarray = x @ kernel + input_bias
+
+        # Iterate over the steps
+        h: ndarray = zeros((x.shape[0], units), dtype=float32)
+        sequences: List[ndarray] = []
+        for step in NumpyModel._get_steps(x.shape[1], config):
+            x_z, x_r, x_h = split(x_proj[:, step], 3, axis=1)
+            if reset_after:
+                rec_z, rec_r, rec_h = split(h @ recurrent_kernel + recurrent_bias, 3, axis=1)
+                z = recurrent_activation(x_z + rec_z)
+                r = recurrent_activation(x_r + rec_r)
+                candidate = activation(x_h + r * rec_h)
+            else:
+                rec_z, rec_r = split(h @ recurrent_kernel[:, :2 * units], 2, axis=1)
+                z = recurrent_activation(x_z + rec_z)
+                r = recurrent_activation(x_r + rec_r)
+                candidate = activation(x_h + (r * h) @ recurrent_kernel[:, 2 * units:])
+            h = z * h + (1 - z) * candidate
+            sequences.append(h)
+
+        # Finally, return the output
+        return NumpyModel._get_recurrent_output(h, sequences, config)
+
+
+
+
+
+
+    @staticmethod
+    def _get_steps(steps: int, config: Dict[str, Any]) -> range:
+        """Retrieves the order in which a recurrent layer iterates over the steps.
+
+        Args:
+            steps: int
+                The number of steps in the input.
+            config: Dict[str, Any]
+                The configuration of the layer.
+
+        Returns:
+            range
+        """
+        return range(steps - 1, -1, -1) if config.get("go_backwards", False) else range(steps)
+
+
+
+
+
+
+    @staticmethod
+    def _get_recurrent_output(h: ndarray, sequences: List[ndarray], config: Dict[str, Any]) -> ndarray:
+        """Builds the output of a recurrent layer based on its configuration.
+
+        Args:
+            h: ndarray
+                The last hidden state (rows, units).
+            sequences: List[ndarray]
+                The hidden state of every step.
+            config: Dict[str, Any]
+                The configuration of the layer.
+
+        Returns:
+            ndarray (rows, steps, units) | (rows, units)
+        """
+        if config.get("return_sequences", False):
+            return asarray(sequences, dtype=float32).transpose(1, 0, 2)
+        else:
+            return h
\ No newline at end of file
@@ -0,0 +1,206 @@
+from typing import Union, List, Tuple
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from hashlib import blake2b
+from numpy import ndarray
+from modules._types import IPrediction, IPredictionCacheStats
+
+
+
+
+
+
+class PredictionCache:
+    """PredictionCache Class
+
+    This class stores the latest predictions in memory so duplicate requests (f.e.
+    retries within the same candlestick) are served without running the ensemble
+    again. Since the Epoch's seed is fixed, a prediction only depends on the model
+    and the window of close prices. The entries are evicted based on the capacity
+    (least recently used) and the ttl.
+
+    Instance Properties:
+        capacity: int
+            The maximum number of predictions that can be stored. If 0, the cache is
+            disabled.
+        ttl: int
+            The number of seconds a prediction remains valid.
+        entries: OrderedDict[bytes, Tuple[float, IPrediction]]
+            The stored predictions by key (expiration time, prediction). The least
+            recently used entry is placed first.
+        lock: Lock
+            The lock that serializes the access to the entries.
+        hits: int
+        misses: int
+        evictions: int
+            The counters of the cache.
+    """
+
+
+
+
+
+
+    ####################
+    ## Initialization ##
+    ####################
+
+
+
+    def __init__(self, capacity: int, ttl: int):
+        """Initializes the Prediction Cache Instance.
+
+        Args:
+            capacity: int
+                The maximum number of predictions that can be stored.
+            ttl: int
+                The number of seconds a prediction remains valid.
+        """
+        self.capacity: int = capacity
+        self.ttl: int = ttl
+        self.entries: "OrderedDict[bytes, Tuple[float, IPrediction]]" = OrderedDict()
+        self.lock: Lock = Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+
+
+
+
+
+
+
+
+
+
+    ###########
+    ## Cache ##
+    ###########
+
+
+
+
+
+    @staticmethod
+    def build_key(model_keys: List[Union[str, int]], close_prices: ndarray) -> bytes:
+        """Builds the key of a prediction by hashing the identity of the model and
+        the window of close prices.
+
+        Args:
+            model_keys: List[Union[str, int]]
+                The values that identify the model. F.e: epoch id, model id, sma window
+                size and regression lookback.
+            close_prices: ndarray
+                The window of close prices.
+
+        Returns:
+            bytes
+        """
+        key: blake2b = blake2b("|".join(str(k) for k in model_keys).encode("utf-8"), digest_size=16)
+        key.update(close_prices.tobytes())
+        return key.digest()
+
+
+
+
+
+
+    def get(self, key: bytes) -> Union[IPrediction, None]:
+        """Retrieves a copy of a stored prediction. If it doesn't exist or has
+        expired, it returns None.
+
+        Args:
+            key: bytes
+                The key of the prediction.
+
+        Returns:
+            Union[IPrediction, None]
+        """
+        # Make sure the cache is enabled
+        if self.capacity == 0:
+            return None
+
+        with self.lock:
+            # Retrieve the entry
+            entry: Union[Tuple[float, IPrediction], None] = self.entries.get(key)
+
+            # Discard it if it has expired
+            if entry is not None and entry[0] <= monotonic():
+                del self.entries[key]
+                self.evictions += 1
+                entry = None
+
+            # Handle a miss
+            if entry is None:
+                self.misses += 1
+                return None
+
+            # Handle a hit
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        # Return a copy so the stored prediction cannot be altered
+        return { **entry[1], "f": list(entry[1]["f"]) }
+
+
+
+
+
+
+    def set(self, key: bytes, pred: IPrediction) -> None:
+        """Stores a prediction. If the capacity is exceeded, the least recently
+        used prediction is evicted.
+
+        Args:
+            key: bytes
+                The key of the prediction.
+            pred: IPrediction
+                The prediction to be stored.
+        """
+        # Make sure the cache is enabled
+        if self.capacity == 0:
+            return
+
+        with self.lock:
+            # Store the prediction
+            self.entries[key] = (monotonic() + self.ttl, { **pred, "f": list(pred["f"]) })
+            self.entries.move_to_end(key)
+
+            # Evict the least recently used predictions
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+
+
+
+
+
+    def clear(self) -> None:
+        """Discards all the stored predictions. The counters are kept.
+        """
+        with self.lock:
+            self.entries.clear()
+
+
+
+
+
+
+    def get_stats(self) -> IPredictionCacheStats:
+        """Retrieves the state and the counters of the cache.
+
+        Returns:
+            IPredictionCacheStats
+        """
+        with self.lock:
+            return {
+                "capacity": self.capacity,
+                "ttl": self.ttl,
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
\ No newline at end of file
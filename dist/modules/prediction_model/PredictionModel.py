@@ -1,9 +1,17 @@
-from typing import List, Tuple
-from numpy import ndarray, array
-from pandas import DataFrame
-from modules._types import IEpochRecord, IPredictionResult, IPrediction, IMinSumFunction
+from typing import List, Tuple, Union
+from collections import OrderedDict
+from threading import local, Lock
+from numpy import ndarray, asarray, empty, cumsum, subtract, divide, isnan, isfinite, count_nonzero, float64, \
+    stack, flatnonzero, full, errstate
+from numpy.lib.stride_tricks import sliding_window_view
+from modules._types import IEpochRecord, IPredictionResult, IPrediction, IMinSumFunction, IBatchPrediction
+from modules.environment.Environment import ENV
 from modules.utils.Utils import Utils
 from modules.regression.Regression import Regression
+from modules.ensemble.Ensemble import Ensemble
+from modules.price_stream.PriceStream import PriceStream
+from modules.batch_dispatcher.BatchDispatcher import BatchDispatcher
+from modules.metrics.Metrics import Metrics
 
 
 
@@ -17,7 +25,10 @@ class PredictionModel:
     as the sub models.
 
     Class Properties:
-        ...
+        MAX_STREAMS: int
+            The maximum number of price streams kept by the model. When the limit
+            is reached, the least recently used stream is discarded and will have 
+            to resync.
 
     Instance Properties:
         Epoch:
@@ -36,7 +47,27 @@ class PredictionModel:
             min_increase_sum: float
             min_decrease_sum: float
             regressions: List[Regression]
+            ensemble: Ensemble
+            dispatcher: Union[BatchDispatcher, None]
+                The micro-batching dispatcher that coalesces the rows of concurrent
+                predictions. None if micro-batching is disabled.
+
+        Buffers:
+            buffers: local
+                The preallocated arrays used to build the input dataset. Each thread
+                owns its buffers so concurrent requests never share them.
+
+        Streaming:
+            streams: OrderedDict[str, PriceStream]
+                The price streams by ID, from the least to the most recently used. 
+                They are bound to the instance so they are discarded when the Epoch 
+                changes.
+            streams_lock: Lock
+                The lock used to create, reorder and discard streams.
     """
+    # The maximum number of price streams
+    MAX_STREAMS: int = 100
+
 
 
 
@@ -96,6 +127,54 @@ class PredictionModel:
             Regression(reg_config["id"], epoch_record["config"]["seed"]) for reg_config in epoch_record["model"]["regressions"]
         ]
 
+        # Fuse the regressions into a single inference function
+        self.ensemble: Ensemble = Ensemble(self.regressions)
+
+        # Init the micro-batching dispatcher (if enabled)
+        self.dispatcher: Union[BatchDispatcher, None] = BatchDispatcher(
+            self.ensemble.predict_features, 
+            ENV["MICRO_BATCH_MAX_SIZE"], 
+            ENV["MICRO_BATCH_MAX_WAIT_MS"] / 1000
+        ) if ENV["MICRO_BATCH_MAX_SIZE"] > 1 else None
+
+        # Init the input buffers
+        self.buffers: local = local()
+
+        # Init the price streams
+        self.streams: "OrderedDict[str, PriceStream]" = OrderedDict()
+        self.streams_lock: Lock = Lock()
+
+
+
+
+
+
+    def warm_up(self) -> None:
+        """Runs the regressions on a synthetic window so the inference function is 
+        traced before the model serves requests. The durations are not recorded so
+        the load does not skew the latency of the predictions. 
+        Keep in mind that the input buffers belong to the thread that loaded the 
+        model, the threads that serve requests allocate theirs on their first 
+        prediction.
+        """
+        self.ensemble.predict_features(self._make_regression_input_ds(full(
+            self.regression_lookback + self.sma_window_size - 1, 
+            (self.highest_price_sma + self.lowest_price_sma) / 2, 
+            dtype=float64
+        )))
+
+
+
+
+
+
+    def stop(self) -> None:
+        """Stops the background work of the model once it has been replaced. The
+        requests that are still using it are predicted inline.
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+
 
 
 
@@ -132,14 +211,230 @@ class PredictionModel:
                     highest_price_sma or lowest_price_sma established in the
                     Epoch.
         """
+        # Build the features
+        features: List[float] = self._build_features(close_prices)
+        
+        # Finally, return the prediction
+        return PredictionModel._make_prediction(features, Utils.get_time())
+
+
+
+
+
+
+    def predict_stream(self, stream_id: str, seq: int, close_prices: ndarray) -> IPrediction:
+        """Pushes the newest close prices into a price stream and generates a 
+        prediction based on its state. If the stream is out of sync, the full 
+        window must be provided.
+
+        Args:
+            stream_id: str
+                The identifier of the stream.
+            seq: int
+                The sequence number of the last close price in the payload.
+            close_prices: ndarray
+                The newest close prices in chronological order.
+
+        Returns:
+            IPrediction
+
+        Raises:
+            RuntimeError:
+                If the stream is out of sync and the full window was not provided.
+                If the min or max price sma in the lookback violates the 
+                    highest_price_sma or lowest_price_sma established in the
+                    Epoch.
+        """
+        # Retrieve the stream
+        stream: PriceStream = self._get_stream(stream_id)
+
+        # Update the stream and predict the features while its buffer is locked
+        with stream.lock:
+            with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict_stream", "stage": "input" }):
+                input_ds: ndarray = stream.update(seq, close_prices)
+            with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict_stream", "stage": "inference" }):
+                features: List[float] = self.ensemble.predict_features(input_ds)[0].tolist()
+
+        # Finally, return the prediction
+        return PredictionModel._make_prediction(features, Utils.get_time())
+
+
+
+
+
+
+    def _get_stream(self, stream_id: str) -> PriceStream:
+        """Retrieves a price stream and marks it as the most recently used. If it 
+        doesn't exist, it is created.
+
+        Args:
+            stream_id: str
+                The identifier of the stream.
+
+        Returns:
+            PriceStream
+        """
+        with self.streams_lock:
+            # Mark the stream as the most recently used
+            if stream_id in self.streams:
+                self.streams.move_to_end(stream_id)
+
+            # Otherwise, create it
+            else:
+                # Discard the least recently used stream if the limit has been reached
+                if len(self.streams) >= PredictionModel.MAX_STREAMS:
+                    self.streams.popitem(last=False)
+
+                # Create the stream
+                self.streams[stream_id] = PriceStream(
+                    stream_id,
+                    self.sma_window_size,
+                    self.regression_lookback,
+                    self.highest_price_sma,
+                    self.lowest_price_sma
+                )
+            return self.streams[stream_id]
+
+
+
+
+
+
+    def predict_batch(self, close_prices_batch: List[ndarray]) -> List[IBatchPrediction]:
+        """Generates a prediction for each window of close prices. All the windows
+        are predicted in one go and the errors are reported per window rather than
+        failing the whole batch.
+
+        Args:
+            close_prices_batch: List[ndarray]
+                The list of close price windows. Each window must contain 
+                regression_lookback + sma_window_size - 1 prices.
+
+        Returns:
+            List[IBatchPrediction]
+        """
+        # Init the results and the size of a window
+        results: List[Union[IBatchPrediction, None]] = [None] * len(close_prices_batch)
+        window_size: int = self.regression_lookback + self.sma_window_size - 1
+
+        # Windows with an invalid size cannot be stacked
+        indexes: List[int] = []
+        for i, window in enumerate(close_prices_batch):
+            if window.shape[0] == window_size:
+                indexes.append(i)
+            else:
+                results[i] = { "p": None, "e": self._get_rows_error(max(window.shape[0] - self.sma_window_size + 1, 0)) }
+
+        # Predict the stacked windows
+        windows: ndarray = stack([close_prices_batch[i] for i in indexes]) if len(indexes) > 0 else empty((0, window_size))
+        return self._predict_windows(windows, indexes, results)
+
+
+
+
+
+
+    def predict_series(self, close_prices: ndarray, stride: int) -> List[IBatchPrediction]:
+        """Splits a series of close prices into windows and generates a prediction
+        for each one of them. The windows are views of the series, so they are not
+        copied.
+
+        Args:
+            close_prices: ndarray
+                The series of close prices.
+            stride: int
+                The number of prices between the start of each window.
+
+        Returns:
+            List[IBatchPrediction]
+
+        Raises:
+            RuntimeError:
+                If the series is shorter than a window.
+        """
+        # Make sure the series contains at least one window
+        window_size: int = self.regression_lookback + self.sma_window_size - 1
+        if close_prices.shape[0] < window_size:
+            raise RuntimeError(self._get_rows_error(max(close_prices.shape[0] - self.sma_window_size + 1, 0)))
+
+        # Predict the windows
+        windows: ndarray = sliding_window_view(close_prices, window_size)[::stride]
+        return self._predict_windows(windows, list(range(windows.shape[0])), [None] * windows.shape[0])
+
+
+
+
+
+
+    def _predict_windows(
+        self, 
+        windows: ndarray, 
+        indexes: List[int], 
+        results: List[Union[IBatchPrediction, None]]
+    ) -> List[IBatchPrediction]:
+        """Builds the input dataset of the windows, runs the ensemble once on all
+        the valid rows and places the predictions in the results.
+
+        Args:
+            windows: ndarray
+                The stacked windows of close prices (rows, window_size).
+            indexes: List[int]
+                The position of each window within the results.
+            results: List[Union[IBatchPrediction, None]]
+                The results of the batch. Windows that already failed are populated.
+
+        Returns:
+            List[IBatchPrediction]
+        """
+        # Make sure there are windows to predict
+        if windows.shape[0] == 0:
+            return results
+
+        # Build the input dataset and report the windows that failed
+        with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict_batch", "stage": "input" }):
+            input_ds, errors = self._make_regression_input_batch(windows)
+        valid: List[int] = []
+        for i, error in enumerate(errors):
+            if error is None:
+                valid.append(i)
+            else:
+                results[indexes[i]] = { "p": None, "e": error }
+
+        # Predict the features of all the valid windows in one go
+        if len(valid) > 0:
+            current_time: int = Utils.get_time()
+            with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict_batch", "stage": "inference" }):
+                batch_features: List[List[float]] = self.ensemble.predict_features(input_ds[valid]).tolist()
+            for i, features in zip(valid, batch_features):
+                results[indexes[i]] = { "p": PredictionModel._make_prediction(features, current_time), "e": None }
+
+        # Finally, return the results
+        return results
+
+
+
+
+
+
+    @staticmethod
+    def _make_prediction(features: List[float], current_time: int) -> IPrediction:
+        """Packs the features into a prediction. Every route builds its predictions
+        here so they share the same shape.
+
+        Args:
+            features: List[float]
+                The features generated by the regressions.
+            current_time: int
+                The time in which the prediction was generated.
+
+        Returns:
+            IPrediction
+        """
         # Initialize the prediction result
         result: IPredictionResult = 0
 
-        # Build the features
-        features_sum, features = self._build_features(close_prices)
-        
         # Finally, return the prediction
-        return { "r": result, "t": Utils.get_time(), "f": features, "s": features_sum }
+        return { "r": result, "t": current_time, "f": features, "s": round(sum(features), 6) }
 
 
 
@@ -163,27 +458,31 @@ class PredictionModel:
 
 
 
-    def _build_features(self, close_prices: List[float]) -> Tuple[float, List[float]]:
+    def _build_features(self, close_prices: List[float]) -> List[float]:
         """Builds all the features that will be used by the prediction 
-        model in order to generate predictions. It returns both, the
-        list of features and the sum.
+        model in order to generate predictions.
 
         Args:
             close_prices: List[float]
                 The list of synced close prices that will be used to build the input ds.
 
         Returns:
-            Tuple[float, List[float]]
-            (features_sum, features)
+            List[float]
         """
         # Make the input dataset for the regressions
-        reg_input_ds: ndarray = self._make_regression_input_ds(close_prices)
+        with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict", "stage": "input" }):
+            reg_input_ds: ndarray = self._make_regression_input_ds(close_prices)
 
-        # Predict the regression features
-        features: List[float] = [reg.predict_feature(reg_input_ds) for reg in self.regressions]
+        # Predict the features of all the regressions in one go. If micro-batching is
+        # enabled, the row is predicted together with the ones of concurrent requests
+        with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict", "stage": "inference" }):
+            if self.dispatcher is not None:
+                features: List[float] = self.dispatcher.predict(reg_input_ds)[0].tolist()
+            else:
+                features = self.ensemble.predict_features(reg_input_ds)[0].tolist()
 
-        # Finally, return the packed features
-        return round(sum(features), 6), features
+        # Finally, return the features
+        return features
 
 
 
@@ -193,16 +492,20 @@ class PredictionModel:
     
 
 
-    def _make_regression_input_ds(self, close_prices: List[float]) -> ndarray:
+    def _make_regression_input_ds(self, close_prices: Union[List[float], ndarray]) -> ndarray:
         """Builds the input dataset that will be used to generate predictions
-        with regressions.
+        with regressions. The simple moving average is calculated with a cumulative
+        sum and the result is normalized straight into the thread's input buffer.
+
+        IMPORTANT: The returned array is reused by the next call within the same 
+        thread.
 
         Args:
-            close_prices: List[float]
+            close_prices: Union[List[float], ndarray]
                 The list of synced close prices that will be used to build the input ds.
 
         Returns:
-            ndarray
+            ndarray (1, regression_lookback)
 
         Raises:
             RuntimeError:
@@ -210,32 +513,184 @@ class PredictionModel:
                 If the sma dataset contains prices that violates the highest_price_sma
                     or lowest_price_sma.
         """
-        # Initialize the simple moving average df
-        df: DataFrame = DataFrame({ "c": close_prices })
-        df["c"] = df["c"].rolling(self.sma_window_size).mean()
-        df.dropna(inplace=True)
+        # Init the prices
+        prices: ndarray = asarray(close_prices, dtype=float64)
+
+        # Make sure the prices produce the correct number of sma rows
+        rows: int = max(prices.shape[0] - self.sma_window_size + 1, 0)
+        if rows != self.regression_lookback:
+            raise RuntimeError(self._get_rows_error(rows))
+
+        # Missing or infinite prices would leave the sma with less rows than required.
+        # They are rejected before the cumulative sum as they would spread to every
+        # value that follows them
+        if not isfinite(prices).all():
+            raise RuntimeError(self._get_rows_error(self._count_sma_rows(prices)))
+
+        # Calculate the simple moving average
+        cumsum_buffer, sma, input_ds = self._get_buffers()
+        cumsum_buffer[0] = 0
+        cumsum(prices, out=cumsum_buffer[1:])
+        subtract(cumsum_buffer[self.sma_window_size:], cumsum_buffer[:-self.sma_window_size], out=sma)
+        divide(sma, self.sma_window_size, out=sma)
+
+        # Ensure the sma prices don't violate the min and max established by the epoch.
+        # A cumulative sum that overflowed is reported as a violation of the max
+        max_sma: float = sma.max()
+        if isnan(max_sma) or max_sma >= self.highest_price_sma:
+            raise RuntimeError(self._get_max_error(max_sma))
+        min_sma: float = sma.min()
+        if min_sma <= self.lowest_price_sma:
+            raise RuntimeError(self._get_min_error(min_sma))
+
+        # Normalize the sma into the input buffer
+        subtract(sma, self.lowest_price_sma, out=sma)
+        divide(sma, self.highest_price_sma - self.lowest_price_sma, out=input_ds[0], casting="same_kind")
 
-        # Make sure the df contains the correct number of rows
-        if df.shape[0] != self.regression_lookback:
-            raise RuntimeError(Utils.api_error(f"The number of rows in the sma df does not \
-                match the regressions' lookback. Needs: {self.regression_lookback}, Has: {df.shape[0]}.", 503000))
+        # Finally, return the input dataset
+        return input_ds
 
-        # Ensure the sma prices within the df don't violate the min and max established by the epoch
-        if df["c"].max() >= self.highest_price_sma:
-            raise RuntimeError(Utils.api_error(f"The max price in the regression df {df['c'].max()} violates the \
-                highest value permitted in the Epoch {self.highest_price_sma}.", 503001))
-        elif df["c"].min() <= self.lowest_price_sma:
-            raise RuntimeError(Utils.api_error(f"The min price in the regression df {df['c'].min()} violates the \
-                lowest value permitted in the Epoch {self.lowest_price_sma}.", 503002))
 
-        # Normalize the df
-        df["c"] = df["c"].apply(lambda x: (x - self.lowest_price_sma) / (self.highest_price_sma - self.lowest_price_sma))
 
-        # Build the dataset
-        ds: ndarray = array([df["c"]])
 
-        # Clear the df from RAM
-        df = ""
 
-        # Finally, return the input dataset
-        return ds
\ No newline at end of file
+
+    def _get_buffers(self) -> Tuple[ndarray, ndarray, ndarray]:
+        """Retrieves the input buffers of the current thread. If they don't exist,
+        they are allocated.
+
+        Returns:
+            Tuple[ndarray, ndarray, ndarray]
+            (cumsum, sma, input_ds)
+        """
+        if not hasattr(self.buffers, "input_ds"):
+            self.buffers.cumsum = empty(self.regression_lookback + self.sma_window_size, dtype=float64)
+            self.buffers.sma = empty(self.regression_lookback, dtype=float64)
+            self.buffers.input_ds = empty((1, self.regression_lookback), dtype=float64)
+        return self.buffers.cumsum, self.buffers.sma, self.buffers.input_ds
+
+
+
+
+
+
+    def _make_regression_input_batch(self, windows: ndarray) -> Tuple[ndarray, List[Union[str, None]]]:
+        """Builds the input dataset for a batch of windows in one go. Rather than 
+        raising, the windows that violate the Epoch's constraints are reported in the 
+        list of errors.
+
+        Args:
+            windows: ndarray
+                The stacked windows of close prices (rows, regression_lookback + sma_window_size - 1).
+
+        Returns:
+            Tuple[ndarray, List[Union[str, None]]]
+            (input_ds (rows, regression_lookback), errors)
+        """
+        # Calculate the simple moving average of every window. The windows with missing
+        # or infinite prices are reported below, so their invalid values are ignored
+        finite: ndarray = isfinite(windows).all(axis=1)
+        cumsum_ds: ndarray = empty((windows.shape[0], windows.shape[1] + 1), dtype=float64)
+        cumsum_ds[:, 0] = 0
+        with errstate(invalid="ignore", over="ignore"):
+            cumsum(windows, axis=1, out=cumsum_ds[:, 1:])
+            sma: ndarray = (cumsum_ds[:, self.sma_window_size:] - cumsum_ds[:, :-self.sma_window_size]) / self.sma_window_size
+
+        # Ensure the sma prices don't violate the min and max established by the epoch
+        max_sma: ndarray = sma.max(axis=1)
+        min_sma: ndarray = sma.min(axis=1)
+        errors: List[Union[str, None]] = [None] * windows.shape[0]
+        for i in flatnonzero(~finite | isnan(max_sma) | (max_sma >= self.highest_price_sma) | (min_sma <= self.lowest_price_sma)):
+            if not finite[i]:
+                errors[i] = self._get_rows_error(self._count_sma_rows(windows[i]))
+            elif isnan(max_sma[i]) or max_sma[i] >= self.highest_price_sma:
+                errors[i] = self._get_max_error(max_sma[i])
+            else:
+                errors[i] = self._get_min_error(min_sma[i])
+
+        # Finally, return the normalized dataset and the errors
+        subtract(sma, self.lowest_price_sma, out=sma)
+        divide(sma, self.highest_price_sma - self.lowest_price_sma, out=sma)
+        return sma, errors
+
+
+
+
+
+
+
+
+
+
+
+    ############
+    ## Errors ##
+    ############
+
+
+
+
+
+    def _count_sma_rows(self, prices: ndarray) -> int:
+        """Counts the number of sma rows that can be calculated when the prices 
+        contain missing or infinite values.
+
+        Args:
+            prices: ndarray
+                The window of close prices.
+
+        Returns:
+            int
+        """
+        return count_nonzero(sliding_window_view(isfinite(prices), self.sma_window_size).all(axis=1))
+
+
+
+
+
+    def _get_rows_error(self, rows: int) -> str:
+        """Builds the error for a window that does not match the regressions' lookback.
+
+        Args:
+            rows: int
+                The number of sma rows in the window.
+
+        Returns:
+            str
+        """
+        return Utils.api_error(f"The number of rows in the sma df does not \
+            match the regressions' lookback. Needs: {self.regression_lookback}, Has: {rows}.", 503000)
+
+
+
+
+
+    def _get_max_error(self, max_sma: float) -> str:
+        """Builds the error for a window whose max sma exceeds the highest price sma.
+
+        Args:
+            max_sma: float
+                The max sma within the window.
+
+        Returns:
+            str
+        """
+        return Utils.api_error(f"The max price in the regression df {max_sma} violates the \
+            highest value permitted in the Epoch {self.highest_price_sma}.", 503001)
+
+
+
+
+
+    def _get_min_error(self, min_sma: float) -> str:
+        """Builds the error for a window whose min sma is below the lowest price sma.
+
+        Args:
+            min_sma: float
+                The min sma within the window.
+
+        Returns:
+            str
+        """
+        return Utils.api_error(f"The min price in the regression df {min_sma} violates the \
+            lowest value permitted in the Epoch {self.lowest_price_sma}.", 503002)
\ No newline at end of file
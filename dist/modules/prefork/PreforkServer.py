@@ -0,0 +1,447 @@
+from typing import Any, Dict, Set, Union
+from os import fork, kill, waitpid, getpid, getppid, _exit, WNOHANG
+from signal import signal, SIGTERM, SIGINT, SIGKILL, SIGUSR1, SIG_IGN, SIG_DFL
+from socket import socket, create_server
+from threading import Event
+from time import monotonic, sleep
+from gc import collect, freeze, unfreeze
+from traceback import print_exc
+from modules.environment.Environment import ENV
+from modules.utils.Utils import Utils
+from modules.database.Database import close_pool
+from modules.api_error.ApiError import log, flush as flush_api_errors
+from modules.epoch.Epoch import Epoch
+from modules.prefork.WaitressServer import WaitressServer
+
+
+
+
+
+
+class PreforkServer:
+    """PreforkServer Class
+
+    This class serves the API from several worker processes that share a single
+    listening socket, so the requests are not bound to a single interpreter.
+
+    When running on the NumPy backend, the master process loads the active epoch
+    before forking, so the workers share the model's weights copy-on-write (the
+    arrays are never written after being loaded). The master also watches the
+    active epoch and replaces the workers one by one once it has loaded a new one.
+    TensorFlow cannot be used safely across a fork, so on that backend each worker
+    loads the model and watches the active epoch on its own.
+
+    The master restarts the workers that crash and stops them gracefully when it
+    receives SIGTERM or SIGINT. A worker that receives SIGTERM stops accepting
+    connections from the shared socket and exits once the requests in progress
+    have been responded.
+
+    Instance Properties:
+        app: Any
+            The WSGI application.
+        host: str
+        port: int
+            The address the socket is bound to.
+        workers_count: int
+            The number of worker processes.
+        preload: bool
+            If True, the model is loaded by the master and shared with the workers.
+        socket: Union[socket, None]
+            The listening socket, created by the master and inherited by the workers.
+        workers: Dict[int, int]
+            The pids of the workers and the generation they belong to. A generation
+            is the version of the model the worker was forked with.
+        retiring: Set[int]
+            The pids of the workers that have been asked to stop. They are not restarted.
+        generation: int
+            The generation of the workers that are currently forked.
+        stopping: Event
+            Set when the master is stopping.
+        sync_requested: Event
+            Set when a worker received a request for an epoch that is not loaded
+            (SIGUSR1), so the master syncs the active epoch before the next poll.
+    """
+    # The number of seconds between the checks performed by the master
+    TICK: float = 1
+
+    # The number of seconds a server waits for the requests in progress once it
+    # has been asked to stop
+    DRAIN_TIMEOUT: float = 25
+
+    # The number of seconds a worker has to stop before it is killed. It must be
+    # greater than the DRAIN_TIMEOUT
+    GRACEFUL_TIMEOUT: float = 30
+
+
+
+
+
+
+    ####################
+    ## Initialization ##
+    ####################
+
+
+
+    def __init__(self, app: Any, host: str, port: int, workers_count: int):
+        """Initializes the Prefork Server Instance.
+
+        Args:
+            app: Any
+                The WSGI application.
+            host: str
+            port: int
+                The address the socket will be bound to.
+            workers_count: int
+                The number of worker processes.
+        """
+        self.app: Any = app
+        self.host: str = host
+        self.port: int = port
+        self.workers_count: int = workers_count
+        self.preload: bool = ENV["INFERENCE_BACKEND"] == "numpy"
+        self.socket: Union[socket, None] = None
+        self.workers: Dict[int, int] = {}
+        self.retiring: Set[int] = set()
+        self.generation: int = 0
+        self.stopping: Event = Event()
+        self.sync_requested: Event = Event()
+
+
+
+
+
+
+
+
+
+
+    ############
+    ## Master ##
+    ############
+
+
+
+
+
+    def run(self) -> None:
+        """Binds the socket, forks the workers and supervises them until the
+        master receives SIGTERM or SIGINT.
+        """
+        # Handle the termination signals
+        signal(SIGTERM, self._handle_stop)
+        signal(SIGINT, self._handle_stop)
+        signal(SIGUSR1, self._handle_sync_request)
+
+        # Bind the socket that will be shared by all the workers
+        self.socket = create_server((self.host, self.port), backlog=2048)
+
+        # Load the active epoch so it can be shared with the workers. Otherwise, each
+        # worker loads its own copy of the model
+        if self.preload:
+            self._sync_active_epoch()
+        else:
+            Utils.print(
+                f"WARNING: The {ENV['INFERENCE_BACKEND']} backend cannot share the model across workers. "
+                f"Each of the {self.workers_count} workers loads its own copy of the model and polls the active "
+                f"epoch, so the memory used by the model and the database polling are multiplied by "
+                f"{self.workers_count}. Use INFERENCE_BACKEND=numpy to share it."
+            )
+
+        # Fork the workers
+        for _ in range(self.workers_count):
+            self._spawn()
+
+        # Supervise the workers
+        next_sync: float = monotonic() + ENV["EPOCH_POLL_INTERVAL"]
+        next_requested_sync: float = monotonic()
+        while not self.stopping.wait(PreforkServer.TICK):
+            # Restart the workers that crashed
+            self._reap()
+
+            # Replace the workers if a new epoch was loaded. The syncs requested by 
+            # the workers are throttled
+            requested: bool = self.sync_requested.is_set() and monotonic() >= next_requested_sync
+            if self.preload and ENV["EPOCH_POLL_INTERVAL"] > 0 and (requested or monotonic() >= next_sync):
+                self.sync_requested.clear()
+                next_sync = monotonic() + ENV["EPOCH_POLL_INTERVAL"]
+                next_requested_sync = monotonic() + Epoch.REQUESTED_SYNC_INTERVAL
+                if self._sync_active_epoch():
+                    self._replace_workers()
+
+        # Stop the workers
+        self._stop_workers()
+        self.socket.close()
+
+
+
+
+
+
+    def _sync_active_epoch(self) -> bool:
+        """Loads the model of the active epoch in the master (if it changed). Errors
+        are logged, the workers keep the model they have.
+
+        Returns:
+            bool
+            True if a new model was loaded.
+        """
+        previous_model: Any = Epoch.MODEL
+        try:
+            epoch_id: Union[str, None] = Epoch.sync_active_epoch()
+            if Epoch.MODEL is not previous_model:
+                Utils.print(f"Epoch: {epoch_id}")
+        except Exception as e:
+            log("PreforkServer.sync_active_epoch", e)
+            Utils.print(f"Epoch: The active epoch could not be synced: {str(e)}")
+        return Epoch.MODEL is not previous_model
+
+
+
+
+
+
+    def _spawn(self) -> None:
+        """Forks a worker of the current generation. The state that cannot be
+        shared (database connections, pending api errors) is released beforehand
+        and the objects that exist at this point are frozen so the garbage
+        collector of the workers does not copy the pages they live in.
+        """
+        # Release the state that cannot be shared
+        flush_api_errors()
+        close_pool()
+        unfreeze()
+        collect()
+        freeze()
+
+        # Fork the worker
+        pid: int = fork()
+        if pid == 0:
+            exit_code: int = 1
+            try:
+                self._work()
+                exit_code = 0
+            except BaseException:
+                print_exc()
+            finally:
+                _exit(exit_code)
+        self.workers[pid] = self.generation
+        Utils.print(f"Worker {pid} started (generation {self.generation}).")
+
+
+
+
+
+
+    def _reap(self) -> None:
+        """Collects the workers that exited and restarts the ones that were not
+        retired.
+        """
+        while len(self.workers) > 0:
+            # Check if any worker exited
+            try:
+                pid, status = waitpid(-1, WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            # Restart it unless it was retired
+            self.workers.pop(pid, None)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            elif not self.stopping.is_set():
+                Utils.print(f"Worker {pid} exited unexpectedly ({status}). Restarting it.")
+                self._spawn()
+
+
+
+
+
+
+    def _replace_workers(self) -> None:
+        """Replaces the workers one by one with workers that share the new model.
+        Each old worker is retired once its replacement has been forked, so the
+        socket always has workers accepting connections.
+        """
+        self.generation += 1
+        Utils.print(f"Replacing the workers (generation {self.generation}).")
+        for pid, generation in list(self.workers.items()):
+            if generation < self.generation:
+                self._spawn()
+                self._retire(pid)
+
+
+
+
+
+
+    def _retire(self, pid: int) -> None:
+        """Asks a worker to stop gracefully.
+
+        Args:
+            pid: int
+                The pid of the worker.
+        """
+        self.retiring.add(pid)
+        try:
+            kill(pid, SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+
+
+
+
+    def _stop_workers(self) -> None:
+        """Asks all the workers to stop gracefully and kills the ones that are still
+        running once the timeout elapses.
+        """
+        # Ask the workers to stop
+        for pid in list(self.workers.keys()):
+            self._retire(pid)
+
+        # Wait for them
+        deadline: float = monotonic() + PreforkServer.GRACEFUL_TIMEOUT
+        while len(self.workers) > 0 and monotonic() < deadline:
+            self._reap()
+            sleep(0.1)
+
+        # Kill the ones that did not stop
+        for pid in list(self.workers.keys()):
+            try:
+                kill(pid, SIGKILL)
+                waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.workers.clear()
+
+
+
+
+
+
+    def _handle_stop(self, signum: int, frame: Any) -> None:
+        """Stops the master once the current tick completes.
+
+        Args:
+            signum: int
+            frame: Any
+        """
+        self.stopping.set()
+
+
+
+
+
+
+    def _handle_sync_request(self, signum: int, frame: Any) -> None:
+        """Syncs the active epoch once the current tick completes.
+
+        Args:
+            signum: int
+            frame: Any
+        """
+        self.sync_requested.set()
+
+
+
+
+
+
+
+
+
+
+    ############
+    ## Worker ##
+    ############
+
+
+
+
+
+    def _work(self) -> None:
+        """Serves the API from the shared socket until the worker receives SIGTERM.
+        """
+        # The master coordinates the shutdown
+        signal(SIGINT, SIG_IGN)
+
+        # Load the model and watch the active epoch if it wasn't loaded by the master
+        if not self.preload:
+            try:
+                Utils.print(f"Worker {getpid()} Epoch: {Epoch.initialize()}")
+            except Exception as e:
+                log("PreforkServer.initialize", e)
+                Utils.print(f"Worker {getpid()} Epoch: The active epoch could not be initialized: {str(e)}")
+            Epoch.start_watcher()
+
+        # Otherwise, ask the master to sync the active epoch when a request needs it
+        elif ENV["EPOCH_POLL_INTERVAL"] > 0:
+            master: int = getppid()
+            Epoch.SYNC_REQUESTER = lambda: kill(master, SIGUSR1)
+
+        # Serve the API
+        PreforkServer.serve(self.app, self.socket)
+
+        # Write the pending api errors before exiting
+        flush_api_errors()
+
+
+
+
+
+
+
+
+
+
+
+    #############
+    ## Serving ##
+    #############
+
+
+
+
+
+    @staticmethod
+    def serve(app: Any, sock: socket) -> None:
+        """Serves a WSGI application with waitress until the process receives 
+        SIGTERM. Once it does, the server stops accepting connections and keeps 
+        running until the responses of the requests in progress have been sent 
+        (up to DRAIN_TIMEOUT seconds). Idle connections are closed right away.
+
+        Args:
+            app: Any
+                The WSGI application.
+            sock: socket
+                The listening socket. It can be shared with other processes.
+        """
+        # Init the server
+        server: WaitressServer = WaitressServer(app, sock)
+
+        # SIGTERM wakes the server up so it can stop
+        stopping: Event = Event()
+        def _handle_stop(signum: int, frame: Any) -> None:
+            stopping.set()
+            server.wake_up()
+        signal(SIGTERM, _handle_stop)
+
+        # Serve the requests until the server is asked to stop
+        server.serve_until(stopping)
+
+        # Stop accepting connections. The ones that are queued in the shared socket 
+        # are accepted by the other workers
+        server.stop_accepting()
+
+        # Keep running until the responses have been sent. The connections that are
+        # idle are closed
+        deadline: float = monotonic() + PreforkServer.DRAIN_TIMEOUT
+        while server.close_idle_channels() > 0 and monotonic() < deadline:
+            server.poll(0.1)
+
+        # Finally, release the server
+        server.close()
+        signal(SIGTERM, SIG_DFL)
\ No newline at end of file
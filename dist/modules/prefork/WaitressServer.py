@@ -0,0 +1,180 @@
+from typing import Any, List
+from threading import Event
+from socket import socket
+from logging import basicConfig
+from waitress import wasyncore
+from waitress.server import create_server
+
+
+
+
+
+
+class WaitressServer:
+    """WaitressServer Class
+
+    This class wraps a waitress server so its event loop can be driven one iteration
+    at a time and drained before exiting. Waitress doesn't provide a public API for
+    this, so the server and the channels are accessed through their internals, which
+    were checked against waitress==2.1.1 (pinned in requirements.txt). The internals
+    are verified when the server is created, so an upgrade that removes them fails
+    on start up rather than silently breaking the shutdown.
+
+    Instance Properties:
+        server: Any
+            The waitress server (TcpWSGIServer).
+    """
+    # The internals of the server and the channels that are used
+    SERVER_ATTRIBUTES: List[str] = [
+        "_map", "active_channels", "accepting", "adj", "task_dispatcher", "channel_class", "pull_trigger",
+        "del_channel", "close", "print_listen"
+    ]
+    CHANNEL_ATTRIBUTES: List[str] = ["request", "will_close", "total_outbufs_len"]
+    ADJUSTMENTS_ATTRIBUTES: List[str] = ["asyncore_loop_timeout", "asyncore_use_poll"]
+
+
+
+
+
+
+    ####################
+    ## Initialization ##
+    ####################
+
+
+
+    def __init__(self, app: Any, sock: socket):
+        """Initializes the Waitress Server Instance and verifies its internals.
+
+        Args:
+            app: Any
+                The WSGI application.
+            sock: socket
+                The listening socket. It can be shared with other processes.
+        """
+        basicConfig()
+        self.server: Any = create_server(app, sockets=[sock])
+        WaitressServer.check_internals(self.server)
+        self.server.print_listen("Serving on http://{}:{}")
+
+
+
+
+
+
+    @staticmethod
+    def check_internals(server: Any) -> None:
+        """Verifies the server exposes the internals used to drain it.
+
+        Args:
+            server: Any
+                The waitress server.
+
+        Raises:
+            RuntimeError:
+                If any of the internals is missing.
+        """
+        missing: List[str] = [f"server.{attr}" for attr in WaitressServer.SERVER_ATTRIBUTES if not hasattr(server, attr)]
+        if hasattr(server, "adj"):
+            missing += [f"adj.{attr}" for attr in WaitressServer.ADJUSTMENTS_ATTRIBUTES if not hasattr(server.adj, attr)]
+        if hasattr(server, "channel_class"):
+            missing += [
+                f"channel.{attr}" for attr in WaitressServer.CHANNEL_ATTRIBUTES if not hasattr(server.channel_class, attr)
+            ]
+        if hasattr(server, "task_dispatcher") and not hasattr(server.task_dispatcher, "shutdown"):
+            missing.append("task_dispatcher.shutdown")
+        if len(missing) > 0:
+            raise RuntimeError(f"The installed waitress version is not supported. Missing: {', '.join(missing)}.")
+
+
+
+
+
+
+
+
+
+
+    #############
+    ## Serving ##
+    #############
+
+
+
+
+    def poll(self, timeout: float) -> None:
+        """Runs a single iteration of the event loop.
+
+        Args:
+            timeout: float
+                The maximum number of seconds to wait for events.
+        """
+        wasyncore.loop(timeout=timeout, map=self.server._map, use_poll=self.server.adj.asyncore_use_poll, count=1)
+
+
+
+
+
+
+    def serve_until(self, stopping: Event) -> None:
+        """Runs the event loop until the event is set.
+
+        Args:
+            stopping: Event
+                The event that stops the server. wake_up must be invoked once it is set.
+        """
+        while not stopping.is_set():
+            self.poll(self.server.adj.asyncore_loop_timeout)
+
+
+
+
+
+
+    def wake_up(self) -> None:
+        """Interrupts the current iteration of the event loop. It can be invoked
+        from a signal handler.
+        """
+        self.server.pull_trigger()
+
+
+
+
+
+
+    def stop_accepting(self) -> None:
+        """Stops accepting connections. The ones that are queued in a shared socket
+        are accepted by the other processes.
+        """
+        self.server.accepting = False
+        self.server.del_channel()
+
+
+
+
+
+
+    def close_idle_channels(self) -> int:
+        """Closes the connections that are idle (no request in progress and nothing
+        left to send) and counts the ones that are still active.
+
+        Returns:
+            int
+            The number of connections that are still open.
+        """
+        channels: List[Any] = list(self.server.active_channels.values())
+        for channel in channels:
+            if len(channel.requests) == 0 and channel.request is None and channel.total_outbufs_len == 0:
+                channel.will_close = True
+        return len(channels)
+
+
+
+
+
+
+    def close(self) -> None:
+        """Stops the task threads and releases the server.
+        """
+        self.server.task_dispatcher.shutdown(timeout=1)
+        self.server.close()
\ No newline at end of file
@@ -0,0 +1,288 @@
+from typing import Union
+from threading import Lock
+from numpy import ndarray, empty, cumsum, float64
+from modules.utils.Utils import Utils
+
+
+
+
+
+
+class PriceStream:
+    """PriceStream Class
+
+    This class keeps the state required to build the regressions' input incrementally
+    as new candlesticks are pushed. The raw close prices are stored in a ring buffer
+    with a running sum, so each new close updates the simple moving average in
+    constant time. The normalized sma values are written twice in a buffer of double
+    length so the input dataset is always available as a contiguous view.
+
+    Instance Properties:
+        id: str
+            The identifier of the stream.
+        sma_window_size: int
+        regression_lookback: int
+        highest_price_sma: float
+        lowest_price_sma: float
+            The Epoch's configuration.
+        window_size: int
+            The number of close prices required to build the input dataset.
+        seq: Union[int, None]
+            The sequence number of the last close price that was pushed. If None, the
+            stream has not been synced yet.
+        lock: Lock
+            The lock that serializes the updates and the predictions of the stream.
+
+    Buffers:
+        closes: ndarray (sma_window_size)
+        close_index: int
+        close_sum: float
+            The ring buffer of raw close prices, the position of the oldest one and
+            their sum.
+        sma: ndarray (regression_lookback)
+        normalized: ndarray (1, regression_lookback * 2)
+        sma_index: int
+            The ring buffer of sma values, the mirrored normalized values and the
+            position of the oldest one.
+        violations: int
+            The number of sma values within the lookback that violate the highest or
+            lowest price sma.
+    """
+
+
+
+
+
+
+    ####################
+    ## Initialization ##
+    ####################
+
+
+
+    def __init__(
+        self,
+        id: str,
+        sma_window_size: int,
+        regression_lookback: int,
+        highest_price_sma: float,
+        lowest_price_sma: float
+    ):
+        """Initializes an empty Price Stream.
+
+        Args:
+            id: str
+                The identifier of the stream.
+            sma_window_size: int
+                The Epoch's simple moving average window size.
+            regression_lookback: int
+                The Epoch's regression lookback.
+            highest_price_sma: float
+            lowest_price_sma: float
+                The Epoch's highest and lowest price sma.
+        """
+        # Init the config
+        self.id: str = id
+        self.sma_window_size: int = sma_window_size
+        self.regression_lookback: int = regression_lookback
+        self.highest_price_sma: float = highest_price_sma
+        self.lowest_price_sma: float = lowest_price_sma
+        self.window_size: int = regression_lookback + sma_window_size - 1
+
+        # Init the state
+        self.seq: Union[int, None] = None
+        self.lock: Lock = Lock()
+
+        # Init the buffers
+        self.closes: ndarray = empty(sma_window_size, dtype=float64)
+        self.close_index: int = 0
+        self.close_sum: float = 0
+        self.sma: ndarray = empty(regression_lookback, dtype=float64)
+        self.normalized: ndarray = empty((1, regression_lookback * 2), dtype=float64)
+        self.sma_index: int = 0
+        self.violations: int = 0
+
+
+
+
+
+
+
+
+
+
+
+    ############
+    ## Update ##
+    ############
+
+
+
+
+
+    def update(self, seq: int, close_prices: ndarray) -> ndarray:
+        """Pushes the new close prices into the stream and returns the input dataset.
+        If the payload contains a full window, the stream is resynced. Otherwise, the
+        payload must continue (or overlap) the sequence of the stream.
+
+        IMPORTANT: The returned array is a view of the stream's buffer. The stream's
+        lock must be held until it is no longer needed.
+
+        Args:
+            seq: int
+                The sequence number of the last close price in the payload.
+            close_prices: ndarray
+                The newest close prices in chronological order.
+
+        Returns:
+            ndarray (1, regression_lookback)
+
+        Raises:
+            RuntimeError:
+                If the payload does not continue the sequence and it does not contain
+                    a full window.
+                If the sma prices violate the highest_price_sma or lowest_price_sma.
+        """
+        # Resync the stream if a full window was provided
+        if close_prices.shape[0] >= self.window_size:
+            self._reset(seq, close_prices[-self.window_size:])
+
+        # Push the closes that have not been seen. Retries of the last update are
+        # handled gracefully as they don't contain new closes.
+        elif self.seq is not None and self.seq <= seq and seq - close_prices.shape[0] <= self.seq:
+            for close in close_prices[close_prices.shape[0] - (seq - self.seq):]:
+                self._push(close)
+            self.seq = seq
+
+        # Otherwise, the full window is needed
+        else:
+            raise RuntimeError(Utils.api_error(f"The price stream {self.id} is out of sync. Has: {self.seq}, \
+                Received: {seq - close_prices.shape[0] + 1} - {seq}. The full window must be provided.", 503003))
+
+        # Ensure the sma prices don't violate the min and max established by the epoch
+        if self.violations > 0:
+            if self.sma.max() >= self.highest_price_sma:
+                raise RuntimeError(Utils.api_error(f"The max price in the regression df {self.sma.max()} violates the \
+                    highest value permitted in the Epoch {self.highest_price_sma}.", 503001))
+            else:
+                raise RuntimeError(Utils.api_error(f"The min price in the regression df {self.sma.min()} violates the \
+                    lowest value permitted in the Epoch {self.lowest_price_sma}.", 503002))
+
+        # Finally, return the view of the input dataset
+        return self.normalized[:, self.sma_index:self.sma_index + self.regression_lookback]
+
+
+
+
+
+
+    def _reset(self, seq: int, close_prices: ndarray) -> None:
+        """Rebuilds the state of the stream based on a full window of close prices.
+
+        Args:
+            seq: int
+                The sequence number of the last close price.
+            close_prices: ndarray
+                The full window of close prices (window_size).
+        """
+        # Init the ring buffer of raw prices. The oldest price is placed first
+        self.closes[:] = close_prices[-self.sma_window_size:]
+        self.close_index = 0
+        self.close_sum = float(self.closes.sum())
+
+        # Calculate the sma values
+        price_cumsum: ndarray = cumsum(close_prices)
+        self.sma[0] = price_cumsum[self.sma_window_size - 1]
+        self.sma[1:] = price_cumsum[self.sma_window_size:] - price_cumsum[:-self.sma_window_size]
+        self.sma /= self.sma_window_size
+        self.sma_index = 0
+
+        # Normalize the values and mirror them
+        self.normalized[0, :self.regression_lookback] = self._normalize(self.sma)
+        self.normalized[0, self.regression_lookback:] = self.normalized[0, :self.regression_lookback]
+
+        # Count the violations
+        self.violations = int(((self.sma >= self.highest_price_sma) | (self.sma <= self.lowest_price_sma)).sum())
+
+        # Set the sequence
+        self.seq = seq
+
+
+
+
+
+
+    def _push(self, close: float) -> None:
+        """Pushes a close price into the stream in constant time.
+
+        Args:
+            close: float
+                The newest close price.
+        """
+        # Replace the oldest raw price and update the running sum
+        self.close_sum += close - self.closes[self.close_index]
+        self.closes[self.close_index] = close
+        self.close_index = (self.close_index + 1) % self.sma_window_size
+
+        # Recalculate the sum whenever the ring buffer wraps so the floating point
+        # errors of the running sum don't accumulate
+        if self.close_index == 0:
+            self.close_sum = float(self.closes.sum())
+
+        # Replace the oldest sma value and keep track of the violations
+        sma: float = self.close_sum / self.sma_window_size
+        self.violations += self._is_violation(sma) - self._is_violation(self.sma[self.sma_index])
+        self.sma[self.sma_index] = sma
+
+        # Write the normalized value in both halves of the buffer
+        normalized: float = self._normalize(sma)
+        self.normalized[0, self.sma_index] = normalized
+        self.normalized[0, self.sma_index + self.regression_lookback] = normalized
+        self.sma_index = (self.sma_index + 1) % self.regression_lookback
+
+
+
+
+
+
+
+
+
+
+
+    #############
+    ## Helpers ##
+    #############
+
+
+
+
+
+    def _normalize(self, sma: Union[float, ndarray]) -> Union[float, ndarray]:
+        """Normalizes sma values based on the Epoch's highest and lowest price sma.
+
+        Args:
+            sma: Union[float, ndarray]
+                The sma value(s) to normalize.
+
+        Returns:
+            Union[float, ndarray]
+        """
+        return (sma - self.lowest_price_sma) / (self.highest_price_sma - self.lowest_price_sma)
+
+
+
+
+
+
+    def _is_violation(self, sma: float) -> int:
+        """Checks if an sma value violates the highest or lowest price sma.
+
+        Args:
+            sma: float
+                The sma value.
+
+        Returns:
+            int (1 if it violates the boundaries, 0 otherwise)
+        """
+        return 1 if sma >= self.highest_price_sma or sma <= self.lowest_price_sma else 0
\ No newline at end of file
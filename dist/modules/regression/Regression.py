@@ -1,12 +1,9 @@
-from typing import List
+from typing import Union, Any
 from random import seed
 from numpy.random import seed as npseed
-from tensorflow import random as tf_random
-from numpy import ndarray
 from h5py import File as h5pyFile
-from tensorflow.python.keras.saving.hdf5_format import load_model_from_hdf5
-from keras import Sequential
-from modules.utils.Utils import Utils
+from modules.environment.Environment import ENV
+from modules.numpy_model.NumpyModel import NumpyModel
 
 
 
@@ -17,6 +14,8 @@ class Regression:
     """Regression Class
 
     This class handles the initialization and management of a Keras Regression Model.
+    Depending on the INFERENCE_BACKEND, the model is loaded with TensorFlow or with
+    the NumPy Model, in which case TensorFlow is never imported.
 
     Class Properties:
         MODEL_PATH: str
@@ -34,7 +33,7 @@ class Regression:
             The number of prediction candlesticks that will be used to generate predictions.
         predictions: int
             The number of predictions to be generated.
-        model: Sequential
+        model: Union[Sequential, NumpyModel]
             The instance of the trained model.
     """
     # The path in which the regression model files are located
@@ -75,7 +74,7 @@ class Regression:
             self.description: str = model_file.attrs["description"]
             self.lookback: int = int(model_file.attrs["lookback"])          # Downcast to int
             self.predictions: int = int(model_file.attrs["predictions"])    # Downcast to int
-            self.model: Sequential = load_model_from_hdf5(model_file)
+            self.model: Union[Any, NumpyModel] = Regression._load_model(model_file)
 
         # Make sure the IDs are identical
         if self.id != id:
@@ -96,159 +95,30 @@ class Regression:
         # Set the Epoch's Seed on all required libraries
         seed(epoch_seed)
         npseed(epoch_seed)
-        tf_random.set_seed(epoch_seed)
+        if ENV["INFERENCE_BACKEND"] == "tensorflow":
+            from tensorflow import random as tf_random
+            tf_random.set_seed(epoch_seed)
 
 
 
 
 
 
-
-
-
-
-
-    #################
-    ## Prediction  ##
-    #################
-
-
-
-
-
-    def predict(self, input_ds: ndarray) -> List[List[float]]:
-        """Generates predictions based on the provided features.
-
-        Args:
-            input_ds: ndarray
-                The dataset that will be used as input in order to generate
-                predictions. Keep in mind that it is best to generate all 
-                the predictions in one go.
-
-        Returns:
-            List[float]
-        """
-        # Generate the predictions
-        preds: ndarray = self.model.predict_on_batch(input_ds)
-
-        # Finally, return them in a list format
-        return preds.tolist()[0]
-
-
-
-
-
-
-
-
-
-
-
-
-    #############
-    ## Feature ##
-    #############
-
-
-
-
-
-    def predict_feature(self, input_ds: ndarray) -> float:
-        """Generates predictions based on the provided input dataset. Then, it converts
-        them into features.
-
-        Args:
-            input_ds: ndarray
-                The features dataset that will be used to generate predictions.
-
-        Returns:
-            float
-        """
-        # Firstly, predict the next trend
-        preds: List[float] = self.predict(input_ds)
-
-        # Finally, return the predicted feature
-        return self._normalize_feature(Utils.get_percentage_change(input_ds[0, -1], preds[-1]))
-
-
-
-
-
-
-
-
-    def _normalize_feature(self, predicted_change: float) -> float:
-        """Given a predicted change, it will scale it to a range between
-        -1 and 1 accordingly.
-
-        Args:
-            predicted_change: float
-                The percentage change between the current price and the last
-                predicted price.
-
-        Returns:
-            float
-        """
-        # Retrieve the adjusted change
-        adjusted_change: float = self._calculate_adjusted_change(predicted_change)
-
-        # Scale the increase change
-        if adjusted_change > 0:
-            return self._scale_feature(adjusted_change)
-        
-        # Scale the decrease change, keep in mind that the decrease data is in negative numbers.
-        elif adjusted_change < 0:
-            return -(self._scale_feature(-(adjusted_change)))
-        
-        # Otherwise, return 0 as a sign of neutrality
-        else:
-            return 0
-
-
-
-
-
-
-
-    def _calculate_adjusted_change(self, change: float) -> float:
-        """Adjusts the provided change to the min and max values in the
-        regression discovery.
+    @staticmethod
+    def _load_model(model_file: h5pyFile) -> Union[Any, NumpyModel]:
+        """Loads the model stored in the file based on the inference backend.
+        TensorFlow is imported lazily so it is not loaded when running on the
+        NumPy backend.
 
         Args:
-            change: float
-                The percentage change from the current price to the last 
-                prediction.
+            model_file: h5pyFile
+                The opened HDF5 file of the model.
 
         Returns:
-            float
+            Union[Sequential, NumpyModel]
         """
-        if change >= Regression.MIN_FEATURE_VALUE and change <= Regression.MAX_FEATURE_VALUE:
-            return change
-        elif change > Regression.MAX_FEATURE_VALUE:
-            return Regression.MAX_FEATURE_VALUE
-        elif change >= -(Regression.MAX_FEATURE_VALUE) and change <= -(Regression.MIN_FEATURE_VALUE):
-            return change
-        elif change < -(Regression.MAX_FEATURE_VALUE):
-            return -(Regression.MAX_FEATURE_VALUE)
+        if ENV["INFERENCE_BACKEND"] == "numpy":
+            return NumpyModel(model_file)
         else:
-            return 0
-
-
-
-
-
-    def _scale_feature(self, value: float) -> float:
-        """Scales a prediction change based on the regression's min and max
-        feature values
-
-        Args:
-            value: float
-                The predicted price change that needs to be scaled.
-
-        Returns: 
-            float
-        """
-        return round(
-            (value - Regression.MIN_FEATURE_VALUE) / (Regression.MAX_FEATURE_VALUE - Regression.MIN_FEATURE_VALUE), 
-            6
-        )
\ No newline at end of file
+            from tensorflow.python.keras.saving.hdf5_format import load_model_from_hdf5
+            return load_model_from_hdf5(model_file)
\ No newline at end of file
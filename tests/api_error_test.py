@@ -1,9 +1,12 @@
 from unittest import TestCase, main
-from typing import Dict, Any, List
-from modules._types import IApiErrorRecord
+from typing import Dict, Any, List, Tuple
+from threading import Event
+from time import sleep
+from modules._types import IApiErrorRecord, IApiErrorWriterStats
 from modules.environment.Environment import ENV
 from modules.database.Database import TN, read_query, write_query
-from modules.api_error.ApiError import log
+from modules.api_error.ApiError import log, flush
+from modules.api_error.ApiErrorWriter import ApiErrorWriter
 
 
 
@@ -92,6 +95,7 @@ class ApiErrorTestCase(TestCase):
 
         # Log the error
         log(origin, error_msg)
+        flush()
 
         # Retrieve all errors
         errors = _get_all()
@@ -119,6 +123,7 @@ class ApiErrorTestCase(TestCase):
 
         # Log the error
         log(origin, error_msg, dict)
+        flush()
 
         # Retrieve all errors
         errors: List[IApiErrorRecord] = _get_all()
@@ -154,6 +159,7 @@ class ApiErrorTestCase(TestCase):
         except Exception as error:
             # Log the error
             log(o, error, p)
+            flush()
 
             # Retrieve all errors
             errors: List[IApiErrorRecord] = _get_all()
@@ -171,6 +177,82 @@ class ApiErrorTestCase(TestCase):
 
 
 
+# Test Class
+class ApiErrorWriterTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        self.batches: List[List[Tuple[Any]]] = []
+
+    # After Tests
+    def tearDown(self):
+        pass
+
+
+
+    # Stub of the database write
+    def _write(self, rows: List[Tuple[Any]]) -> None:
+        self.batches.append(rows)
+
+
+
+
+
+    # Can write the queued rows in batches
+    def testBatches(self):
+        writer: ApiErrorWriter = ApiErrorWriter(self._write, capacity=100, batch_size=10)
+        for i in range(25):
+            self.assertTrue(writer.put((origin, error_msg, i, None, None, None)))
+        writer.flush()
+
+        # Validate the batches
+        self.assertEqual(sum(len(batch) for batch in self.batches), 25)
+        self.assertTrue(all(len(batch) <= 10 for batch in self.batches))
+        self.assertListEqual(sorted(row[2] for batch in self.batches for row in batch), list(range(25)))
+
+        # Validate the counters
+        stats: IApiErrorWriterStats = writer.get_stats()
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["written"], 25)
+        self.assertEqual(stats["dropped"], 0)
+        self.assertEqual(stats["failed"], 0)
+
+
+
+    # Drops the rows when the queue is full
+    def testOverflow(self):
+        # Block the worker on the first write
+        release: Event = Event()
+        writer: ApiErrorWriter = ApiErrorWriter(lambda rows: release.wait(), capacity=5, batch_size=1)
+        writer.put((origin, error_msg, 0, None, None, None))
+        while writer.queue.qsize() > 0:
+            sleep(0.01)
+
+        # Fill the queue
+        for i in range(5):
+            self.assertTrue(writer.put((origin, error_msg, i, None, None, None)))
+        self.assertFalse(writer.put((origin, error_msg, 5, None, None, None)))
+
+        # Release the worker and flush
+        release.set()
+        writer.flush()
+        stats: IApiErrorWriterStats = writer.get_stats()
+        self.assertEqual(stats["written"], 6)
+        self.assertEqual(stats["dropped"], 1)
+
+
+
+    # Counts the rows that could not be written
+    def testFailedWrite(self):
+        def _fail(rows: List[Tuple[Any]]) -> None:
+            raise Exception("The database is down.")
+        writer: ApiErrorWriter = ApiErrorWriter(_fail, capacity=10, batch_size=10)
+        writer.put((origin, error_msg, 0, None, None, None))
+        writer.flush()
+        self.assertEqual(writer.get_stats()["failed"], 1)
+
+
+
+
 # Test Execution
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+from unittest import TestCase, main
+from typing import List
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from numpy import ndarray, array
+from modules.environment.Environment import ENV
+from modules.batch_dispatcher.BatchDispatcher import BatchDispatcher
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+
+# Test Predict Function
+# Doubles the rows and keeps track of the size of each batch.
+batch_sizes: List[int] = []
+batch_sizes_lock: Lock = Lock()
+def predict_fn(input_ds: ndarray) -> ndarray:
+    with batch_sizes_lock:
+        batch_sizes.append(input_ds.shape[0])
+    return input_ds * 2
+
+
+
+
+
+# Test Class
+class BatchDispatcherTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        batch_sizes.clear()
+
+    # After Tests
+    def tearDown(self):
+        pass
+
+
+
+
+    # Can coalesce concurrent rows and hand each request its own predictions
+    def testCoalesce(self):
+        dispatcher: BatchDispatcher = BatchDispatcher(predict_fn, max_size=8, max_wait=0.05)
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            preds: List[ndarray] = list(executor.map(lambda i: dispatcher.predict(array([[i, i + 0.5]])), range(32)))
+        for i, pred in enumerate(preds):
+            self.assertListEqual(pred.tolist(), [[i * 2, i * 2 + 1]])
+        self.assertEqual(sum(batch_sizes), 32)
+        self.assertLess(len(batch_sizes), 32)
+        self.assertLessEqual(max(batch_sizes), 8)
+        dispatcher.stop()
+
+
+
+    # Predicts inline once stopped
+    def testStop(self):
+        dispatcher: BatchDispatcher = BatchDispatcher(predict_fn, max_size=8, max_wait=0.001)
+        self.assertListEqual(dispatcher.predict(array([[1.0]])).tolist(), [[2.0]])
+        dispatcher.stop()
+        dispatcher.worker.join(timeout=1)
+        self.assertFalse(dispatcher.worker.is_alive())
+        self.assertListEqual(dispatcher.predict(array([[3.0]])).tolist(), [[6.0]])
+
+
+
+    # Raises the error of the batch in every request
+    def testError(self):
+        def failing_fn(input_ds: ndarray) -> ndarray:
+            raise ValueError("Inference failed.")
+        dispatcher: BatchDispatcher = BatchDispatcher(failing_fn, max_size=8, max_wait=0.001)
+        with self.assertRaises(ValueError):
+            dispatcher.predict(array([[1.0]]))
+        dispatcher.stop()
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
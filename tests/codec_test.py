@@ -0,0 +1,94 @@
+from unittest import TestCase, main
+from numpy import array, float32
+from modules.environment.Environment import ENV
+from modules._types import IPrediction
+from modules.codec.Codec import loads_json, dumps_json, decode_close_prices, encode_prediction, decode_prediction
+from modules.guard.Guard import check_request
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+
+
+# Test Class
+class CodecTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        pass
+
+    # After Tests
+    def tearDown(self):
+        pass
+
+
+
+
+    # Can decode binary close prices without copying them
+    def testDecodeClosePrices(self):
+        prices: list = [41250.5, 41260.25, 41255.0]
+        decoded = decode_close_prices(array(prices, dtype="<f8").tobytes(), None)
+        self.assertEqual(decoded.tolist(), prices)
+        self.assertFalse(decoded.flags.owndata)
+        decoded = decode_close_prices(array(prices, dtype=float32).tobytes(), "float32")
+        self.assertEqual(decoded.tolist(), prices)
+
+
+
+    # Cannot decode binary close prices with an invalid dtype or size
+    def testDecodeInvalidClosePrices(self):
+        self.assertIsNone(decode_close_prices(array([1.5, 2.5]).tobytes(), "int64"))
+        self.assertIsNone(decode_close_prices(array([1.5, 2.5]).tobytes()[:-1], "float64"))
+        self.assertIsNone(decode_close_prices(b"", "float64"))
+
+
+
+    # Can encode and decode a prediction
+    def testPredictionRoundTrip(self):
+        pred: IPrediction = { "r": -1, "t": 1665936000000, "f": [0.25, -1.0, 0.5], "s": -0.083333 }
+        self.assertEqual(decode_prediction(encode_prediction(pred)), pred)
+
+
+
+    # Can serialize and parse JSON
+    def testJSON(self):
+        obj: dict = { "epoch_id": "_TEST", "close_prices": [1.5, 2.5], "error": None }
+        self.assertEqual(loads_json(dumps_json(obj)), obj)
+        self.assertRaises(ValueError, loads_json, b"{invalid")
+
+
+
+    # Can reject invalid close prices and windows of the wrong size in the guard
+    def testGuardFastPath(self):
+        self.assertIsNotNone(check_request(ENV["FLASK_SECRET_KEY"], "_TEST", array([1.5, float("nan")]))["error"])
+        self.assertIn("503000", check_request(ENV["FLASK_SECRET_KEY"], "_TEST", [1.5, 2.5], window_size=3)["error"])
+        self.assertIsNone(check_request(ENV["FLASK_SECRET_KEY"], "_TEST", [1.5, 2.5, 3.5], window_size=3)["error"])
+
+
+
+    # Cannot disclose the size of the window to requests with an invalid secret or epoch
+    def testGuardErrorPriority(self):
+        self.assertEqual(
+            check_request(None, "_TEST", [1.5, 2.5], window_size=3)["error"],
+            "The secret provided in the request is invalid."
+        )
+        self.assertEqual(
+            check_request("invalid", "_TEST", [1.5, 2.5], window_size=3)["error"],
+            "The secret provided in the request is invalid."
+        )
+        self.assertEqual(
+            check_request(ENV["FLASK_SECRET_KEY"], "", [1.5, 2.5], window_size=3)["error"],
+            "The provided Epoch ID  is invalid."
+        )
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
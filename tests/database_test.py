@@ -0,0 +1,165 @@
+from typing import List, Any, Tuple, Union
+from unittest import TestCase, main
+from psycopg2 import OperationalError, ProgrammingError, IntegrityError
+import modules.database.Database as Database
+from modules.environment.Environment import ENV
+from modules.database.Database import read_query, write_query
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+class _Cursor:
+    """Executes the queries of the fake connection. The error (if any) is raised
+    when a query is executed.
+    """
+    def __init__(self, conn: "_Connection"):
+        self.conn: _Connection = conn
+
+    def __enter__(self) -> "_Cursor":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def execute(self, text: str, values: Union[Tuple[Any], None] = None) -> None:
+        self.conn.pool.executions += 1
+        if self.conn.pool.error is not None:
+            error: Exception = self.conn.pool.error
+            if isinstance(error, OperationalError):
+                self.conn.closed = 2
+            raise error
+
+    def fetchall(self) -> List[Any]:
+        return [{ "id": 1 }]
+
+
+
+class _Connection:
+    """Fake psycopg2 connection.
+    """
+    def __init__(self, pool: "_Pool"):
+        self.pool: _Pool = pool
+        self.closed: int = 0
+
+    def cursor(self, *args: Any, **kwargs: Any) -> _Cursor:
+        return _Cursor(self)
+
+    def commit(self) -> None:
+        self.pool.commits += 1
+
+    def rollback(self) -> None:
+        pass
+
+
+
+class _Pool:
+    """Fake connection pool that keeps track of the connections that were checked
+    out and the ones that were closed.
+    """
+    def __init__(self, max_size: int):
+        self.max_size: int = max_size
+        self.checked_out: int = 0
+        self.discarded: int = 0
+        self.executions: int = 0
+        self.commits: int = 0
+        self.error: Union[Exception, None] = None
+
+    def getconn(self) -> _Connection:
+        if self.checked_out >= self.max_size:
+            raise RuntimeError("connection pool exhausted")
+        self.checked_out += 1
+        return _Connection(self)
+
+    def putconn(self, conn: _Connection, close: bool = False) -> None:
+        self.checked_out -= 1
+        if close:
+            self.discarded += 1
+
+    def closeall(self) -> None:
+        pass
+
+
+
+
+
+
+# Test Class
+class DatabaseTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        self.pool_backup: Any = Database.POOL
+        self.pool: _Pool = _Pool(ENV["POSTGRES_POOL_MAX_SIZE"])
+        Database.POOL = self.pool
+
+    # After Tests
+    def tearDown(self):
+        Database.POOL = self.pool_backup
+
+
+
+
+
+    # The connections are returned to the pool when the query raises any kind of error
+    def testConnectionReturnedOnError(self):
+        for error in [ProgrammingError("syntax error"), IntegrityError("duplicate key"), ValueError("NUL byte")]:
+            self.pool.error = error
+            for _ in range(self.pool.max_size * 2):
+                with self.assertRaises(type(error)):
+                    write_query("INSERT INTO test VALUES (%s)", ("value",))
+            self.assertEqual(self.pool.checked_out, 0)
+            self.assertEqual(self.pool.discarded, 0)
+
+        # The pool is still usable
+        self.pool.error = None
+        self.assertListEqual(read_query("SELECT 1"), [{ "id": 1 }])
+        self.assertEqual(self.pool.checked_out, 0)
+
+
+
+    # Broken connections are closed and only the reads are retried
+    def testBrokenConnection(self):
+        self.pool.error = OperationalError("server closed the connection unexpectedly")
+
+        # The read is retried with a new connection
+        with self.assertRaises(OperationalError):
+            read_query("SELECT 1")
+        self.assertEqual(self.pool.executions, 2)
+        self.assertEqual(self.pool.discarded, 2)
+
+        # The writes are not retried
+        with self.assertRaises(OperationalError):
+            write_query("INSERT INTO test VALUES (%s)", ("value",))
+        self.assertEqual(self.pool.executions, 3)
+        self.assertEqual(self.pool.discarded, 3)
+        self.assertEqual(self.pool.checked_out, 0)
+
+
+
+    # Successful queries return the connection to the pool
+    def testSuccessfulQueries(self):
+        write_query("INSERT INTO test VALUES (%s)", ("value",))
+        self.assertListEqual(read_query("SELECT 1"), [{ "id": 1 }])
+        self.assertEqual(self.pool.commits, 1)
+        self.assertEqual(self.pool.checked_out, 0)
+        self.assertEqual(self.pool.discarded, 0)
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
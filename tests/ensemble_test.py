@@ -0,0 +1,140 @@
+from typing import List, Any
+from unittest import TestCase, main
+from numpy import ndarray, float32, array
+from numpy.random import default_rng
+from keras import Sequential
+from keras.layers import InputLayer, Dense, Reshape, Conv1D, Flatten, LSTM
+from modules.environment.Environment import ENV
+from modules.regression.Regression import Regression
+from modules.ensemble.Ensemble import Ensemble
+from fixtures import ScaledModel, predict_baseline_feature
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+# Test Data
+lookback: int = 16
+predictions: int = 5
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+def _build_regression(id: str, model: Any) -> Regression:
+    """Builds a Regression around a model without reading it from a file.
+
+    Args:
+        id: str
+            The ID of the regression.
+        model: Any
+            The model that will generate the predictions.
+
+    Returns:
+        Regression
+    """
+    reg: Regression = Regression.__new__(Regression)
+    reg.id = id
+    reg.description = "Ensemble Parity Test"
+    reg.lookback = lookback
+    reg.predictions = predictions
+    reg.model = model
+    return reg
+
+
+
+
+
+
+# Test Class
+class EnsembleTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        self.backend: str = ENV["INFERENCE_BACKEND"]
+
+    # After Tests
+    def tearDown(self):
+        ENV["INFERENCE_BACKEND"] = self.backend
+
+
+
+
+
+    # The features of the ensemble match the baseline calculation, one regression at a time
+    def testFeaturesMatchRegressions(self):
+        # Init the input rows. The first price of some rows is set to 0.5 so their
+        # predicted change is 0 and the last price of others is set to 0
+        rows: int = 20000
+        input_ds: ndarray = default_rng(0).uniform(0.05, 0.95, (rows, lookback))
+        input_ds[:10, 0] = 0.5
+        input_ds[10:20, -1] = 0
+
+        # Build the ensemble with the NumPy backend
+        ENV["INFERENCE_BACKEND"] = "numpy"
+        regs: List[Regression] = [
+            _build_regression(f"R_{i}", ScaledModel(scale)) for i, scale in enumerate([0.002, 0.02, 0.1, 1])
+        ]
+        ensemble: Ensemble = Ensemble(regs)
+
+        # Compare the features
+        features: List[List[float]] = ensemble.predict_features(input_ds).tolist()
+        for i in range(rows):
+            for j, reg in enumerate(regs):
+                self.assertEqual(
+                    features[i][j],
+                    predict_baseline_feature(reg, input_ds[i:i + 1]),
+                    msg=f"Row {i} of {reg.id} does not match."
+                )
+
+
+
+    # The values are rounded the way Python's round does, including the ones next to a tie
+    def testRoundMatchesPython(self):
+        for decimals, values in [
+            (2, array([0.285, 1.005, 2.675, -2.675, 0.125, -0.125, 0.005, 99.995])),
+            (2, default_rng(2).integers(-100000, 100000, 10000) / 1000),
+            (6, default_rng(3).integers(-10**8, 10**8, 10000) / 10**7)
+        ]:
+            rounded: List[float] = Ensemble._round(values.reshape(-1, 2), decimals).ravel().tolist()
+            self.assertListEqual(rounded, [round(value, decimals) for value in values.tolist()])
+
+
+
+    # The fused function generates the same predictions as each Keras Model
+    def testFusedInference(self):
+        # Build the models
+        ENV["INFERENCE_BACKEND"] = "tensorflow"
+        models: List[Any] = [
+            Sequential([InputLayer(input_shape=(lookback,)), Dense(16, activation="relu"), Dense(predictions)]),
+            Sequential([
+                InputLayer(input_shape=(lookback,)), Reshape((lookback, 1)),
+                Conv1D(4, 3, activation="relu"), Flatten(), Dense(predictions)
+            ]),
+            Sequential([InputLayer(input_shape=(lookback,)), Reshape((lookback, 1)), LSTM(8), Dense(predictions)])
+        ]
+        ensemble: Ensemble = Ensemble([_build_regression(f"R_{i}", m) for i, m in enumerate(models)])
+
+        # Compare the predictions
+        input_ds: ndarray = default_rng(1).uniform(0.05, 0.95, (64, lookback)).astype(float32)
+        preds: ndarray = ensemble.predict(input_ds)
+        self.assertEqual(preds.shape, (64, len(models)))
+        for j, model in enumerate(models):
+            self.assertTrue(abs(preds[:, j] - model.predict_on_batch(input_ds)[:, -1]).max() < 1e-5)
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
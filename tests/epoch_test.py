@@ -0,0 +1,250 @@
+from typing import List, Any, Union
+from unittest import TestCase, main
+from time import sleep, monotonic
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from modules._types import IEpochRecord
+from modules.environment.Environment import ENV
+from modules.prediction_model.PredictionModel import PredictionModel
+from modules.epoch.Epoch import Epoch
+from modules.metrics.Metrics import Metrics
+from modules.prediction_cache.PredictionCache import PredictionCache
+from fixtures import WINDOW_SIZE, RegressionsFixture, build_epoch_record, build_series
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+# Test Data
+epoch_record: IEpochRecord = build_epoch_record("_TEST_EPOCH_1", ["R_0"])
+next_epoch_record: IEpochRecord = build_epoch_record("_TEST_EPOCH_2", ["R_0"])
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+def _get_counter(name: str) -> float:
+    """Retrieves the value of a counter without labels.
+
+    Args:
+        name: str
+            The name of the counter.
+
+    Returns:
+        float
+    """
+    return Metrics.COUNTERS.get(name, {}).get((), 0)
+
+
+
+
+
+def _get_stage_count(route: str, stage: str) -> int:
+    """Retrieves the number of observations of a stage.
+
+    Args:
+        route: str
+        stage: str
+            The labels of the stage.
+
+    Returns:
+        int
+    """
+    histogram: Any = Metrics.HISTOGRAMS.get("prediction_api_stage_duration_seconds", {}).get(
+        (("route", route), ("stage", stage))
+    )
+    return 0 if histogram is None else histogram.count
+
+
+
+
+
+
+# Test Class
+class EpochTestCase(TestCase):
+    # Before All Tests
+    @classmethod
+    def setUpClass(cls):
+        cls.regressions: RegressionsFixture = RegressionsFixture(epoch_record)
+
+    # After All Tests
+    @classmethod
+    def tearDownClass(cls):
+        cls.regressions.cleanup()
+
+    # Before Tests
+    def setUp(self):
+        self.get_active_epoch: Any = Epoch.get_active_epoch
+        self.poll_interval: Union[int, float] = ENV["EPOCH_POLL_INTERVAL"]
+        Epoch.MODEL = None
+        Epoch.SYNC_REQUESTER = None
+
+    # After Tests
+    def tearDown(self):
+        Epoch.stop_watcher()
+        Epoch.get_active_epoch = self.get_active_epoch
+        ENV["EPOCH_POLL_INTERVAL"] = self.poll_interval
+        Epoch.MODEL = None
+        Epoch.SYNC_REQUESTER = None
+
+
+
+
+
+    # Loading a new epoch swaps the model and stops the previous one
+    def testSwapModel(self):
+        # Load the first model
+        model: PredictionModel = Epoch._load_model(epoch_record)
+        self.assertIs(Epoch.MODEL, model)
+        stopped: Event = Event()
+        model.stop = stopped.set
+
+        # Loading the same epoch reuses the model
+        self.assertIs(Epoch._load_model(epoch_record), model)
+        self.assertFalse(stopped.is_set())
+
+        # Load the next one
+        swaps: float = _get_counter("prediction_api_epoch_swaps_total")
+        next_model: PredictionModel = Epoch._load_model(next_epoch_record)
+        self.assertIs(Epoch.MODEL, next_model)
+        self.assertIsNot(next_model, model)
+        self.assertTrue(stopped.is_set())
+        self.assertEqual(_get_counter("prediction_api_epoch_swaps_total"), swaps + 1)
+
+
+
+    # Concurrent loads of the same epoch initialize the model once
+    def testConcurrentLoads(self):
+        loads: float = _get_counter("prediction_api_model_loads_total")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            models: List[PredictionModel] = list(executor.map(lambda _: Epoch._load_model(epoch_record), range(8)))
+        self.assertEqual(_get_counter("prediction_api_model_loads_total"), loads + 1)
+        for model in models:
+            self.assertIs(model, Epoch.MODEL)
+
+
+
+    # The warm up is not recorded in the latency of the predictions
+    def testWarmUpNotRecorded(self):
+        input_count: int = _get_stage_count("predict", "input")
+        inference_count: int = _get_stage_count("predict", "inference")
+        Epoch._load_model(epoch_record)
+        self.assertEqual(_get_stage_count("predict", "input"), input_count)
+        self.assertEqual(_get_stage_count("predict", "inference"), inference_count)
+
+
+
+    # The watcher loads the active epoch in the background and survives errors
+    def testWatcher(self):
+        # The first poll fails, the following ones retrieve the next epoch
+        calls: List[int] = []
+        def get_active_epoch() -> IEpochRecord:
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("The active epoch could not be retrieved.")
+            return next_epoch_record
+        Epoch.get_active_epoch = staticmethod(get_active_epoch)
+
+        # Start the watcher with the first epoch loaded
+        Epoch._load_model(epoch_record)
+        ENV["EPOCH_POLL_INTERVAL"] = 0.05
+        Epoch.start_watcher()
+        self.assertIsNotNone(Epoch.WATCHER)
+
+        # Wait for the swap
+        deadline: float = monotonic() + 10
+        while Epoch.MODEL.epoch_id != next_epoch_record["id"] and monotonic() < deadline:
+            sleep(0.05)
+        self.assertEqual(Epoch.MODEL.epoch_id, next_epoch_record["id"])
+        self.assertGreater(len(calls), 1)
+
+        # Stop it
+        Epoch.stop_watcher()
+        self.assertIsNone(Epoch.WATCHER)
+
+
+
+    # A request for a new epoch wakes the watcher up rather than loading the model inline
+    def testRequestedSync(self):
+        Epoch._load_model(epoch_record)
+        Epoch.get_active_epoch = staticmethod(lambda: next_epoch_record)
+        ENV["EPOCH_POLL_INTERVAL"] = 60
+        Epoch.start_watcher()
+
+        # The request is rejected right away
+        with self.assertRaisesRegex(RuntimeError, "502001"):
+            Epoch._get_model(next_epoch_record["id"])
+
+        # The watcher loads the new epoch without waiting for the next poll
+        deadline: float = monotonic() + 10
+        while Epoch.MODEL.epoch_id != next_epoch_record["id"] and monotonic() < deadline:
+            sleep(0.05)
+        self.assertIs(Epoch._get_model(next_epoch_record["id"]), Epoch.MODEL)
+
+
+
+    # The sync is requested from the process that watches the active epoch
+    def testSyncRequester(self):
+        Epoch._load_model(epoch_record)
+        requests: List[int] = []
+        Epoch.SYNC_REQUESTER = lambda: requests.append(1)
+        with self.assertRaisesRegex(RuntimeError, "502001"):
+            Epoch._get_model(next_epoch_record["id"])
+        self.assertListEqual(requests, [1])
+        self.assertEqual(Epoch.MODEL.epoch_id, epoch_record["id"])
+
+        # Without a model, there isn't an active epoch yet
+        Epoch.MODEL = None
+        with self.assertRaisesRegex(RuntimeError, "502000"):
+            Epoch._get_model(epoch_record["id"])
+        self.assertListEqual(requests, [1, 1])
+
+
+
+    # The model is loaded inline if nothing watches the active epoch
+    def testInlineLoad(self):
+        Epoch.get_active_epoch = staticmethod(lambda: epoch_record)
+        model: PredictionModel = Epoch._get_model(epoch_record["id"])
+        self.assertIs(model, Epoch.MODEL)
+        self.assertEqual(model.epoch_id, epoch_record["id"])
+        with self.assertRaisesRegex(RuntimeError, "502001"):
+            Epoch._get_model(next_epoch_record["id"])
+
+
+
+    # The cache key is not built when the cache is disabled
+    def testDisabledCache(self):
+        cache: PredictionCache = Epoch.CACHE
+        build_key: Any = PredictionCache.build_key
+        try:
+            Epoch.CACHE = PredictionCache(0, 60)
+            PredictionCache.build_key = staticmethod(lambda *args: self.fail("The cache key was built."))
+            Epoch._load_model(epoch_record)
+            cache_count: int = _get_stage_count("predict", "cache")
+            close_prices: List[float] = build_series(WINDOW_SIZE).tolist()
+            self.assertListEqual(
+                Epoch.generate_prediction(epoch_record["id"], close_prices)["f"],
+                Epoch.MODEL.predict(close_prices)["f"]
+            )
+            self.assertEqual(_get_stage_count("predict", "cache"), cache_count)
+        finally:
+            Epoch.CACHE = cache
+            PredictionCache.build_key = build_key
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,244 @@
+from typing import List, Any
+from tempfile import TemporaryDirectory
+from numpy import ndarray, cumsum, float32, repeat
+from numpy.random import default_rng
+from modules._types import IEpochRecord
+from modules.environment.Environment import ENV
+from modules.utils.Utils import Utils
+from modules.regression.Regression import Regression
+
+
+
+
+# Fixtures
+# The epochs, regressions, close prices and baseline calculations shared by the 
+# unit tests and the benchmark. Keras is only imported when a regression is saved,
+# so the benchmark can build the epochs without loading TensorFlow.
+SMA_WINDOW_SIZE: int = 20
+LOOKBACK: int = 16
+PREDICTIONS: int = 5
+WINDOW_SIZE: int = LOOKBACK + SMA_WINDOW_SIZE - 1
+HIGHEST_PRICE_SMA: float = 90000.0
+LOWEST_PRICE_SMA: float = 15000.0
+
+
+
+
+
+
+
+## Epochs ##
+
+
+
+def build_epoch_record(
+    epoch_id: str,
+    regression_ids: List[str],
+    model_id: str = "TEST_MODEL",
+    sma_window_size: int = SMA_WINDOW_SIZE,
+    lookback: int = LOOKBACK,
+    predictions: int = PREDICTIONS
+) -> IEpochRecord:
+    """Builds the record of an epoch that contains the provided regressions.
+
+    Args:
+        epoch_id: str
+            The ID of the epoch.
+        regression_ids: List[str]
+            The IDs of the regressions.
+        model_id: str
+            The ID of the model.
+        sma_window_size: int
+        lookback: int
+        predictions: int
+            The configuration of the epoch.
+
+    Returns:
+        IEpochRecord
+    """
+    return {
+        "id": epoch_id,
+        "installed": 1647469003036,
+        "uninstalled": None,
+        "config": {
+            "id": epoch_id,
+            "seed": 60184,
+            "sma_window_size": sma_window_size,
+            "highest_price_sma": HIGHEST_PRICE_SMA,
+            "lowest_price_sma": LOWEST_PRICE_SMA,
+            "regression_lookback": lookback,
+            "regression_predictions": predictions
+        },
+        "model": {
+            "id": model_id,
+            "price_change_requirement": 3,
+            "min_sum_function": "mean",
+            "min_sum_adjustment_factor": 1.5,
+            "min_increase_sum": 1,
+            "min_decrease_sum": -1,
+            "regressions": [{ "id": id } for id in regression_ids]
+        }
+    }
+
+
+
+
+
+
+## Regressions ##
+
+
+
+def save_regression(dir: str, id: str, lookback: int = LOOKBACK, predictions: int = PREDICTIONS) -> None:
+    """Saves a small Keras Model with the metadata expected by the Regression.
+
+    Args:
+        dir: str
+            The directory in which the model will be saved.
+        id: str
+            The ID of the regression.
+        lookback: int
+        predictions: int
+            The shape of the regression.
+    """
+    from h5py import File as h5pyFile
+    from keras import Sequential
+    from keras.layers import InputLayer, Dense
+    model: Any = Sequential([InputLayer(input_shape=(lookback,)), Dense(8, activation="relu"), Dense(predictions)])
+    model.save(f"{dir}/{id}.h5", save_format="h5")
+    with h5pyFile(f"{dir}/{id}.h5", mode="a") as model_file:
+        model_file.attrs["id"] = id
+        model_file.attrs["description"] = "Test Regression"
+        model_file.attrs["lookback"] = lookback
+        model_file.attrs["predictions"] = predictions
+
+
+
+
+
+
+class RegressionsFixture:
+    """RegressionsFixture Class
+
+    Saves the regressions of an epoch in a temporary model path and loads them
+    with the NumPy backend. The previous model path and backend are restored on cleanup.
+
+    Instance Properties:
+        dir: TemporaryDirectory
+            The model path.
+        model_path: str
+        backend: str
+            The values that are restored on cleanup.
+    """
+    def __init__(self, epoch_record: IEpochRecord):
+        """Saves the regressions and points the Regression Class to them.
+
+        Args:
+            epoch_record: IEpochRecord
+                The record of the epoch the regressions belong to.
+        """
+        self.dir: TemporaryDirectory = TemporaryDirectory()
+        self.model_path: str = Regression.MODEL_PATH
+        self.backend: str = ENV["INFERENCE_BACKEND"]
+        for reg in epoch_record["model"]["regressions"]:
+            save_regression(
+                self.dir.name, 
+                reg["id"], 
+                epoch_record["config"]["regression_lookback"], 
+                epoch_record["config"]["regression_predictions"]
+            )
+        Regression.MODEL_PATH = self.dir.name
+        ENV["INFERENCE_BACKEND"] = "numpy"
+
+
+
+    def cleanup(self) -> None:
+        """Restores the model path and the backend and deletes the regressions.
+        """
+        Regression.MODEL_PATH = self.model_path
+        ENV["INFERENCE_BACKEND"] = self.backend
+        self.dir.cleanup()
+
+
+
+
+
+
+## Close Prices ##
+
+
+
+def build_series(length: int, seed: int = 0) -> ndarray:
+    """Generates a random walk of close prices within the Epoch's boundaries.
+
+    Args:
+        length: int
+            The number of close prices.
+        seed: int
+            The seed of the random walk.
+
+    Returns:
+        ndarray
+    """
+    return 40000 + cumsum(default_rng(seed).normal(0, 50, length))
+
+
+
+
+
+
+## Baseline ##
+
+
+
+class ScaledModel:
+    """Predicts the last price of each row scaled by a factor derived from its first
+    price, so the predicted changes cover the neutral, scaled and clipped ranges of
+    the features.
+    """
+    def __init__(self, scale: float, predictions: int = PREDICTIONS):
+        self.scale: float = scale
+        self.predictions: int = predictions
+
+    def predict_on_batch(self, input_ds: ndarray) -> ndarray:
+        input_ds = input_ds.astype(float32)
+        last: ndarray = input_ds[:, -1:] * (1 + (input_ds[:, :1] - 0.5) * float32(self.scale))
+        return repeat(last, self.predictions, axis=1)
+
+
+
+
+
+def predict_baseline_feature(reg: Regression, input_ds: ndarray) -> float:
+    """Generates the feature of a single row the way the regressions did before they
+    were fused into the ensemble: the model receives the row in float32 while the 
+    change is calculated from the current price in its original precision and 
+    rounded with Python's round.
+
+    Args:
+        reg: Regression
+            The regression that will generate the prediction.
+        input_ds: ndarray
+            The input dataset of a single row (1, lookback).
+
+    Returns:
+        float
+    """
+    # Predict the next trend
+    preds: List[float] = reg.model.predict_on_batch(input_ds.astype(float32)).tolist()[0]
+
+    # Calculate the predicted change
+    change: float = Utils.get_percentage_change(float(input_ds[0, -1]), preds[-1])
+
+    # Adjust the change to the min and max values
+    abs_change: float = abs(change)
+    if abs_change < Regression.MIN_FEATURE_VALUE:
+        return 0
+    adjusted: float = min(abs_change, Regression.MAX_FEATURE_VALUE)
+
+    # Scale it and restore its direction
+    scaled: float = round(
+        (adjusted - Regression.MIN_FEATURE_VALUE) / (Regression.MAX_FEATURE_VALUE - Regression.MIN_FEATURE_VALUE),
+        6
+    )
+    return scaled if change > 0 else -scaled
\ No newline at end of file
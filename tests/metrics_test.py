@@ -0,0 +1,94 @@
+from unittest import TestCase, main
+from os import fork, pipe, read, write, close, waitpid, getpid, _exit
+from modules.environment.Environment import ENV
+from modules.metrics.Metrics import Metrics
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+
+
+# Test Class
+class MetricsTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        Metrics.HISTOGRAMS.pop("prediction_api_stage_duration_seconds", None)
+        Metrics.COUNTERS.pop("prediction_api_errors_total", None)
+
+    # After Tests
+    def tearDown(self):
+        pass
+
+
+
+
+    # Can record observations in cumulative buckets
+    def testHistogram(self):
+        Metrics.observe("prediction_api_stage_duration_seconds", 0.0003, { "route": "predict", "stage": "total" })
+        Metrics.observe("prediction_api_stage_duration_seconds", 0.02, { "route": "predict", "stage": "total" })
+        with Metrics.timer("prediction_api_stage_duration_seconds", { "route": "predict", "stage": "guard" }):
+            pass
+        text: str = Metrics.export()
+        self.assertIn("# TYPE prediction_api_stage_duration_seconds histogram", text)
+        self.assertIn('prediction_api_stage_duration_seconds_bucket{route="predict",stage="total",le="0.0001"} 0', text)
+        self.assertIn('prediction_api_stage_duration_seconds_bucket{route="predict",stage="total",le="0.0005"} 1', text)
+        self.assertIn('prediction_api_stage_duration_seconds_bucket{route="predict",stage="total",le="+Inf"} 2', text)
+        self.assertIn('prediction_api_stage_duration_seconds_count{route="predict",stage="total"} 2', text)
+        self.assertIn('prediction_api_stage_duration_seconds_count{route="predict",stage="guard"} 1', text)
+
+
+
+    # Can count the errors by api error code
+    def testErrors(self):
+        Metrics.increment_error("The provided epoch id is invalid. {(502001)}")
+        Metrics.increment_error("The provided epoch id is invalid. {(502001)}")
+        Metrics.increment_error(Exception("Unknown error."))
+        text: str = Metrics.export()
+        self.assertIn('prediction_api_errors_total{code="502001"} 2', text)
+        self.assertIn('prediction_api_errors_total{code="none"} 1', text)
+
+
+
+    # Can label the metrics of a forked worker with its pid
+    def testWorkerLabel(self):
+        Metrics.increment_error("The provided epoch id is invalid. {(502001)}")
+        self.assertNotIn("worker=", Metrics.export())
+
+        # Export the metrics of a forked worker
+        read_fd, write_fd = pipe()
+        pid: int = fork()
+        if pid == 0:
+            close(read_fd)
+            Metrics.increment_error("The provided epoch id is invalid. {(502001)}")
+            Metrics.observe("prediction_api_stage_duration_seconds", 0.02, { "route": "predict", "stage": "total" })
+            write(write_fd, f"{getpid()}\n{Metrics.export()}".encode())
+            _exit(0)
+        close(write_fd)
+        chunks: list = []
+        while True:
+            chunk: bytes = read(read_fd, 65536)
+            if len(chunk) == 0:
+                break
+            chunks.append(chunk)
+        close(read_fd)
+        waitpid(pid, 0)
+        worker, text = b"".join(chunks).decode().split("\n", 1)
+
+        # The worker only reports its own metrics
+        self.assertEqual(worker, str(pid))
+        self.assertIn(f'prediction_api_errors_total{{code="502001",worker="{pid}"}} 1', text)
+        self.assertIn(f'prediction_api_stage_duration_seconds_bucket{{route="predict",stage="total",worker="{pid}",le="+Inf"}} 1', text)
+        self.assertIn(f'prediction_api_stage_duration_seconds_count{{route="predict",stage="total",worker="{pid}"}} 1', text)
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
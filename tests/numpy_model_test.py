@@ -0,0 +1,188 @@
+from typing import List, Any
+from unittest import TestCase, main
+from tempfile import TemporaryDirectory
+from numpy import ndarray, float32
+from numpy.random import default_rng
+from h5py import File as h5pyFile
+from keras import Sequential
+from keras.layers import InputLayer, Dense, Dropout, Reshape, Flatten, Conv1D, MaxPooling1D, LSTM, GRU, \
+    BatchNormalization
+from modules.environment.Environment import ENV
+from modules.numpy_model.NumpyModel import NumpyModel
+from modules.regression.Regression import Regression
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+# Test Data
+lookback: int = 16
+predictions: int = 5
+input_ds: ndarray = default_rng(0).uniform(0.05, 0.95, (8, lookback)).astype(float32)
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+def _build_models() -> List[Any]:
+    """Builds a Keras Model for each supported architecture.
+
+    Returns:
+        List[Sequential]
+    """
+    return [
+        # DNN
+        Sequential([
+            InputLayer(input_shape=(lookback,)),
+            Dense(32, activation="relu"), Dropout(0.2),
+            Dense(16, activation="tanh"),
+            Dense(predictions)
+        ]),
+
+        # CDNN
+        Sequential([
+            InputLayer(input_shape=(lookback,)), Reshape((lookback, 1)),
+            Conv1D(8, 3, activation="relu"), Conv1D(4, 5, padding="same", activation="tanh"),
+            Flatten(), Dense(16, activation="relu"), Dense(predictions)
+        ]),
+
+        # CDNN_MP
+        Sequential([
+            InputLayer(input_shape=(lookback,)), Reshape((lookback, 1)),
+            Conv1D(8, 5, activation="relu"), MaxPooling1D(2),
+            Flatten(), Dense(predictions)
+        ]),
+
+        # LSTM
+        Sequential([
+            InputLayer(input_shape=(lookback,)), Reshape((lookback, 1)),
+            LSTM(16, return_sequences=True), LSTM(8),
+            Dense(predictions)
+        ]),
+
+        # GRU
+        Sequential([
+            InputLayer(input_shape=(lookback,)), Reshape((lookback, 1)),
+            GRU(16, return_sequences=True), GRU(8, reset_after=False),
+            Dense(predictions)
+        ]),
+
+        # CLSTM_MP
+        Sequential([
+            InputLayer(input_shape=(lookback,)), Reshape((lookback, 1)),
+            Conv1D(8, 3, activation="relu"), MaxPooling1D(2, padding="same"),
+            LSTM(8), Dense(predictions)
+        ])
+    ]
+
+
+
+
+
+def _save_model(model: Any, dir: str, id: str) -> None:
+    """Saves a Keras Model with the metadata expected by the Regression.
+
+    Args:
+        model: Sequential
+            The model to be saved.
+        dir: str
+            The directory in which the model will be saved.
+        id: str
+            The ID of the regression.
+    """
+    model.save(f"{dir}/{id}.h5", save_format="h5")
+    with h5pyFile(f"{dir}/{id}.h5", mode="a") as model_file:
+        model_file.attrs["id"] = id
+        model_file.attrs["description"] = "NumPy Model Parity Test"
+        model_file.attrs["lookback"] = lookback
+        model_file.attrs["predictions"] = predictions
+
+
+
+
+
+
+# Test Class
+class NumpyModelTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        self.backend: str = ENV["INFERENCE_BACKEND"]
+        self.model_path: str = Regression.MODEL_PATH
+        self.dir: TemporaryDirectory = TemporaryDirectory()
+
+    # After Tests
+    def tearDown(self):
+        ENV["INFERENCE_BACKEND"] = self.backend
+        Regression.MODEL_PATH = self.model_path
+        self.dir.cleanup()
+
+
+
+
+
+    # The NumPy Model generates the same predictions as the Keras Model
+    def testParityWithKeras(self):
+        for i, model in enumerate(_build_models()):
+            # Save the model and load it with NumPy
+            _save_model(model, self.dir.name, f"R_{i}")
+            with h5pyFile(f"{self.dir.name}/R_{i}.h5", mode="r") as model_file:
+                numpy_model: NumpyModel = NumpyModel(model_file)
+
+            # Compare the predictions
+            expected: ndarray = model.predict_on_batch(input_ds)
+            actual: ndarray = numpy_model.predict_on_batch(input_ds)
+            self.assertEqual(actual.shape, expected.shape)
+            self.assertTrue(abs(actual - expected).max() < 1e-5, f"R_{i} does not match the Keras Model.")
+
+
+
+    # The Regression loads the NumPy Model when the backend is numpy
+    def testRegressionWithNumpyBackend(self):
+        # Save the model
+        model: Any = _build_models()[0]
+        _save_model(model, self.dir.name, "R_NUMPY")
+
+        # Initialize the regression with the NumPy backend
+        ENV["INFERENCE_BACKEND"] = "numpy"
+        Regression.MODEL_PATH = self.dir.name
+        reg: Regression = Regression("R_NUMPY", 0)
+        self.assertIsInstance(reg.model, NumpyModel)
+        self.assertEqual(reg.lookback, lookback)
+        self.assertEqual(reg.predictions, predictions)
+
+        # Compare the predictions
+        self.assertTrue(abs(reg.model.predict_on_batch(input_ds) - model.predict_on_batch(input_ds)).max() < 1e-5)
+
+
+
+
+
+    # Unsupported layers are rejected
+    def testUnsupportedLayer(self):
+        model: Any = Sequential([
+            InputLayer(input_shape=(lookback,)),
+            Dense(16, activation="relu"), BatchNormalization(),
+            Dense(predictions)
+        ])
+        _save_model(model, self.dir.name, "R_UNSUPPORTED")
+        with h5pyFile(f"{self.dir.name}/R_UNSUPPORTED.h5", mode="r") as model_file:
+            with self.assertRaises(ValueError):
+                NumpyModel(model_file)
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,203 @@
+from typing import List, Any
+from unittest import TestCase, main
+from numpy import ndarray, array, nan
+from modules._types import IEpochRecord, IPrediction, IBatchPrediction, IBatchRequestGuardResult
+from modules.environment.Environment import ENV
+from modules.prediction_model.PredictionModel import PredictionModel
+from modules.epoch.Epoch import Epoch
+from modules.guard.Guard import check_batch_request, MAX_BATCH_WINDOWS, MAX_SERIES_LENGTH
+from index import app
+from fixtures import WINDOW_SIZE, RegressionsFixture, build_epoch_record, build_series
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+# Test Data
+epoch_record: IEpochRecord = build_epoch_record("_TEST_PREDICT_BATCH", ["R_0", "R_1"])
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+def _assert_same_features(test: TestCase, pred: IPrediction, expected: IPrediction) -> None:
+    """Asserts that two predictions contain the same features.
+
+    Args:
+        test: TestCase
+            The test case.
+        pred: IPrediction
+        expected: IPrediction
+            The predictions to compare.
+    """
+    test.assertListEqual(sorted(pred.keys()), ["f", "r", "s", "t"])
+    test.assertEqual(pred["r"], 0)
+    test.assertEqual(len(pred["f"]), len(expected["f"]))
+    for feature, expected_feature in zip(pred["f"], expected["f"]):
+        test.assertAlmostEqual(feature, expected_feature, places=5)
+    test.assertAlmostEqual(pred["s"], expected["s"], places=5)
+
+
+
+
+
+
+# Test Class
+class PredictBatchTestCase(TestCase):
+    # Before All Tests
+    @classmethod
+    def setUpClass(cls):
+        cls.regressions: RegressionsFixture = RegressionsFixture(epoch_record)
+        cls.model: PredictionModel = PredictionModel(epoch_record)
+        Epoch.MODEL = cls.model
+
+    # After All Tests
+    @classmethod
+    def tearDownClass(cls):
+        Epoch.MODEL = None
+        cls.regressions.cleanup()
+
+    # Before Tests
+    def setUp(self):
+        self.client: Any = app.test_client()
+
+    # After Tests
+    def tearDown(self):
+        pass
+
+
+
+
+
+    # The predictions of every route share the same shape and features
+    def testPredictionShapes(self):
+        window: ndarray = build_series(WINDOW_SIZE)
+        pred: IPrediction = self.model.predict(window)
+        _assert_same_features(self, self.model.predict_stream("SHAPES", WINDOW_SIZE - 1, window), pred)
+        batch_pred: IBatchPrediction = self.model.predict_batch([window])[0]
+        self.assertIsNone(batch_pred["e"])
+        _assert_same_features(self, batch_pred["p"], pred)
+        self.assertEqual(pred["s"], round(sum(pred["f"]), 6))
+
+
+
+    # The windows that cannot be predicted are reported individually
+    def testWindowErrors(self):
+        missing: ndarray = build_series(WINDOW_SIZE, 2)
+        missing[-1] = nan
+        preds: List[IBatchPrediction] = self.model.predict_batch([
+            build_series(WINDOW_SIZE, 1),
+            build_series(WINDOW_SIZE - 1, 1),
+            missing,
+            build_series(WINDOW_SIZE, 3) + 60000,
+            build_series(WINDOW_SIZE, 4) - 30000,
+            build_series(WINDOW_SIZE, 5)
+        ])
+        self.assertEqual(len(preds), 6)
+        for i, code in [(1, "503000"), (2, "503000"), (3, "503001"), (4, "503002")]:
+            self.assertIsNone(preds[i]["p"])
+            self.assertIn(code, preds[i]["e"])
+        for i, seed in [(0, 1), (5, 5)]:
+            self.assertIsNone(preds[i]["e"])
+            _assert_same_features(self, preds[i]["p"], self.model.predict(build_series(WINDOW_SIZE, seed)))
+
+
+
+    # A series is split into windows with the stride
+    def testSeries(self):
+        series: ndarray = build_series(WINDOW_SIZE + 20, 6)
+        preds: List[IBatchPrediction] = self.model.predict_series(series, 7)
+        self.assertEqual(len(preds), 3)
+        for i, pred in enumerate(preds):
+            self.assertIsNone(pred["e"])
+            _assert_same_features(self, pred["p"], self.model.predict(series[i * 7:i * 7 + WINDOW_SIZE]))
+
+        # The series must contain at least one window
+        with self.assertRaisesRegex(RuntimeError, "503000"):
+            self.model.predict_series(series[:WINDOW_SIZE - 1], 1)
+
+
+
+    # The guard enforces the limits of the batch and the series
+    def testGuardLimits(self):
+        secret: str = ENV["FLASK_SECRET_KEY"]
+        epoch_id: str = epoch_record["id"]
+
+        # Windows
+        self.assertIsNotNone(check_batch_request(secret, epoch_id, [], None, None)["error"])
+        self.assertIsNotNone(check_batch_request(secret, epoch_id, [[1.5]] * (MAX_BATCH_WINDOWS + 1), None, None)["error"])
+        res: IBatchRequestGuardResult = check_batch_request(secret, epoch_id, [[1.5, 2.5], "invalid", []], None, None)
+        self.assertIsNone(res["error"])
+        self.assertIsNone(res["window_errors"][0])
+        self.assertIsNotNone(res["window_errors"][1])
+        self.assertIsNotNone(res["window_errors"][2])
+
+        # Series
+        self.assertIsNotNone(check_batch_request(secret, epoch_id, None, [1.5] * 10, None)["error"])
+        self.assertIsNotNone(check_batch_request(secret, epoch_id, None, [1.5] * 10, 0)["error"])
+        self.assertIsNotNone(check_batch_request(secret, epoch_id, None, [1.5] * 10, True)["error"])
+        self.assertIsNotNone(check_batch_request(secret, epoch_id, None, [1.5] * (MAX_SERIES_LENGTH + 1), 1)["error"])
+        self.assertIsNotNone(check_batch_request(secret, epoch_id, None, ["invalid"], 1)["error"])
+        self.assertIsNone(check_batch_request(secret, epoch_id, None, [1.5] * 10, 1)["error"])
+
+        # Credentials
+        self.assertIsNotNone(check_batch_request("invalid", epoch_id, [[1.5]], None, None)["error"])
+        self.assertIsNotNone(check_batch_request(secret, "invalid", [[1.5]], None, None)["error"])
+
+
+
+    # The route merges the windows that failed the guard with the predictions
+    def testRoute(self):
+        headers: dict = { "secret-key": ENV["FLASK_SECRET_KEY"] }
+        window: List[float] = build_series(WINDOW_SIZE, 7).tolist()
+
+        # Windows
+        res: dict = self.client.post("/predict/batch", headers=headers, json={
+            "epoch_id": epoch_record["id"],
+            "close_prices_batch": [window, "invalid", window[1:]]
+        }).get_json()
+        self.assertTrue(res["success"])
+        self.assertEqual(len(res["data"]), 3)
+        self.assertIsNone(res["data"][0]["e"])
+        _assert_same_features(self, res["data"][0]["p"], self.model.predict(array(window)))
+        self.assertIsNone(res["data"][1]["p"])
+        self.assertIsInstance(res["data"][1]["e"], str)
+        self.assertIn("503000", res["data"][2]["e"])
+
+        # Series
+        res = self.client.post("/predict/batch", headers=headers, json={
+            "epoch_id": epoch_record["id"],
+            "close_prices": window + window[:5],
+            "stride": 5
+        }).get_json()
+        self.assertTrue(res["success"])
+        self.assertEqual(len(res["data"]), 2)
+
+        # Errors that affect the whole request
+        res = self.client.post("/predict/batch", headers=headers, json={
+            "epoch_id": epoch_record["id"],
+            "close_prices": window[:5],
+            "stride": 1
+        }).get_json()
+        self.assertFalse(res["success"])
+        self.assertIn("503000", res["error"])
+        res = self.client.post("/predict/batch", json={ "epoch_id": epoch_record["id"], "close_prices_batch": [window] }).get_json()
+        self.assertFalse(res["success"])
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,111 @@
+from unittest import TestCase, main
+from time import sleep
+from numpy import array
+from modules._types import IPrediction, IPredictionCacheStats
+from modules.environment.Environment import ENV
+from modules.prediction_cache.PredictionCache import PredictionCache
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+# Test Data
+model_keys: list = ["_EPOCHNAME", "MODEL_ID", 50, 100]
+pred: IPrediction = { "r": 0, "t": 1647469003036, "f": [0.25, -0.5, 1.0], "s": 0.75 }
+
+
+
+
+
+# Test Class
+class PredictionCacheTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        pass
+
+    # After Tests
+    def tearDown(self):
+        pass
+
+
+
+
+    # Can build keys based on the model and the window
+    def testBuildKey(self):
+        key: bytes = PredictionCache.build_key(model_keys, array([1.5, 2.5, 3.5]))
+        self.assertEqual(len(key), 16)
+        self.assertEqual(key, PredictionCache.build_key(model_keys, array([1.5, 2.5, 3.5])))
+        self.assertNotEqual(key, PredictionCache.build_key(model_keys, array([1.5, 2.5, 3.6])))
+        self.assertNotEqual(key, PredictionCache.build_key(["_OTHEREPOCH", "MODEL_ID", 50, 100], array([1.5, 2.5, 3.5])))
+
+
+
+    # Can store and retrieve predictions
+    def testGetAndSet(self):
+        cache: PredictionCache = PredictionCache(10, 60)
+        self.assertIsNone(cache.get(b"key"))
+        cache.set(b"key", pred)
+        cached: IPrediction = cache.get(b"key")
+        self.assertDictEqual(cached, pred)
+
+        # The stored prediction cannot be altered
+        cached["f"].append(5)
+        self.assertDictEqual(cache.get(b"key"), pred)
+
+        # Validate the counters
+        stats: IPredictionCacheStats = cache.get_stats()
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+
+
+    # Evicts the least recently used predictions
+    def testCapacity(self):
+        cache: PredictionCache = PredictionCache(2, 60)
+        cache.set(b"a", pred)
+        cache.set(b"b", pred)
+        cache.get(b"a")
+        cache.set(b"c", pred)
+        self.assertIsNotNone(cache.get(b"a"))
+        self.assertIsNone(cache.get(b"b"))
+        self.assertIsNotNone(cache.get(b"c"))
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+
+
+
+    # Evicts the predictions that have expired
+    def testTTL(self):
+        cache: PredictionCache = PredictionCache(10, 1)
+        cache.set(b"key", pred)
+        self.assertIsNotNone(cache.get(b"key"))
+        sleep(1.1)
+        self.assertIsNone(cache.get(b"key"))
+        self.assertEqual(cache.get_stats()["size"], 0)
+
+
+
+    # Can be cleared and disabled
+    def testClearAndDisable(self):
+        cache: PredictionCache = PredictionCache(10, 60)
+        cache.set(b"key", pred)
+        cache.clear()
+        self.assertIsNone(cache.get(b"key"))
+
+        # A cache without capacity does not store predictions
+        disabled: PredictionCache = PredictionCache(0, 60)
+        disabled.set(b"key", pred)
+        self.assertIsNone(disabled.get(b"key"))
+        self.assertEqual(disabled.get_stats()["misses"], 0)
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
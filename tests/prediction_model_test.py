@@ -0,0 +1,181 @@
+from typing import List
+from unittest import TestCase, main
+from warnings import catch_warnings, simplefilter
+from numpy import ndarray, array, float64, nan, inf
+from modules._types import IEpochRecord
+from modules.environment.Environment import ENV
+from modules.prediction_model.PredictionModel import PredictionModel
+from fixtures import SMA_WINDOW_SIZE, LOOKBACK, WINDOW_SIZE, RegressionsFixture, ScaledModel, build_epoch_record, \
+    build_series, predict_baseline_feature
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+# Test Data
+epoch_record: IEpochRecord = build_epoch_record("_TEST_PREDICTION_MODEL", ["R_0", "R_1"])
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+def _rolling_mean(close_prices: ndarray) -> ndarray:
+    """Calculates the normalized sma the way the input dataset was built with
+    pandas (rolling(SMA_WINDOW_SIZE).mean().dropna()): every window is averaged
+    on its own and the windows with missing values are dropped.
+
+    Args:
+        close_prices: ndarray
+            The window of close prices.
+
+    Returns:
+        ndarray
+    """
+    sma: ndarray = array([
+        close_prices[i:i + SMA_WINDOW_SIZE].mean() for i in range(close_prices.shape[0] - SMA_WINDOW_SIZE + 1)
+    ], dtype=float64)
+    sma = sma[sma == sma]
+    highest: float = epoch_record["config"]["highest_price_sma"]
+    lowest: float = epoch_record["config"]["lowest_price_sma"]
+    return (sma - lowest) / (highest - lowest)
+
+
+
+
+
+
+# Test Class
+class PredictionModelTestCase(TestCase):
+    # Before All Tests
+    @classmethod
+    def setUpClass(cls):
+        cls.regressions: RegressionsFixture = RegressionsFixture(epoch_record)
+        cls.model: PredictionModel = PredictionModel(epoch_record)
+
+    # After All Tests
+    @classmethod
+    def tearDownClass(cls):
+        cls.regressions.cleanup()
+
+    # Before Tests
+    def setUp(self):
+        pass
+
+    # After Tests
+    def tearDown(self):
+        pass
+
+
+
+
+
+    # The input dataset matches the rolling mean it replaced
+    def testInputMatchesRollingMean(self):
+        for seed in range(50):
+            close_prices: ndarray = build_series(WINDOW_SIZE, seed)
+            input_ds: ndarray = self.model._make_regression_input_ds(close_prices.tolist())
+            self.assertEqual(input_ds.shape, (1, LOOKBACK))
+            self.assertEqual(input_ds.dtype, float64)
+            self.assertTrue(abs(input_ds[0] - _rolling_mean(close_prices)).max() < 1e-6)
+
+        # The batch input must match as well
+        windows: ndarray = array([build_series(WINDOW_SIZE, seed) for seed in range(50)])
+        input_ds, errors = self.model._make_regression_input_batch(windows)
+        self.assertListEqual(errors, [None] * 50)
+        for i in range(50):
+            self.assertTrue(abs(input_ds[i] - _rolling_mean(windows[i])).max() < 1e-6)
+
+
+
+    # The features match the baseline calculation, which used the sma prices in float64
+    def testFeaturesMatchBaseline(self):
+        model: PredictionModel = PredictionModel(epoch_record)
+        for reg, scale in zip(model.regressions, [0.05, 0.2]):
+            reg.model = ScaledModel(scale)
+        windows: ndarray = array([build_series(WINDOW_SIZE, seed) for seed in range(5000)])
+
+        # Predict the features of every window in one go
+        input_ds, errors = model._make_regression_input_batch(windows)
+        self.assertListEqual(errors, [None] * windows.shape[0])
+        features: List[List[float]] = model.ensemble.predict_features(input_ds).tolist()
+
+        # Compare them with the ones of the baseline
+        for i in range(windows.shape[0]):
+            baseline_ds: ndarray = _rolling_mean(windows[i]).reshape(1, -1)
+            self.assertListEqual(model._build_features(windows[i].tolist()), features[i])
+            for j, reg in enumerate(model.regressions):
+                self.assertEqual(features[i][j], predict_baseline_feature(reg, baseline_ds), f"Window {i} of {reg.id}")
+        model.stop()
+
+
+
+    # Missing and infinite prices are reported with the number of sma rows that could be calculated
+    def testNonFinitePrices(self):
+        for invalid in [nan, inf, -inf]:
+            close_prices: ndarray = build_series(WINDOW_SIZE)
+            close_prices[-3] = invalid
+            expected_rows: int = WINDOW_SIZE - SMA_WINDOW_SIZE + 1 - 3
+            with catch_warnings():
+                simplefilter("error")
+
+                # Single window
+                with self.assertRaisesRegex(RuntimeError, f"Has: {expected_rows}.*503000"):
+                    self.model._make_regression_input_ds(close_prices)
+
+                # Batch
+                input_ds, errors = self.model._make_regression_input_batch(array([close_prices, build_series(WINDOW_SIZE)]))
+                self.assertIn(f"Has: {expected_rows}.", errors[0])
+                self.assertIn("503000", errors[0])
+                self.assertIsNone(errors[1])
+
+
+
+    # Windows of the wrong size and sma values out of the Epoch's boundaries are rejected
+    def testInvalidWindows(self):
+        with self.assertRaisesRegex(RuntimeError, f"Has: {LOOKBACK - 1}.*503000"):
+            self.model._make_regression_input_ds(build_series(WINDOW_SIZE - 1))
+        with self.assertRaisesRegex(RuntimeError, "503001"):
+            self.model._make_regression_input_ds(build_series(WINDOW_SIZE) + 60000)
+        with self.assertRaisesRegex(RuntimeError, "503002"):
+            self.model._make_regression_input_ds(build_series(WINDOW_SIZE) - 30000)
+
+
+
+    # The least recently used stream is discarded when the limit is reached
+    def testStreamsLRU(self):
+        max_streams: int = PredictionModel.MAX_STREAMS
+        PredictionModel.MAX_STREAMS = 3
+        try:
+            window: ndarray = build_series(WINDOW_SIZE)
+            for stream_id in ["A", "B", "C"]:
+                self.model.predict_stream(stream_id, WINDOW_SIZE - 1, window)
+
+            # Use the oldest stream so it is not discarded
+            self.model.predict_stream("A", WINDOW_SIZE, window[-1:])
+            self.model.predict_stream("D", WINDOW_SIZE - 1, window)
+            self.assertListEqual(list(self.model.streams.keys()), ["C", "A", "D"])
+
+            # The discarded stream has to resync
+            with self.assertRaisesRegex(RuntimeError, "503003"):
+                self.model.predict_stream("B", WINDOW_SIZE, window[-1:])
+        finally:
+            PredictionModel.MAX_STREAMS = max_streams
+            self.model.streams.clear()
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
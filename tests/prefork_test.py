@@ -0,0 +1,317 @@
+from typing import List, Any, Dict, Union
+from unittest import TestCase, main
+from os import fork, pipe, read, write, close, kill, waitpid, getpid, _exit
+from signal import SIGKILL
+from socket import create_server
+from threading import Thread
+from time import sleep, monotonic
+from http.client import HTTPConnection, HTTPResponse
+from gc import unfreeze, collect
+from weakref import ref
+from numpy import array
+import modules.database.Database as Database
+from modules.environment.Environment import ENV
+from modules.metrics.Metrics import Metrics
+from modules.api_error.ApiErrorWriter import ApiErrorWriter
+from modules.prediction_cache.PredictionCache import PredictionCache
+from modules.epoch.Epoch import Epoch
+from modules.prefork.PreforkServer import PreforkServer
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+def _app(environ: Dict[str, Any], start_response: Any) -> List[bytes]:
+    """WSGI application that responds with the pid of the worker. The /slow path
+    waits for the number of seconds provided in the query string beforehand.
+    """
+    if environ["PATH_INFO"] == "/slow":
+        sleep(float(environ["QUERY_STRING"]))
+    body: bytes = str(getpid()).encode()
+    start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", str(len(body)))])
+    return [body]
+
+
+
+
+
+def _request(port: int, path: str = "/", conn: Union[HTTPConnection, None] = None) -> int:
+    """Sends a request to the server and returns the pid of the worker that
+    responded.
+
+    Args:
+        port: int
+            The port the server is bound to.
+        path: str
+            The path of the request.
+        conn: Union[HTTPConnection, None]
+            The connection to use. If None, a new one is opened and closed.
+
+    Returns:
+        int
+    """
+    connection: HTTPConnection = conn if conn is not None else HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        connection.request("GET", path)
+        response: HTTPResponse = connection.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"The request failed with {response.status}.")
+        return int(response.read())
+    finally:
+        if conn is None:
+            connection.close()
+
+
+
+
+
+def _send(port: int, path: str, results: List[Union[int, Exception]]) -> None:
+    """Sends a request from a thread and stores the pid of the worker that responded
+    or the error that was raised.
+
+    Args:
+        port: int
+            The port the server is bound to.
+        path: str
+            The path of the request.
+        results: List[Union[int, Exception]]
+            The list in which the result is stored.
+    """
+    try:
+        results.append(_request(port, path))
+    except Exception as e:
+        results.append(e)
+
+
+
+
+
+def _is_running(pid: int) -> bool:
+    """Checks if a process is still running (zombies are reaped by the server).
+
+    Args:
+        pid: int
+            The pid of the process.
+
+    Returns:
+        bool
+    """
+    try:
+        kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+
+
+
+def _reap_until(server: PreforkServer, condition: Any, timeout: float = 10) -> bool:
+    """Reaps the workers of the server until the condition is met.
+
+    Args:
+        server: PreforkServer
+            The server whose workers are reaped.
+        condition: Callable[[], bool]
+            The condition to wait for.
+        timeout: float
+            The maximum number of seconds to wait.
+
+    Returns:
+        bool
+    """
+    deadline: float = monotonic() + timeout
+    while monotonic() < deadline:
+        server._reap()
+        if condition():
+            return True
+        sleep(0.05)
+    return False
+
+
+
+
+
+
+# Test Class
+class PreforkServerTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        # The workers should not load the model
+        self.backend: str = ENV["INFERENCE_BACKEND"]
+        ENV["INFERENCE_BACKEND"] = "numpy"
+        self.graceful_timeout: float = PreforkServer.GRACEFUL_TIMEOUT
+
+        # Init the server without running the master
+        self.server: PreforkServer = PreforkServer(_app, "127.0.0.1", 0, 2)
+        self.server.socket = create_server(("127.0.0.1", 0))
+        self.port: int = self.server.socket.getsockname()[1]
+
+    # After Tests
+    def tearDown(self):
+        PreforkServer.GRACEFUL_TIMEOUT = self.graceful_timeout
+        self.server._stop_workers()
+        self.server.socket.close()
+        ENV["INFERENCE_BACKEND"] = self.backend
+        unfreeze()
+
+
+
+
+
+    # The workers that crash are restarted
+    def testRestartCrashedWorker(self):
+        for _ in range(2):
+            self.server._spawn()
+        pid: int = _request(self.port)
+        self.assertIn(pid, self.server.workers)
+
+        # Kill the worker
+        kill(pid, SIGKILL)
+        self.assertTrue(_reap_until(self.server, lambda: pid not in self.server.workers and len(self.server.workers) == 2))
+        self.assertIn(_request(self.port), self.server.workers)
+
+
+
+    # The workers are replaced one by one with workers of the new generation
+    def testRollingReplace(self):
+        for _ in range(2):
+            self.server._spawn()
+        previous_workers: List[int] = list(self.server.workers.keys())
+
+        # Replace the workers
+        self.server._replace_workers()
+        self.assertTrue(_reap_until(self.server, lambda: len(self.server.workers) == 2 and len(self.server.retiring) == 0))
+        self.assertListEqual(list(self.server.workers.values()), [1, 1])
+        for pid in previous_workers:
+            self.assertNotIn(pid, self.server.workers)
+            self.assertFalse(_is_running(pid))
+        self.assertIn(_request(self.port), self.server.workers)
+
+
+
+    # A worker that is asked to stop responds the requests in progress before exiting
+    def testDrainRequests(self):
+        self.server._spawn()
+        pid: int = list(self.server.workers.keys())[0]
+
+        # Open an idle keep-alive connection
+        idle_conn: HTTPConnection = HTTPConnection("127.0.0.1", self.port, timeout=30)
+        self.assertEqual(_request(self.port, conn=idle_conn), pid)
+
+        # Send a slow request and retire the worker while it is in progress
+        results: List[Union[int, Exception]] = []
+        request: Thread = Thread(target=_send, args=(self.port, "/slow?1.5", results))
+        request.start()
+        sleep(0.5)
+        started: float = monotonic()
+        self.server._retire(pid)
+
+        # The response must be received and the worker must exit
+        request.join(10)
+        self.assertListEqual(results, [pid])
+        self.assertTrue(_reap_until(self.server, lambda: len(self.server.workers) == 0))
+        self.assertLess(monotonic() - started, PreforkServer.DRAIN_TIMEOUT)
+
+        # The idle connection was closed by the worker
+        with self.assertRaises(Exception):
+            _request(self.port, conn=idle_conn)
+        idle_conn.close()
+
+
+
+    # The workers that don't stop in time are killed
+    def testKillStuckWorkers(self):
+        self.server._spawn()
+        pid: int = list(self.server.workers.keys())[0]
+        results: List[Union[int, Exception]] = []
+        Thread(target=_send, args=(self.port, "/slow?10", results), daemon=True).start()
+        sleep(0.5)
+
+        # Stop the workers
+        PreforkServer.GRACEFUL_TIMEOUT = 0.5
+        started: float = monotonic()
+        self.server._stop_workers()
+        self.assertLess(monotonic() - started, 5)
+        self.assertDictEqual(self.server.workers, {})
+        self.assertFalse(_is_running(pid))
+
+
+
+    # Forked processes discard the state they cannot share with the parent
+    def testForkResets(self):
+        # Populate the state of the parent
+        pool: Any = Database.POOL
+        cache: PredictionCache = Epoch.CACHE
+        pool_in_parent: Any = object()
+        Database.POOL = pool_in_parent
+        Metrics.increment("prediction_api_model_loads_total")
+        Epoch.CACHE = PredictionCache(10, 60)
+        Epoch.CACHE.set(PredictionCache.build_key(["_EPOCH"], array([1.5])), { "r": 0, "t": 0, "f": [], "s": 0 })
+        Epoch.WATCHER = Thread(target=lambda: None)
+        Epoch.SYNC_REQUESTER = lambda: None
+        writer: ApiErrorWriter = ApiErrorWriter(lambda rows: None)
+        writer.queue.put_nowait(("origin", "error", 0, None, None, None))
+        writer.dropped = 3
+
+        # Check the state in a child process and report the attributes that were not reset
+        try:
+            read_fd, write_fd = pipe()
+            pid: int = fork()
+            if pid == 0:
+                close(read_fd)
+                errors: List[str] = []
+                if Database.POOL is not None: errors.append("Database.POOL")
+                if Database.INHERITED_POOLS[-1:] != [pool_in_parent]: errors.append("Database.INHERITED_POOLS")
+                if len(Metrics.COUNTERS) > 0: errors.append("Metrics.COUNTERS")
+                if Epoch.WATCHER is not None: errors.append("Epoch.WATCHER")
+                if Epoch.SYNC_REQUESTER is not None: errors.append("Epoch.SYNC_REQUESTER")
+                if Epoch.CACHE.get_stats()["size"] != 0: errors.append("Epoch.CACHE")
+                if writer.queue.qsize() != 0 or writer.dropped != 0: errors.append("ApiErrorWriter")
+                write(write_fd, ",".join(errors).encode())
+                _exit(0)
+            close(write_fd)
+            errors: bytes = read(read_fd, 1024)
+            close(read_fd)
+            waitpid(pid, 0)
+            self.assertEqual(errors, b"")
+
+            # The parent keeps its state
+            self.assertEqual(writer.queue.qsize(), 1)
+            self.assertEqual(Epoch.CACHE.get_stats()["size"], 1)
+        finally:
+            Database.POOL = pool
+            Epoch.CACHE = cache
+            Epoch.WATCHER = None
+            Epoch.SYNC_REQUESTER = None
+
+
+
+    # The instances reset in forked processes can still be garbage collected
+    def testForkResetsGarbageCollected(self):
+        writer: ApiErrorWriter = ApiErrorWriter(lambda rows: None)
+        self.assertIn(writer, ApiErrorWriter.INSTANCES)
+        writer_ref: Any = ref(writer)
+        del writer
+        collect()
+        self.assertIsNone(writer_ref())
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
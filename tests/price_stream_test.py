@@ -0,0 +1,158 @@
+from unittest import TestCase, main
+from numpy import ndarray, array, cumsum
+from numpy.random import default_rng
+from modules.environment.Environment import ENV
+from modules.price_stream.PriceStream import PriceStream
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+# Test Data
+sma_window_size: int = 20
+lookback: int = 16
+window_size: int = lookback + sma_window_size - 1
+highest_price_sma: float = 90000.0
+lowest_price_sma: float = 15000.0
+series: ndarray = 40000 + cumsum(default_rng(0).normal(0, 50, 500))
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+def _new_stream() -> PriceStream:
+    """Creates an empty stream with the test configuration.
+
+    Returns:
+        PriceStream
+    """
+    return PriceStream("TEST_STREAM", sma_window_size, lookback, highest_price_sma, lowest_price_sma)
+
+
+
+
+
+def _recompute(close_prices: ndarray) -> ndarray:
+    """Builds the normalized sma of a full window from scratch.
+
+    Args:
+        close_prices: ndarray
+            The full window of close prices.
+
+    Returns:
+        ndarray
+    """
+    sma: ndarray = array([close_prices[i:i + sma_window_size].mean() for i in range(lookback)])
+    return (sma - lowest_price_sma) / (highest_price_sma - lowest_price_sma)
+
+
+
+
+
+
+# Test Class
+class PriceStreamTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        pass
+
+    # After Tests
+    def tearDown(self):
+        pass
+
+
+
+
+    # The incremental input matches a full recompute as the buffers wrap around
+    def testMatchesFullRecompute(self):
+        stream: PriceStream = _new_stream()
+        input_ds: ndarray = stream.update(window_size - 1, series[:window_size])
+        self.assertEqual(input_ds.shape, (1, lookback))
+        self.assertTrue(abs(input_ds[0] - _recompute(series[:window_size])).max() < 1e-6)
+        for seq in range(window_size, series.shape[0]):
+            input_ds = stream.update(seq, series[seq:seq + 1])
+            self.assertTrue(
+                abs(input_ds[0] - _recompute(series[seq - window_size + 1:seq + 1])).max() < 1e-6,
+                f"The stream does not match the window ending at {seq}."
+            )
+
+
+
+    # Overlapping and retried payloads only push the closes that have not been seen
+    def testOverlapAndRetry(self):
+        stream: PriceStream = _new_stream()
+        stream.update(window_size - 1, series[:window_size])
+
+        # Push 3 closes, the first one was already pushed
+        seq: int = window_size + 1
+        input_ds: ndarray = stream.update(seq, series[seq - 2:seq + 1]).copy()
+        self.assertEqual(stream.seq, seq)
+        self.assertTrue(abs(input_ds[0] - _recompute(series[seq - window_size + 1:seq + 1])).max() < 1e-6)
+
+        # Retry the same payload and an older one
+        self.assertTrue((stream.update(seq, series[seq - 2:seq + 1]) == input_ds).all())
+        self.assertTrue((stream.update(seq, series[seq:seq + 1]) == input_ds).all())
+        self.assertEqual(stream.seq, seq)
+
+
+
+    # A gap in the sequence requires the full window
+    def testSequenceGap(self):
+        # An empty stream must be synced with the full window
+        stream: PriceStream = _new_stream()
+        with self.assertRaisesRegex(RuntimeError, "503003"):
+            stream.update(window_size, series[window_size:window_size + 1])
+
+        # Skip a close
+        stream.update(window_size - 1, series[:window_size])
+        with self.assertRaisesRegex(RuntimeError, "503003"):
+            stream.update(window_size + 1, series[window_size + 1:window_size + 2])
+
+        # A payload older than the stream
+        with self.assertRaisesRegex(RuntimeError, "503003"):
+            stream.update(window_size - 2, series[window_size - 2:window_size - 1])
+        self.assertEqual(stream.seq, window_size - 1)
+
+        # The full window resyncs the stream
+        seq: int = window_size + 1
+        input_ds: ndarray = stream.update(seq, series[seq - window_size + 1:seq + 1])
+        self.assertEqual(stream.seq, seq)
+        self.assertTrue(abs(input_ds[0] - _recompute(series[seq - window_size + 1:seq + 1])).max() < 1e-6)
+
+
+
+    # The sma values out of the Epoch's boundaries are rejected until they leave the lookback
+    def testViolations(self):
+        stream: PriceStream = _new_stream()
+        stream.update(window_size - 1, series[:window_size])
+
+        # Push a close that moves the sma above the highest price sma
+        with self.assertRaisesRegex(RuntimeError, "503001"):
+            stream.update(window_size, array([highest_price_sma * sma_window_size]))
+
+        # The stream remains in violation until the sma value leaves the lookback
+        seq: int = window_size
+        for _ in range(window_size - 1):
+            seq += 1
+            with self.assertRaisesRegex(RuntimeError, "50300"):
+                stream.update(seq, series[seq:seq + 1])
+        seq += 1
+        self.assertEqual(stream.update(seq, series[seq:seq + 1]).shape, (1, lookback))
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,159 @@
+from typing import List, Any, Dict, Union
+from unittest import TestCase, main
+from socket import create_server
+from threading import Thread
+from time import sleep, monotonic
+from http.client import HTTPConnection
+from modules.environment.Environment import ENV
+from modules.prefork.WaitressServer import WaitressServer
+
+
+
+
+# Unit tests can only be executed if the container is running in test mode
+if not ENV["test_mode"]:
+    raise Exception("Unit Tests can only be executed when the container is running in test mode.")
+
+
+
+
+
+
+
+## Test Method Helpers ##
+
+
+
+def _app(environ: Dict[str, Any], start_response: Any) -> List[bytes]:
+    """WSGI application that responds after the number of seconds provided in the
+    query string.
+    """
+    sleep(float(environ["QUERY_STRING"] or 0))
+    start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "2")])
+    return [b"OK"]
+
+
+
+
+
+def _send(conn: HTTPConnection, path: str, results: List[Union[int, Exception]]) -> None:
+    """Sends a request from a thread and stores the status of the response or the
+    error that was raised.
+
+    Args:
+        conn: HTTPConnection
+            The connection to use.
+        path: str
+            The path of the request.
+        results: List[Union[int, Exception]]
+            The list in which the result is stored.
+    """
+    try:
+        conn.request("GET", path)
+        res: Any = conn.getresponse()
+        res.read()
+        results.append(res.status)
+    except Exception as e:
+        results.append(e)
+
+
+
+
+
+
+# Test Class
+class WaitressServerTestCase(TestCase):
+    # Before Tests
+    def setUp(self):
+        self.socket: Any = create_server(("127.0.0.1", 0))
+        self.port: int = self.socket.getsockname()[1]
+        self.server: WaitressServer = WaitressServer(_app, self.socket)
+
+    # After Tests
+    def tearDown(self):
+        self.server.close()
+        self.socket.close()
+
+
+
+    def _poll_until(self, condition: Any, timeout: float = 10) -> bool:
+        """Runs the event loop until the condition is met.
+
+        Args:
+            condition: Callable[[], bool]
+            timeout: float
+
+        Returns:
+            bool
+        """
+        deadline: float = monotonic() + timeout
+        while monotonic() < deadline:
+            self.server.poll(0.05)
+            if condition():
+                return True
+        return False
+
+
+
+
+
+    # The installed waitress exposes the internals used to drain the server
+    def testInternals(self):
+        WaitressServer.check_internals(self.server.server)
+
+        # The channels are only created once a connection is accepted
+        conn: HTTPConnection = HTTPConnection("127.0.0.1", self.port, timeout=10)
+        results: List[Union[int, Exception]] = []
+        request: Thread = Thread(target=_send, args=(conn, "/", results))
+        request.start()
+        self.assertTrue(self._poll_until(lambda: len(results) > 0))
+        request.join()
+        channels: List[Any] = list(self.server.server.active_channels.values())
+        self.assertEqual(len(channels), 1)
+        for attr in ["requests"] + WaitressServer.CHANNEL_ATTRIBUTES:
+            self.assertTrue(hasattr(channels[0], attr), attr)
+        conn.close()
+
+
+
+    # An unsupported server is rejected
+    def testMissingInternals(self):
+        class _Server:
+            accepting: bool = True
+        with self.assertRaisesRegex(RuntimeError, "server._map.*server.active_channels"):
+            WaitressServer.check_internals(_Server())
+
+
+
+    # The requests in progress are responded once the server stops accepting and the idle connections are closed
+    def testDrain(self):
+        # Open an idle connection
+        idle_conn: HTTPConnection = HTTPConnection("127.0.0.1", self.port, timeout=10)
+        idle_results: List[Union[int, Exception]] = []
+        request: Thread = Thread(target=_send, args=(idle_conn, "/", idle_results))
+        request.start()
+        self.assertTrue(self._poll_until(lambda: len(idle_results) > 0))
+        request.join()
+
+        # Send a slow request and stop accepting while it is in progress
+        conn: HTTPConnection = HTTPConnection("127.0.0.1", self.port, timeout=10)
+        results: List[Union[int, Exception]] = []
+        request = Thread(target=_send, args=(conn, "/?0.5", results))
+        request.start()
+        self.assertTrue(self._poll_until(lambda: len(self.server.server.active_channels) == 2))
+        self.server.stop_accepting()
+
+        # Drain the server
+        self.assertTrue(self._poll_until(lambda: self.server.close_idle_channels() == 0))
+        request.join()
+        self.assertListEqual(idle_results, [200])
+        self.assertListEqual(results, [200])
+        conn.close()
+        idle_conn.close()
+
+
+
+
+# Test Execution
+if __name__ == "__main__":
+    main()
\ No newline at end of file